@@ -0,0 +1,381 @@
+"""
+벤치마크용 로컬 가짜 제공자 서버 (Yahoo, FRED, Binance)
+
+실제 API와 같은 형식의 응답을 결정적인 합성 데이터로 만들어 돌려준다.
+같은 종목·시각에는 항상 같은 값을 주므로 실행끼리 결과를 비교할 수 있고,
+응답 지연, 오류 비율(503), 요청 한도(429 + Retry-After)를 설정해 재시도·대기 경로도 측정한다.
+
+경로:
+    /yahoo/v8/finance/chart/<symbol>?period1=&period2=&interval=
+    /fred/series?series_id=
+    /fred/series/observations?series_id=&observation_start=&observation_end=&frequency=
+    /binance/api/v3/ping, /binance/api/v3/time, /binance/api/v3/klines
+"""
+import json
+import math
+import random
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import pandas as pd
+
+# 합성 데이터가 시작되는 시각 (Binance 상장 시각, FRED 관측 시작일)
+EPOCH = datetime(2015, 1, 1, tzinfo=timezone.utc)
+EPOCH_MS = int(EPOCH.timestamp() * 1000)
+
+# 간격 단위별 초 (달은 30일)
+_UNIT_SECONDS = {'m': 60, 'h': 3600, 'd': 86400, 'wk': 604800, 'w': 604800, 'mo': 2592000}
+
+# Binance kline 간격 단위 (대문자 M은 월)
+_BINANCE_UNITS = {'m': 60, 'h': 3600, 'd': 86400, 'w': 604800, 'M': 2592000}
+
+# FRED frequency별 관측 간격 (일)
+_FRED_STEPS = {'d': 1, 'w': 7, 'bw': 14, 'm': 30, 'q': 91, 'sa': 182, 'a': 365}
+
+# 종목에 붙이는 거래소 시간대 (Yahoo 차트 meta)
+_TIMEZONES = ('America/New_York', 'Europe/London', 'Asia/Tokyo')
+
+
+def _interval_seconds(interval, units=_UNIT_SECONDS):
+    for unit in sorted(units, key=len, reverse=True):
+        if interval.endswith(unit) and interval[:-len(unit)].isdigit():
+            return int(interval[:-len(unit)]) * units[unit]
+    raise ValueError(f"Unsupported interval: {interval}")
+
+
+def _seed(symbol):
+    return zlib.crc32(symbol.encode('utf-8'))
+
+
+def synthetic_prices(symbol, seconds):
+    """
+    종목·시각별 결정적인 가격 (요청 구간과 무관하게 같은 시각에는 같은 값)
+
+    Args:
+        seconds (ndarray): UNIX 초 배열
+
+    Returns:
+        ndarray: float64 가격
+    """
+    seed = _seed(symbol)
+    base = 20 + seed % 500
+    phase = (seed % 1000) / 1000 * 2 * math.pi
+    days = seconds / 86400.0
+    # 해시한 잡음 (0~1), 요청 구간에 따라 달라지지 않도록 시각으로 계산
+    noise = ((seconds.astype(np.int64) // 60 * 2654435761 + seed) % 100003) / 100003.0
+    return base * (1 + 0.2 * np.sin(days / 90 + phase)) * (1 + 0.01 * (noise - 0.5))
+
+
+def synthetic_bars(symbol, seconds):
+    """시가·고가·저가·종가·거래량 컬럼 (가격은 synthetic_prices 기준)"""
+    close = synthetic_prices(symbol, seconds)
+    open_ = synthetic_prices(symbol, seconds - 1)
+    spread = np.abs(close - open_) + close * 0.002
+    volume = 1000 + (_seed(symbol) + seconds.astype(np.int64) // 60) % 100000
+    return {
+        'open': open_,
+        'high': np.maximum(open_, close) + spread,
+        'low': np.minimum(open_, close) - spread,
+        'close': close,
+        'volume': volume.astype(np.int64)
+    }
+
+
+def _business_days(start, end, step_days=1):
+    """[start, end] 사이의 평일 (관측 간격이 1일보다 길면 그 간격마다)"""
+    days = pd.date_range(max(start, EPOCH.replace(tzinfo=None)), end, freq='D')
+    if step_days == 1:
+        return days[days.dayofweek < 5]
+    return days[::step_days]
+
+
+class _TokenBucket:
+    """서버 쪽 요청 한도 (초당 rate개, 버스트 rate개)"""
+
+    def __init__(self, rate):
+        self.rate = rate
+        self.tokens = rate
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def take(self):
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+
+class FakeProviderServer:
+    """
+    가짜 제공자 HTTP 서버 (요청마다 스레드 하나, keep-alive 지원)
+
+    Args:
+        latency (float): 응답마다 추가하는 지연 (초, ±jitter 비율만큼 흔들림)
+        jitter (float): 지연 흔들림 비율 (0~1)
+        error_rate (float): 503으로 실패시킬 요청 비율 (0~1)
+        rate_limit (float): 제공자별 초당 허용 요청 수 (0이면 제한 없음, 넘으면 429)
+        seed (int): 지연·오류를 뽑는 난수 시드
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, jitter=0.2, error_rate=0.0, rate_limit=0, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self._random_lock = threading.Lock()
+        self._buckets = {
+            provider: _TokenBucket(rate_limit) for provider in ('yahoo', 'fred', 'binance')
+        } if rate_limit else {}
+        self._stats = {}
+        self._stats_lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name='fake-providers', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def stats(self):
+        """제공자·상태 코드별 응답 수 (예: {'yahoo': {'200': 10, '429': 2}})"""
+        with self._stats_lock:
+            return {provider: dict(codes) for provider, codes in self._stats.items()}
+
+    def _count(self, provider, status):
+        with self._stats_lock:
+            codes = self._stats.setdefault(provider, {})
+            codes[str(status)] = codes.get(str(status), 0) + 1
+
+    def _draw(self):
+        """(지연, 실패 여부)"""
+        with self._random_lock:
+            delay = self.latency * (1 + self.jitter * (2 * self._random.random() - 1)) if self.latency else 0.0
+            failed = self.error_rate > 0 and self._random.random() < self.error_rate
+        return delay, failed
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # 헤더와 본문을 따로 쓰므로 Nagle 알고리즘이 keep-alive 응답을 지연시키지 않도록
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                params = {name: values[-1] for name, values in parse_qs(url.query).items()}
+                provider = url.path.strip('/').split('/', 1)[0]
+                route = ROUTES.get(provider)
+                if route is None:
+                    return self._reply(provider, 404, {'error': 'not found'})
+
+                delay, failed = server._draw()
+                if delay:
+                    time.sleep(delay)
+                bucket = server._buckets.get(provider)
+                if bucket is not None and not bucket.take():
+                    return self._reply(provider, 429, {'error': 'rate limited'}, {'Retry-After': '1'})
+                if failed:
+                    return self._reply(provider, 503, {'error': 'unavailable'})
+                try:
+                    status, payload = route(url.path[len(provider) + 1:], params)
+                except (KeyError, ValueError) as e:
+                    status, payload = 400, {'error': str(e)}
+                self._reply(provider, status, payload)
+
+            def _reply(self, provider, status, payload, headers=None):
+                body = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+                server._count(provider, status)
+
+        return Handler
+
+
+def _yahoo(path, params):
+    """v8 차트 API 형식 (chart.result[0]의 timestamp와 indicators.quote)"""
+    symbol = path.rsplit('/', 1)[-1]
+    interval = params.get('interval', '1d')
+    step = _interval_seconds(interval)
+    start = max(int(params['period1']), int(EPOCH.timestamp()))
+    end = int(params['period2'])
+    first = -(-start // step) * step
+    seconds = np.arange(first, end, step, dtype=np.int64)
+    if step >= 86400:
+        # 일봉 이상은 주말 제외
+        seconds = seconds[pd.to_datetime(seconds, unit='s').dayofweek < 5]
+    bars = synthetic_bars(symbol, seconds)
+    quote = {name: np.round(values, 4).tolist() for name, values in bars.items()}
+    return 200, {'chart': {'result': [{
+        'meta': {'symbol': symbol, 'exchangeTimezoneName': _TIMEZONES[_seed(symbol) % len(_TIMEZONES)]},
+        'timestamp': seconds.tolist(),
+        'indicators': {'quote': [quote]}
+    }], 'error': None}}
+
+
+def _fred(path, params):
+    series = params['series_id']
+    if path == '/series':
+        return 200, {'seriess': [{
+            'id': series,
+            'last_updated': '2024-01-05 15:21:02-06',
+            'observation_end': datetime.now().strftime('%Y-%m-%d')
+        }]}
+    if path != '/series/observations':
+        return 404, {'error': 'not found'}
+    start = pd.Timestamp(params.get('observation_start', EPOCH.date()))
+    end = pd.Timestamp(params.get('observation_end', datetime.now().date()))
+    days = _business_days(start, end, _FRED_STEPS.get(params.get('frequency', 'd'), 1))
+    values = synthetic_prices(series, days.values.astype('datetime64[s]').astype(np.int64)) / 100
+    observations = [
+        {'date': day, 'value': '.' if index % 97 == 13 else f'{value:.2f}'}
+        for index, (day, value) in enumerate(zip(days.strftime('%Y-%m-%d'), values))
+    ]
+    return 200, {'observations': observations}
+
+
+def _binance(path, params):
+    if path == '/api/v3/ping':
+        return 200, {}
+    if path == '/api/v3/time':
+        return 200, {'serverTime': int(time.time() * 1000)}
+    if path != '/api/v3/klines':
+        return 404, {'code': -1, 'msg': 'not found'}
+
+    symbol = params['symbol']
+    step_ms = _interval_seconds(params['interval'], _BINANCE_UNITS) * 1000
+    limit = min(int(params.get('limit', 500)), 1000)
+    start = max(int(params.get('startTime', EPOCH_MS)), EPOCH_MS)
+    end = int(params.get('endTime', start + step_ms * limit))
+    first = EPOCH_MS + -(-(start - EPOCH_MS) // step_ms) * step_ms
+    opens = np.arange(first, end + 1, step_ms, dtype=np.int64)[:limit]
+    bars = synthetic_bars(symbol, opens // 1000)
+    trades = (bars['volume'] // 7).tolist()
+    klines = [
+        [open_time, f'{o:.8f}', f'{h:.8f}', f'{l:.8f}', f'{c:.8f}', f'{v:.8f}',
+         open_time + step_ms - 1, f'{v * c:.8f}', n, f'{v / 2:.8f}', f'{v * c / 2:.8f}', '0']
+        for open_time, o, h, l, c, v, n in zip(
+            opens.tolist(), bars['open'], bars['high'], bars['low'], bars['close'], bars['volume'].tolist(), trades
+        )
+    ]
+    return 200, klines
+
+
+ROUTES = {'yahoo': _yahoo, 'fred': _fred, 'binance': _binance}
+
+
+def make_fake_yfinance(base_url, session_factory):
+    """
+    yfinance 모듈을 대신하는 객체 (yf.download가 가짜 서버의 차트 API에서 받아 같은 형식으로 반환)
+
+    yfinance 1.x는 curl_cffi 세션으로 Yahoo 주소에 직접 접속하고 주소를 바꿀 방법이 없으므로,
+    벤치마크는 이 객체로 yfinance만 바꾸고 배치 분할·재시도·캐시·저장은 실제 코드를 그대로 쓴다.
+    yfinance 0.2.x처럼 종목별 오류는 예외로 올리지 않고 shared._ERRORS에 남긴 뒤 빈 컬럼으로 반환하며,
+    ignore_tz=False이면 모든 종목의 시각을 UTC로 맞춘다 (거래소 시간대는 Ticker.fast_info로 확인).
+
+    Args:
+        base_url (str): 가짜 서버 주소
+        session_factory (callable): 요청에 쓸 requests 세션을 돌려주는 함수 (예: http_pool.get_session)
+
+    Returns:
+        SimpleNamespace: download (yf.download와 같은 인자를 받아 group_by='ticker' 형식의 DataFrame 반환),
+        Ticker (fast_info['timezone']만 지원), shared (마지막 download의 종목별 오류를 담는 _ERRORS)
+    """
+    columns = ['Open', 'High', 'Low', 'Close', 'Volume', 'Dividends', 'Stock Splits']
+    shared = SimpleNamespace(_ERRORS={})
+
+    def chart(symbol, period1, period2, interval, session):
+        response = session.get(
+            f'{base_url}/yahoo/v8/finance/chart/{symbol}',
+            params={'period1': period1, 'period2': period2, 'interval': interval}
+        )
+        response.raise_for_status()
+        return response.json()['chart']['result'][0]
+
+    class Ticker:
+        def __init__(self, symbol, session=None):
+            self.symbol = symbol
+            self.session = session or session_factory()
+
+        @property
+        def fast_info(self):
+            now = int(time.time())
+            return {'timezone': chart(self.symbol, now, now, '1d', self.session)['meta']['exchangeTimezoneName']}
+
+    def fetch(symbol, start, end, interval, session):
+        period1 = int(pd.Timestamp(start, tz='UTC').timestamp())
+        period2 = int(pd.Timestamp(end, tz='UTC').timestamp())
+        result = chart(symbol, period1, period2, interval, session)
+        quote = result['indicators']['quote'][0]
+        index = pd.to_datetime(result['timestamp'], unit='s', utc=True).tz_convert(result['meta']['exchangeTimezoneName'])
+        index.name = 'Date' if _interval_seconds(interval) >= 86400 else 'Datetime'
+        return pd.DataFrame({
+            'Open': quote['open'],
+            'High': quote['high'],
+            'Low': quote['low'],
+            'Close': quote['close'],
+            'Volume': quote['volume'],
+            'Dividends': 0.0,
+            'Stock Splits': 0.0
+        }, index=index)
+
+    def fetch_one(symbol, start, end, interval, session, errors):
+        try:
+            return fetch(symbol, start, end, interval, session)
+        except Exception as e:
+            # yf.download처럼 종목별 오류를 기록하고 빈 결과로 대신함
+            errors[symbol.upper()] = repr(e)
+            return pd.DataFrame(columns=columns, index=pd.DatetimeIndex([], tz='UTC', name='Date'))
+
+    def download(tickers, start=None, end=None, interval='1d', group_by='ticker', threads=True, session=None,
+                 ignore_tz=None, **kwargs):
+        tickers = [tickers] if isinstance(tickers, str) else list(tickers)
+        session = session or session_factory()
+        errors = {}
+        shared._ERRORS = errors
+        workers = min(len(tickers), 8) if threads else 1
+        with ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+            frames = list(executor.map(lambda symbol: fetch_one(symbol, start, end, interval, session, errors), tickers))
+        if ignore_tz is False:
+            frames = [frame.tz_convert('UTC') for frame in frames]
+        if len(tickers) == 1:
+            return frames[0]
+        # 종목마다 거래일이 다르면 빈 값으로 채워짐 (실제 yf.download와 같음)
+        return pd.concat(frames, axis=1, keys=tickers, names=['Ticker', 'Price'])
+
+    return SimpleNamespace(download=download, Ticker=Ticker, shared=shared)
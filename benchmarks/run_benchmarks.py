@@ -0,0 +1,412 @@
+"""
+오프라인 수집 벤치마크
+
+로컬 가짜 제공자 서버(fake_providers.py)를 띄우고 시나리오마다 새 프로세스에서 수집을 실행한다.
+각 프로세스는 임시 디렉토리를 데이터·로그·캐시 위치로 쓰므로 실제 datas/와 응답 캐시는 건드리지 않는다.
+
+측정값: 소요 시간, 종목/초, 행/초, 제공자 호출 지연 p50/p99, 최대 RSS
+결과는 benchmarks/results/<시각>-<커밋>.json에 저장하고 --compare로 이전 결과와 비교한다.
+
+사용 예:
+    python benchmarks/run_benchmarks.py
+    python benchmarks/run_benchmarks.py --scenarios crypto bonds --symbols 50 --interval 1h --days 90
+    python benchmarks/run_benchmarks.py --latency 0.05 --error-rate 0.02 --compare benchmarks/results/baseline.json
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+PROJECT_ROOT = BENCH_DIR.parent
+RESULTS_DIR = BENCH_DIR / 'results'
+
+# 시장별 수집기 시나리오와 전체 수집 시나리오, 시작 시간 시나리오 (수집 없이 임포트와 관리자 생성만 측정)
+MARKET_SCENARIOS = ['stocks', 'commodities', 'forex', 'real_estate', 'bonds', 'crypto']
+SCENARIOS = ['manager', 'manager-sequential'] + MARKET_SCENARIOS + ['startup']
+
+# 합성 종목 이름 (시장별 종목 목록 키, 이름 형식)
+SYNTHETIC_SYMBOLS = {
+    'stocks': ('symbols', 'STK{:04d}'),
+    'commodities': ('symbols', 'CMD{:04d}=F'),
+    'forex': ('symbols', 'FX{:04d}=X'),
+    'real_estate': ('symbols', 'RE{:04d}'),
+    'bonds': ('series', 'SER{:04d}'),
+    'crypto': ('symbols', 'C{:04d}USDT')
+}
+
+# 비교할 지표와 좋아지는 방향 (1: 클수록 좋음, -1: 작을수록 좋음)
+COMPARED_METRICS = {
+    'wall_seconds': -1,
+    'symbols_per_second': 1,
+    'rows_per_second': 1,
+    'latency_p50': -1,
+    'latency_p99': -1,
+    'peak_rss_mb': -1
+}
+
+# 결과 출력에서 자식 프로세스의 다른 출력과 구분하는 접두사
+RESULT_PREFIX = 'BENCH_RESULT '
+
+
+def _parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Offline collection benchmarks against local fake providers')
+    parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=['manager', 'bonds', 'crypto', 'stocks'],
+                        help='scenarios to run (default: manager bonds crypto stocks)')
+    parser.add_argument('--symbols', type=int, default=20, help='synthetic symbols per market (0 keeps the built-in lists)')
+    parser.add_argument('--interval', default='1d', help='collection interval (e.g. 1m, 1h, 1d)')
+    parser.add_argument('--days', type=int, default=365, help='days of history to collect')
+    parser.add_argument('--end-date', default='2024-12-31', help='last day collected (fixed so runs are comparable)')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per scenario, the median is reported')
+    parser.add_argument('--latency', type=float, default=0.01, help='fake server response latency in seconds')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of requests answered with 503')
+    parser.add_argument('--rate-limit', type=float, default=0,
+                        help='fake server requests per second per provider, 0 for no limit (excess gets 429)')
+    parser.add_argument('--seed', type=int, default=0, help='seed for latency jitter and injected errors')
+    parser.add_argument('--keep-rate-limits', action='store_true',
+                        help='keep the configured client-side rate limits instead of lifting them')
+    parser.add_argument('--output', type=Path, help='result file (default: benchmarks/results/<time>-<commit>.json)')
+    parser.add_argument('--compare', type=Path, help='earlier result file to compare against')
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help='relative change flagged as a regression (default: 0.10)')
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+# 자식 프로세스 (시나리오 한 번 실행)
+
+def _install_fake_endpoints(url):
+    """수집기가 실제 API 대신 가짜 서버에 요청하도록 주소 교체"""
+    from binance.client import Client
+    from fetch_modules import fetch_bonds, yahoo_engine
+    from fetch_modules.http_pool import get_session
+    from fake_providers import make_fake_yfinance
+
+    fetch_bonds.FRED_API_URL = f'{url}/fred'
+    Client.API_URL = f'{url}/binance/api'
+    yahoo_engine.yf = make_fake_yfinance(url, lambda: get_session('yahoo'))
+
+
+def _seed_tracker(markets, count):
+    """시장마다 합성 종목 count개를 진행 상태에 등록 (수집기가 기본 목록을 만들기 전에)"""
+    from fetch_modules import resume_tracker
+
+    for market in markets:
+        key, pattern = SYNTHETIC_SYMBOLS[market]
+        resume_tracker.init_market(market, {
+            'last_fetch_date': None,
+            key: [pattern.format(index) for index in range(count)]
+        })
+
+
+def _run_startup():
+    """
+    main 임포트와 DataCollectionManager() 생성 시간 (수집기는 지연 로드)
+
+    이어서 모든 수집기를 로드하는 시간도 재서, 수집기를 시작할 때 모두 만들던 방식의
+    시작 시간(eager_startup_seconds)과 비교할 수 있게 한다.
+    """
+    sys.path.insert(0, str(PROJECT_ROOT / 'src'))
+    modules_before = len(sys.modules)
+
+    started = time.perf_counter()
+    import main
+    imported = time.perf_counter()
+    manager = main.DataCollectionManager()
+    created = time.perf_counter()
+    modules = len(sys.modules) - modules_before
+    startup_rss = _peak_rss_mb()
+
+    for market in manager.collectors:
+        manager.collectors.get(market)
+    loaded = time.perf_counter()
+
+    return {
+        'success': True,
+        'wall_seconds': round(created - started, 4),
+        'import_seconds': round(imported - started, 4),
+        'manager_seconds': round(created - imported, 4),
+        'modules_imported': modules,
+        'eager_load_seconds': round(loaded - created, 4),
+        'eager_startup_seconds': round(loaded - started, 4),
+        'stage_seconds': {},
+        'peak_rss_mb': startup_rss,
+        'eager_rss_mb': _peak_rss_mb()
+    }
+
+
+def _peak_rss_mb():
+    # 리눅스는 KB, macOS는 바이트 단위
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def _run_child(scenario, options):
+    if scenario == 'startup':
+        # 다른 모듈을 임포트하기 전에 측정
+        return _run_startup()
+
+    sys.path.insert(0, str(PROJECT_ROOT / 'src'))
+    sys.path.insert(0, str(BENCH_DIR))
+
+    from fetch_modules.config import config
+    from fetch_modules import metrics
+    from fetch_modules.registry import MARKETS, load_collector_class
+    from fetch_modules.storage import DERIVED_SEPARATOR
+
+    _install_fake_endpoints(os.environ['BENCH_SERVER_URL'])
+    markets = MARKETS if scenario.startswith('manager') else [scenario]
+    if options['symbols']:
+        _seed_tracker(markets, options['symbols'])
+    config.interval = options['interval']
+    end_date = options['end_date']
+    start_date = (datetime.strptime(end_date, '%Y-%m-%d') - timedelta(days=options['days'])).strftime('%Y-%m-%d')
+
+    started = time.perf_counter()
+    if scenario.startswith('manager'):
+        from main import DataCollectionManager
+
+        manager = DataCollectionManager(start_date, end_date, markets=markets)
+        manager.collect_all_data(concurrent=scenario == 'manager')
+        success = all(manager.results.get(market) for market in markets)
+    else:
+        from fetch_modules.storage import get_store
+
+        metrics.get_metrics().reset()
+        success = load_collector_class(scenario)().fetch_data(start_date, end_date)
+        get_store().wait_for_compaction()
+    wall = time.perf_counter() - started
+
+    registry = metrics.get_metrics()
+    summary = registry.summary()
+    # 롤업(market@interval) 기록은 수집한 데이터가 아니므로 제외
+    written = [item for item in summary['counters'].get('rows_written_total', [])
+               if DERIVED_SEPARATOR not in item['labels'].get('market', '')]
+    rows = sum(item['value'] for item in written)
+    symbols = len({(item['labels'].get('market'), item['labels'].get('symbol')) for item in written})
+    bytes_written = sum(item['value'] for item in summary['counters'].get('bytes_written_total', [])
+                        if DERIVED_SEPARATOR not in item['labels'].get('market', ''))
+    stages = {}
+    for item in summary['histograms'].get('stage_seconds', []):
+        stage = item['labels']['stage']
+        stages[stage] = round(stages.get(stage, 0.0) + item['sum'], 6)
+
+    return {
+        'success': bool(success),
+        'wall_seconds': round(wall, 4),
+        'rows': rows,
+        'symbols': symbols,
+        'rows_per_second': round(rows / wall, 2) if wall else 0.0,
+        'symbols_per_second': round(symbols / wall, 4) if wall else 0.0,
+        'provider_calls': sum(item['count'] for item in summary['histograms'].get('provider_request_seconds', [])),
+        'retries': registry.total('provider_retries_total'),
+        'errors': registry.total('provider_errors_total'),
+        'latency_p50': round(registry.quantile('provider_request_seconds', 0.5), 6),
+        'latency_p99': round(registry.quantile('provider_request_seconds', 0.99), 6),
+        'rate_limit_wait_seconds': round(registry.total('rate_limit_wait_seconds_total'), 4),
+        'bytes_written': bytes_written,
+        'stage_seconds': stages,
+        'peak_rss_mb': _peak_rss_mb()
+    }
+
+
+# 부모 프로세스 (서버 실행, 시나리오 반복, 결과 저장·비교)
+
+def _child_env(url, work_dir, args):
+    env = dict(os.environ)
+    env.update({
+        'BENCH_SERVER_URL': url,
+        'DATA_DIR': str(work_dir / 'datas'),
+        'LOG_DIR': str(work_dir / 'logs'),
+        'REPORT_DIR': str(work_dir / 'reports'),
+        'CACHE_DIR': str(work_dir / 'cache'),
+        'RESPONSE_CACHE': 'false',
+        'FRED_API_KEY': 'benchmark',
+        'BINANCE_API_KEY': 'benchmark',
+        'BINANCE_API_SECRET': 'benchmark',
+        'PYTHONHASHSEED': str(args.seed)
+    })
+    if not args.keep_rate_limits:
+        # 클라이언트 쪽 한도로 기다리는 시간은 빼고 수집 경로 자체를 측정
+        for name in ('YAHOO_RATE_LIMIT', 'FRED_RATE_LIMIT', 'BINANCE_RATE_LIMIT'):
+            env[name] = '1000000/1'
+    return env
+
+
+def _run_scenario(scenario, url, args):
+    options = {
+        'symbols': args.symbols,
+        'interval': args.interval,
+        'days': args.days,
+        'end_date': args.end_date
+    }
+    work_dir = Path(tempfile.mkdtemp(prefix=f'bench-{scenario}-'))
+    try:
+        process = subprocess.run(
+            [sys.executable, str(Path(__file__).resolve()), '--child', json.dumps({'scenario': scenario, **options})],
+            env=_child_env(url, work_dir, args),
+            cwd=str(work_dir),
+            capture_output=True,
+            text=True
+        )
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    for line in reversed(process.stdout.splitlines()):
+        if line.startswith(RESULT_PREFIX):
+            return json.loads(line[len(RESULT_PREFIX):])
+    raise RuntimeError(f"{scenario} benchmark failed (exit {process.returncode}):\n{process.stderr[-2000:]}")
+
+
+def _median_result(runs):
+    """반복 실행 결과의 중앙값 (숫자 지표만, 단계별 시간도 중앙값)"""
+    result = {'runs': runs, 'success': all(run['success'] for run in runs)}
+    for name, value in runs[0].items():
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            result[name] = round(statistics.median(run[name] for run in runs), 6)
+    stages = {stage for run in runs for stage in run['stage_seconds']}
+    result['stage_seconds'] = {
+        stage: round(statistics.median(run['stage_seconds'].get(stage, 0.0) for run in runs), 6)
+        for stage in sorted(stages)
+    }
+    return result
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=str(PROJECT_ROOT), capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def environment():
+    import numpy
+    import pandas
+    import pyarrow
+
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'pandas': pandas.__version__,
+        'numpy': numpy.__version__,
+        'pyarrow': pyarrow.__version__
+    }
+
+
+def compare(current, baseline, threshold, compared_metrics=COMPARED_METRICS):
+    """
+    시나리오·지표별 변화율과 회귀 여부
+
+    Args:
+        compared_metrics (dict): 비교할 지표와 좋아지는 방향
+
+    Returns:
+        list: [(시나리오, 지표, 이전 값, 현재 값, 변화율, 회귀 여부)]
+    """
+    rows = []
+    for scenario, result in current['results'].items():
+        before = baseline.get('results', {}).get(scenario)
+        if before is None:
+            continue
+        for name, direction in compared_metrics.items():
+            old, new = before.get(name), result.get(name)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            rows.append((scenario, name, old, new, change, change * direction < -threshold))
+    return rows
+
+
+def _print_results(report):
+    results = {scenario: result for scenario, result in report['results'].items() if scenario != 'startup'}
+    if results:
+        _print_collection_results(results)
+    if 'startup' in report['results']:
+        result = report['results']['startup']
+        print(f"\n{'startup':<20}{'import s':>10}{'manager s':>11}{'modules':>9}{'lazy s':>10}{'eager s':>10}")
+        print(f"{'':<20}{result['import_seconds']:>10.3f}{result['manager_seconds']:>11.4f}{result['modules_imported']:>9.0f}"
+              f"{result['wall_seconds']:>10.3f}{result['eager_startup_seconds']:>10.3f}")
+
+
+def _print_collection_results(results):
+    print(f"\n{'scenario':<20}{'wall s':>10}{'symbols/s':>12}{'rows/s':>12}{'p50 ms':>10}{'p99 ms':>10}{'RSS MB':>10}{'retries':>9}")
+    for scenario, result in results.items():
+        print(f"{scenario:<20}{result['wall_seconds']:>10.3f}{result['symbols_per_second']:>12.2f}"
+              f"{result['rows_per_second']:>12.0f}{result['latency_p50'] * 1000:>10.1f}{result['latency_p99'] * 1000:>10.1f}"
+              f"{result['peak_rss_mb']:>10.1f}{result['retries']:>9.0f}"
+              f"{'' if result['success'] else '  (collection failed)'}")
+
+
+def print_comparison(rows, baseline_file):
+    print(f"\nCompared with {baseline_file}")
+    for scenario, name, old, new, change, regressed in rows:
+        flag = '  REGRESSION' if regressed else ''
+        print(f"{scenario:<20}{name:<22}{old:>14.4f} -> {new:<14.4f}{change:>+9.1%}{flag}")
+
+
+def main(argv=None):
+    args = _parse_args(argv)
+    if args.child:
+        options = json.loads(args.child)
+        result = _run_child(options.pop('scenario'), options)
+        print(RESULT_PREFIX + json.dumps(result))
+        return 0
+
+    sys.path.insert(0, str(BENCH_DIR))
+    from fake_providers import FakeProviderServer
+
+    report = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'commit': git_commit(),
+        'environment': environment(),
+        'parameters': {
+            name: value for name, value in vars(args).items()
+            if name not in ('child', 'output', 'compare', 'threshold')
+        },
+        'results': {}
+    }
+    with FakeProviderServer(latency=args.latency, error_rate=args.error_rate, rate_limit=args.rate_limit, seed=args.seed) as server:
+        for scenario in args.scenarios:
+            runs = []
+            for attempt in range(args.repeat):
+                print(f"{scenario} run {attempt + 1}/{args.repeat}...", flush=True)
+                runs.append(_run_scenario(scenario, server.url, args))
+            report['results'][scenario] = _median_result(runs)
+        report['server'] = server.stats()
+
+    output = args.output or RESULTS_DIR / f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{report['commit']}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2, default=str)
+    _print_results(report)
+    print(f"\nResults saved to {output}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        rows = compare(report, baseline, args.threshold)
+        print_comparison(rows, args.compare)
+        changed = sorted(
+            name for name, value in report['parameters'].items()
+            if name != 'scenarios' and baseline.get('parameters', {}).get(name) != value
+        )
+        if changed:
+            print(f"Warning: parameters differ from the baseline ({', '.join(changed)}), results may not be comparable")
+        if any(regressed for *_, regressed in rows):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,408 @@
+"""
+저장소 마이크로벤치마크 (합성 1분봉 데이터, 1백만~1억 행)
+
+수집기 없이 저장 경로만 측정한다. 크기마다 임시 디렉토리에 crypto 데이터셋을 만들고
+작업을 순서대로 각각 새 프로세스에서 실행하여 작업별 소요 시간과 최대 메모리를 잰다.
+
+작업:
+    append                  백필: 종목별 CHECKPOINT_WINDOW_CANDLES 단위로 delta 파일 추가
+    compact                 모든 파티션의 delta를 base.parquet로 병합
+    load                    시장 전체 로드 (중복 제거 포함)
+    load_symbol_day         한 종목의 하루 (파티션·row group·컬럼 pushdown)
+    dictionary              데이터 사전 통계 (빈 통계 캐시)
+    append_day              모든 종목에 하루치 추가 (매일 실행하는 증분 수집)
+    dictionary_incremental  하루치 추가 후 통계 캐시로 다시 계산
+    legacy_merge            이전 방식: 시장 파일 하나를 read_parquet → concat → drop_duplicates → to_parquet
+    legacy_dictionary       이전 방식: 시장 파일 전체를 읽어 analyze_dataframe
+
+행 수는 종목 수 × 기간이므로 크기를 늘리면 같은 종목의 기록 기간이 길어진다.
+크기별 결과로 작업마다 행 수에 대한 증가 지수(로그-로그 기울기)를 계산한다 (1이면 선형).
+
+사용 예:
+    python benchmarks/storage_benchmarks.py --rows 1000000 10000000
+    python benchmarks/storage_benchmarks.py --rows 100000000 --symbols 300 --operations append compact load
+"""
+import argparse
+import json
+import math
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+PROJECT_ROOT = BENCH_DIR.parent
+
+sys.path.insert(0, str(BENCH_DIR))
+from run_benchmarks import RESULTS_DIR, compare, environment, git_commit, print_comparison  # noqa: E402
+
+MARKET = 'crypto'
+
+# 실행 순서 (뒤의 작업은 앞의 작업이 만든 데이터셋을 사용)
+OPERATIONS = [
+    'append',
+    'compact',
+    'load',
+    'load_symbol_day',
+    'dictionary',
+    'append_day',
+    'dictionary_incremental',
+    'legacy_merge',
+    'legacy_dictionary'
+]
+
+# 이전 방식 작업 전에 (측정하지 않고) 시장 파일 하나를 만드는 준비 작업
+LEGACY_SETUP = 'legacy_setup'
+
+# 작업마다 먼저 실행해야 하는 작업 (선택하지 않았으면 측정하지 않고 실행)
+PREREQUISITES = {
+    'compact': ['append'],
+    'load': ['append', 'compact'],
+    'load_symbol_day': ['append', 'compact'],
+    'dictionary': ['append', 'compact'],
+    'append_day': ['append', 'compact'],
+    'dictionary_incremental': ['append', 'compact', 'dictionary', 'append_day'],
+    'legacy_merge': [LEGACY_SETUP],
+    'legacy_dictionary': [LEGACY_SETUP]
+}
+
+# 비교할 지표와 좋아지는 방향
+COMPARED_METRICS = {
+    'seconds': -1,
+    'peak_delta_mb': -1
+}
+
+# 마지막 기록 시각 (고정하여 실행끼리 같은 데이터를 만듦)
+END = datetime(2024, 12, 31, tzinfo=timezone.utc)
+
+RESULT_PREFIX = 'BENCH_RESULT '
+
+
+def _parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Storage-layer microbenchmarks on synthetic 1m bars')
+    parser.add_argument('--rows', nargs='+', type=float, default=[1e6, 1e7],
+                        help='dataset sizes in rows (default: 1e6 1e7)')
+    parser.add_argument('--symbols', type=int, default=100, help='symbols in the dataset')
+    parser.add_argument('--operations', nargs='+', choices=OPERATIONS, default=OPERATIONS,
+                        help='operations to measure (prerequisites run unmeasured when skipped)')
+    parser.add_argument('--output', type=Path,
+                        help='result file (default: benchmarks/results/storage-<time>-<commit>.json)')
+    parser.add_argument('--compare', type=Path, help='earlier result file to compare against')
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help='relative change flagged as a regression (default: 0.10)')
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+# 합성 데이터
+
+def synthetic_frames(symbols, first, count, chunk_rows):
+    """
+    종목별 1분봉을 chunk_rows 행씩 DataFrame으로 반환
+
+    한 번에 한 덩어리만 만들므로 데이터셋 크기와 무관하게 메모리를 적게 쓴다.
+    같은 시각에는 항상 같은 값이므로 겹치는 구간을 다시 만들면 기존 행과 같다.
+
+    Args:
+        symbols (int): 종목 수
+        first (int): 첫 캔들 시각 (UNIX 초)
+        count (int): 종목당 캔들 수
+        chunk_rows (int): 반환할 DataFrame 한 개의 최대 행 수
+
+    Yields:
+        DataFrame: date(UTC), symbol, open, high, low, close, volume
+    """
+    import numpy as np
+    import pandas as pd
+    from fake_providers import synthetic_bars
+
+    for index in range(symbols):
+        symbol = f'C{index:04d}USDT'
+        for offset in range(0, count, chunk_rows):
+            seconds = first + np.arange(offset, min(offset + chunk_rows, count), dtype=np.int64) * 60
+            bars = synthetic_bars(symbol, seconds)
+            df = pd.DataFrame({'date': pd.to_datetime(seconds, unit='s', utc=True), 'symbol': symbol, **bars})
+            df['volume'] = df['volume'].astype('float64')
+            yield df
+
+
+def _history(symbols, minutes, chunk_rows):
+    """END까지 종목당 minutes개 캔들"""
+    return synthetic_frames(symbols, int(END.timestamp()) - minutes * 60, minutes, chunk_rows)
+
+
+def _next_day(symbols):
+    """기록의 마지막 캔들부터 하루치 (마지막 캔들은 다시 받아 덮어쓰는 증분 수집과 같음)"""
+    return list(synthetic_frames(symbols, int(END.timestamp()) - 60, 1441, 1441))
+
+
+# 자식 프로세스 (작업 하나)
+
+def _rss_mb():
+    """현재 RSS (MB, 리눅스는 /proc에서 읽고 그 외에는 최대 RSS로 대신함)"""
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except OSError:
+        return _peak_rss_mb()
+
+
+def _peak_rss_mb():
+    # 리눅스는 KB, macOS는 바이트 단위
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+
+def _run_operation(operation, options):
+    """
+    작업 준비 (입력 생성 등은 측정 전에 끝냄)
+
+    Returns:
+        callable: 측정할 함수 (처리한 행 수를 반환)
+    """
+    import pandas as pd
+    from fetch_modules.config import CHECKPOINT_WINDOW_CANDLES, data_dir
+    from fetch_modules.storage import ParquetStore, get_store
+
+    symbols, minutes = options['symbols'], options['minutes']
+    legacy_file = Path(options['work_dir']) / 'legacy' / f'{MARKET}.parquet'
+
+    if operation == 'append':
+        # 병합은 compact 작업에서 따로 측정
+        store = ParquetStore(compact_threshold=sys.maxsize)
+
+        def run():
+            for df in _history(symbols, minutes, CHECKPOINT_WINDOW_CANDLES):
+                store.append(MARKET, df)
+            return symbols * minutes
+        return run
+
+    if operation == 'compact':
+        def run():
+            get_store().compact(MARKET)
+            return symbols * minutes
+        return run
+
+    if operation == 'load':
+        def run():
+            return get_store().load(MARKET).num_rows
+        return run
+
+    if operation == 'load_symbol_day':
+        day = pd.Timestamp(END) - pd.Timedelta(days=min(30, max(minutes // 1440 - 1, 0)))
+
+        def run():
+            table = get_store().load(MARKET, symbols=['C0000USDT'], start=day, end=day + pd.Timedelta(days=1),
+                                     columns=['close'])
+            return table.num_rows if table is not None else 0
+        return run
+
+    if operation in ('dictionary', 'dictionary_incremental'):
+        sys.path.insert(0, str(PROJECT_ROOT))
+        from data_dictionary_generator import DataDictionaryGenerator
+
+        generator = DataDictionaryGenerator(data_dir=data_dir)
+
+        def run():
+            analysis = generator.analyze_market(MARKET)
+            generator.stats_cache.save()
+            return analysis['row_count']
+        return run
+
+    if operation == 'append_day':
+        frames = _next_day(symbols)
+
+        def run():
+            for df in frames:
+                get_store().append(MARKET, df)
+            get_store().wait_for_compaction()
+            return sum(len(df) for df in frames)
+        return run
+
+    if operation == LEGACY_SETUP:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        def run():
+            # 이전 수집기와 같이 pandas 형식(datetime64[ns], 문자열 종목)의 파일 하나
+            legacy_file.parent.mkdir(parents=True, exist_ok=True)
+            writer = None
+            for df in _history(symbols, minutes, CHECKPOINT_WINDOW_CANDLES):
+                table = pa.Table.from_pandas(df, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(legacy_file, table.schema)
+                writer.write_table(table)
+            writer.close()
+            return symbols * minutes
+        return run
+
+    if operation == 'legacy_merge':
+        frames = _next_day(symbols)
+
+        def run():
+            existing = pd.read_parquet(legacy_file)
+            combined = pd.concat([existing] + frames, ignore_index=True)
+            combined = combined.drop_duplicates(subset=['date', 'symbol'], keep='last')
+            combined = combined.sort_values(['symbol', 'date']).reset_index(drop=True)
+            combined.to_parquet(legacy_file)
+            return len(combined)
+        return run
+
+    if operation == 'legacy_dictionary':
+        sys.path.insert(0, str(PROJECT_ROOT))
+        from data_dictionary_generator import DataDictionaryGenerator
+
+        generator = DataDictionaryGenerator(data_dir=data_dir, use_cache=False)
+
+        def run():
+            return generator.analyze_dataframe(pd.read_parquet(legacy_file))['row_count']
+        return run
+
+    raise ValueError(f"Unknown operation: {operation}")
+
+
+def _run_child(operation, options):
+    sys.path.insert(0, str(PROJECT_ROOT / 'src'))
+    run = _run_operation(operation, options)
+    before = _rss_mb()
+    started = time.perf_counter()
+    rows = run()
+    seconds = time.perf_counter() - started
+    peak = _peak_rss_mb()
+    return {
+        'seconds': round(seconds, 4),
+        'rows': rows,
+        'rows_per_second': round(rows / seconds, 1) if seconds else 0.0,
+        'peak_rss_mb': round(peak, 1),
+        # 작업 전 RSS(인터프리터, 라이브러리, 준비한 입력)를 뺀 증가분
+        'peak_delta_mb': round(max(peak - before, 0.0), 1)
+    }
+
+
+# 부모 프로세스
+
+def _plan(operations):
+    """선택한 작업과 그 앞 작업을 실행 순서대로 [(작업, 측정 여부)]"""
+    selected = set(operations)
+    needed = set()
+    for operation in selected:
+        needed.update(PREREQUISITES.get(operation, []))
+    return [
+        (operation, operation in selected)
+        for operation in OPERATIONS[:7] + [LEGACY_SETUP] + OPERATIONS[7:]
+        if operation in selected or operation in needed
+    ]
+
+
+def _run_child_process(operation, options, work_dir):
+    env = dict(os.environ)
+    env.update({
+        'DATA_DIR': str(work_dir / 'datas'),
+        'LOG_DIR': str(work_dir / 'logs'),
+        'REPORT_DIR': str(work_dir / 'reports'),
+        'CACHE_DIR': str(work_dir / 'cache')
+    })
+    process = subprocess.run(
+        [sys.executable, str(Path(__file__).resolve()), '--child', json.dumps({'operation': operation, **options})],
+        env=env,
+        cwd=str(work_dir),
+        capture_output=True,
+        text=True
+    )
+    for line in reversed(process.stdout.splitlines()):
+        if line.startswith(RESULT_PREFIX):
+            return json.loads(line[len(RESULT_PREFIX):])
+    raise RuntimeError(f"{operation} failed (exit {process.returncode}):\n{process.stderr[-2000:]}")
+
+
+def growth(results, operation, sizes):
+    """
+    작업 시간의 행 수에 대한 증가 지수 (log(시간)과 log(행 수)의 최소제곱 기울기)
+
+    1이면 행 수에 비례, 0이면 기록 기간과 무관 (크기가 하나뿐이면 None)
+    """
+    points = [
+        (math.log(size), math.log(results[f'{operation}@{size}']['seconds']))
+        for size in sizes
+        if f'{operation}@{size}' in results and results[f'{operation}@{size}']['seconds'] > 0
+    ]
+    if len(points) < 2:
+        return None
+    mean_x = sum(x for x, _ in points) / len(points)
+    mean_y = sum(y for _, y in points) / len(points)
+    spread = sum((x - mean_x) ** 2 for x, _ in points)
+    if not spread:
+        return None
+    return round(sum((x - mean_x) * (y - mean_y) for x, y in points) / spread, 3)
+
+
+def _print_results(report):
+    sizes = report['parameters']['rows']
+    print(f"\n{'operation':<24}{'rows':>13}{'seconds':>11}{'rows/s':>14}{'peak MB':>10}{'+MB':>10}")
+    for operation in report['parameters']['operations']:
+        for size in sizes:
+            result = report['results'].get(f'{operation}@{size}')
+            if result is None:
+                continue
+            print(f"{operation:<24}{size:>13,}{result['seconds']:>11.3f}{result['rows_per_second']:>14,.0f}"
+                  f"{result['peak_rss_mb']:>10.1f}{result['peak_delta_mb']:>10.1f}")
+    if len(sizes) > 1:
+        print("\nTime growth with history length (1.0 = linear, 0 = independent of history)")
+        for operation, exponent in report['growth'].items():
+            if exponent is not None:
+                print(f"{operation:<24}{exponent:>6.2f}")
+
+
+def main(argv=None):
+    args = _parse_args(argv)
+    if args.child:
+        options = json.loads(args.child)
+        result = _run_child(options.pop('operation'), options)
+        print(RESULT_PREFIX + json.dumps(result))
+        return 0
+
+    sizes = sorted({int(rows) for rows in args.rows})
+    report = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'commit': git_commit(),
+        'environment': environment(),
+        'parameters': {'rows': sizes, 'symbols': args.symbols, 'operations': args.operations},
+        'results': {}
+    }
+    plan = _plan(args.operations)
+    for size in sizes:
+        options = {'symbols': args.symbols, 'minutes': max(size // args.symbols, 1)}
+        work_dir = Path(tempfile.mkdtemp(prefix=f'bench-storage-{size}-'))
+        try:
+            options['work_dir'] = str(work_dir)
+            for operation, measured in plan:
+                print(f"{operation} ({size:,} rows){'' if measured else ' [setup]'}...", flush=True)
+                result = _run_child_process(operation, options, work_dir)
+                if measured:
+                    report['results'][f'{operation}@{size}'] = result
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+    report['growth'] = {operation: growth(report['results'], operation, sizes) for operation in args.operations}
+
+    output = args.output or RESULTS_DIR / f"storage-{datetime.now().strftime('%Y%m%d-%H%M%S')}-{report['commit']}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    _print_results(report)
+    print(f"\nResults saved to {output}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            rows = compare(report, json.load(f), args.threshold, COMPARED_METRICS)
+        print_comparison(rows, args.compare)
+        if any(regressed for *_, regressed in rows):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
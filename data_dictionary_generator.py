@@ -1,16 +1,28 @@
 import json
 import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import pandas as pd
 from pathlib import Path
 import numpy as np
 from datetime import timedelta
 
+# 수집 모듈의 저장소 사용을 위한 경로 추가
+sys.path.append(str(Path(__file__).parent / 'src'))
+
+from fetch_modules.storage import ParquetStore
+from fetch_modules.parquet_stats import StatsCache, market_stats
+
 class DataDictionaryGenerator:
-    def __init__(self, data_dir: str = "datas"):
+    def __init__(self, data_dir: str = "datas", use_cache: bool = True):
         self.data_dir = Path(data_dir)
         self.data_range_file = self.data_dir / "data_range.json"
         self.resume_tracker_file = self.data_dir / "resume_tracker.json"
+        self.stats_cache_file = self.data_dir / "dictionary_stats.json"
+        self.store = ParquetStore(root=self.data_dir)
+        # 파티션별 통계 캐시 (바뀐 파티션만 다시 계산)
+        self.stats_cache = StatsCache(self.stats_cache_file) if use_cache else None
         
     def load_data_range(self) -> dict:
         """data_range.json 파일을 로드합니다."""
@@ -49,19 +61,30 @@ class DataDictionaryGenerator:
         
         return analysis
     
-    def get_parquet_info(self, file_path: Path, market: str, collection_frequency: str) -> dict:
-        """parquet 파일의 정보를 가져옵니다."""
+    def analyze_market(self, market: str) -> dict:
+        """
+        시장 데이터셋을 전부 로드하지 않고 analyze_dataframe()과 같은 정보를 계산합니다.
+
+        최소·최대·null 수·행 수는 Parquet footer 통계에서 읽고,
+        평균·표준편차는 row group 하나씩 읽으며 누적합니다.
+        이전 실행 이후 바뀌지 않은 파티션은 캐시된 누적값을 병합합니다.
+        """
+        return market_stats(self.store, market, self.stats_cache).to_analysis()
+
+    def get_parquet_info(self, file_path: Path, market: str, collection_frequency: str, rate_limits: dict = None,
+                         resume_tracker: dict = None) -> dict:
+        """시장 데이터셋의 정보를 가져옵니다."""
         try:
-            df = pd.read_parquet(file_path)
-            analysis = self.analyze_dataframe(df)
+            analysis = self.analyze_market(market)
             
             # resume_tracker에서 마지막 수집 날짜 확인
-            resume_tracker = self.load_resume_tracker()
+            if resume_tracker is None:
+                resume_tracker = self.load_resume_tracker()
             last_fetch_date = resume_tracker[market]["last_fetch_date"] if market in resume_tracker else None
             
             analysis.update({
                 "collection_frequency": collection_frequency,
-                "api_call_interval": "5S",
+                "rate_limits": rate_limits or {},
                 "last_fetch_date": last_fetch_date
             })
             return analysis
@@ -92,35 +115,49 @@ class DataDictionaryGenerator:
                 "collection": {
                     "method": "API 호출",
                     "data_format": "parquet",
-                    "api_call_interval": "5S"  # API 호출 간격은 5초로 고정
+                    "rate_limits": data_range.get("rate_limits", {})  # 제공자별 요청 한도
                 },
                 "storage": {
                     "location": str(self.data_dir),
-                    "file_naming": "{market_name}.parquet"
+                    "file_naming": "{market_name}/{symbol}/{year}/*.parquet"
                 }
             }
         }
         
-        # 각 시장별 정보 추가
-        for market, info in data_range["markets"].items():
-            if info["file_exists"]:
-                file_path = Path(info["file_path"])
-                data_info = self.get_parquet_info(
-                    file_path, 
+        # 시장별 통계는 서로 독립적이므로 병렬로 계산 (pyarrow는 읽기·집계 중 GIL을 해제함)
+        resume_tracker = self.load_resume_tracker()
+        markets = {market: info for market, info in data_range["markets"].items() if info["file_exists"]}
+        with ThreadPoolExecutor(max_workers=max(len(markets), 1), thread_name_prefix='dictionary') as executor:
+            futures = {
+                market: executor.submit(
+                    self.get_parquet_info,
+                    Path(info["file_path"]),
                     market,
-                    data_range["data_collection_frequency"]
+                    data_range["data_collection_frequency"],
+                    data_range.get("rate_limits"),
+                    resume_tracker
                 )
-                
-                if data_info:
-                    dictionary["markets"][market] = {
-                        "description": f"{market} 시장 데이터",
-                        "file_name": f"{market}.parquet",
-                        "data_analysis": data_info,
-                        "file_info": {
-                            "path": str(file_path),
-                            "last_modified": datetime.fromtimestamp(file_path.stat().st_mtime).strftime("%Y-%m-%d %H:%M:%S")
-                        }
+                for market, info in markets.items()
+            }
+        if self.stats_cache is not None:
+            self.stats_cache.save()
+
+        # 각 시장별 정보 추가
+        for market, info in markets.items():
+            file_path = Path(info["file_path"])
+            data_info = futures[market].result()
+            if data_info:
+                # 데이터 파일이 없는 시장은 수정 시각이 없음
+                modified = self.store.last_modified(market)
+                dictionary["markets"][market] = {
+                    "description": f"{market} 시장 데이터",
+                    "file_name": market,
+                    "data_analysis": data_info,
+                    "file_info": {
+                        "path": str(file_path),
+                        "last_modified": datetime.fromtimestamp(modified).strftime("%Y-%m-%d %H:%M:%S") if modified else "n/a"
                     }
+                }
         
         return dictionary
     
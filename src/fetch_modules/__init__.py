@@ -1,14 +1,8 @@
 """
 데이터 수집 모듈 패키지
-"""
 
-from .fetch_stocks import StockDataFetcher
-from .fetch_commodities import CommodityDataFetcher
-from .fetch_bonds import BondDataFetcher
-from .fetch_forex import ForexDataFetcher
-from .fetch_crypto import CryptoDataFetcher
-from .fetch_real_estate import RealEstateDataFetcher
-from .config import get_logger
+수집기 클래스는 처음 접근할 때 임포트한다 (yfinance, python-binance 로딩을 필요할 때까지 미룸).
+"""
 
 __all__ = [
     'StockDataFetcher',
@@ -19,36 +13,13 @@ __all__ = [
     'RealEstateDataFetcher'
 ]
 
-import os
-from pathlib import Path
-import logging
-from dotenv import load_dotenv
-
-# 환경 변수 로드
-load_dotenv()
-
-# 프로젝트 루트 디렉토리 설정
-current_dir = Path(__file__).parent
-project_root = current_dir.parent.parent
-
-# 디렉토리 설정
-data_dir = project_root / 'datas'
-log_dir = project_root / 'logs'
-report_dir = project_root / 'reports'
-
-# 디렉토리 생성
-for directory in [data_dir, log_dir, report_dir]:
-    directory.mkdir(parents=True, exist_ok=True)
-
-# 모듈별 로거 가져오기
-logger = get_logger('fetch_modules')
 
-# 로깅 설정
-logging.basicConfig(
-    filename=str(log_dir / 'error_log.txt'),
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
+def __getattr__(name):
+    from .registry import COLLECTORS, load_collector_class
 
-# 공통 설정
-TRACKER_FILE = data_dir / 'resume_tracker.json' 
\ No newline at end of file
+    for market, (_, class_name, _) in COLLECTORS.items():
+        if class_name == name:
+            collector_class = load_collector_class(market)
+            globals()[name] = collector_class
+            return collector_class
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,32 +1,43 @@
 import os
 from pathlib import Path
 import logging
+from logging.handlers import RotatingFileHandler
 from dotenv import load_dotenv
 
-# 환경 변수 로드
+# 환경 변수 로드 (패키지 전체에서 이 모듈이 한 번만 로드)
 load_dotenv()
 
 # 프로젝트 루트 디렉토리 설정
 current_dir = Path(__file__).parent
 project_root = current_dir.parent.parent
 
-# 디렉토리 설정
-data_dir = project_root / 'datas'
-log_dir = project_root / 'logs'
-report_dir = project_root / 'reports'
+# 디렉토리 설정 (환경 변수로 다른 위치 지정 가능, 예: 벤치마크용 임시 디렉토리)
+data_dir = Path(os.getenv('DATA_DIR') or project_root / 'datas')
+log_dir = Path(os.getenv('LOG_DIR') or project_root / 'logs')
+report_dir = Path(os.getenv('REPORT_DIR') or project_root / 'reports')
+cache_dir = Path(os.getenv('CACHE_DIR') or project_root / 'cache') / 'responses'
 
 # 디렉토리 생성
 for directory in [data_dir, log_dir, report_dir]:
     directory.mkdir(parents=True, exist_ok=True)
 
+# 로그 파일 순환 (파일당 최대 크기, 보관할 이전 파일 수) - 실행 로그와 실행 이벤트 로그 공용
+LOG_MAX_BYTES = int(os.getenv('LOG_MAX_MB', '10')) * 1024 * 1024
+LOG_BACKUP_COUNT = int(os.getenv('LOG_BACKUP_COUNT', '5'))
+
 # 로깅 설정
 def setup_logging():
     """중앙 로깅 설정"""
+    handler = RotatingFileHandler(
+        str(log_dir / 'error_log.txt'),
+        maxBytes=LOG_MAX_BYTES,
+        backupCount=LOG_BACKUP_COUNT,
+        encoding='utf-8'
+    )
     logging.basicConfig(
-        filename=str(log_dir / 'error_log.txt'),
+        handlers=[handler],
         level=logging.INFO,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        encoding='utf-8'
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
     )
 
 def get_logger(module_name: str) -> logging.Logger:
@@ -48,12 +59,111 @@ setup_logging()
 # 공통 설정
 TRACKER_FILE = data_dir / 'resume_tracker.json'
 
+# 제공자별 요청 한도 설정
+def _parse_rate_limit(value, default):
+    """'요청수/초' 형식의 문자열을 (요청수, 초) 튜플로 변환"""
+    if not value:
+        return default
+    try:
+        requests, window = value.split('/')
+        return int(requests), float(window)
+    except ValueError:
+        return default
+
+# (윈도우당 요청 수, 윈도우 길이(초)) - 환경 변수 YAHOO_RATE_LIMIT=60/60 형식으로 변경 가능
+RATE_LIMITS = {
+    'yahoo': _parse_rate_limit(os.getenv('YAHOO_RATE_LIMIT'), (60, 60.0)),
+    'fred': _parse_rate_limit(os.getenv('FRED_RATE_LIMIT'), (120, 60.0)),      # FRED 공식 한도: 분당 120회
+    'binance': _parse_rate_limit(os.getenv('BINANCE_RATE_LIMIT'), (1200, 60.0)) # Binance 요청 가중치: 분당 1200
+}
+
+# 요청 실패 후 같은 제공자에 다시 요청하기 전 대기 시간(초)
+RATE_LIMIT_BACKOFF = float(os.getenv('RATE_LIMIT_BACKOFF', '5'))
+
+# 재시도 정책 (지수 백오프 + jitter, Retry-After가 있으면 그 값을 따름)
+RETRY_MAX_ATTEMPTS = int(os.getenv('RETRY_MAX_ATTEMPTS', '4'))
+RETRY_BASE_DELAY = float(os.getenv('RETRY_BASE_DELAY', '1'))     # 초
+RETRY_MAX_DELAY = float(os.getenv('RETRY_MAX_DELAY', '60'))      # 초
+
+# 제공자별 회로 차단기: 연속 실패가 이 횟수에 이르면 일정 시간 호출을 멈춤
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv('CIRCUIT_FAILURE_THRESHOLD', '5'))
+CIRCUIT_RESET_TIMEOUT = float(os.getenv('CIRCUIT_RESET_TIMEOUT', '120'))  # 초
+
+# yf.download 한 번에 묶어 요청할 종목 수
+YAHOO_BATCH_SIZE = int(os.getenv('YAHOO_BATCH_SIZE', '50'))
+
+# Parquet 저장 형식 (압축 코덱과 수준, row group당 행 수)
+PARQUET_COMPRESSION = os.getenv('PARQUET_COMPRESSION', 'zstd')
+PARQUET_COMPRESSION_LEVEL = int(os.getenv('PARQUET_COMPRESSION_LEVEL', '3'))
+PARQUET_ROW_GROUP_SIZE = int(os.getenv('PARQUET_ROW_GROUP_SIZE', '131072'))
+
+# 파티션별 delta 파일이 이 개수 이상 쌓이면 백그라운드에서 병합
+COMPACT_THRESHOLD = int(os.getenv('COMPACT_THRESHOLD', '8'))
+
+# 긴 구간을 수집할 때 이 캔들 수마다 저장하고 진행 상태 기록
+CHECKPOINT_WINDOW_CANDLES = int(os.getenv('CHECKPOINT_WINDOW_CANDLES', '50000'))
+
+# Binance kline 페이지를 동시에 요청하는 스레드 수
+KLINE_WORKERS = int(os.getenv('KLINE_WORKERS', '4'))
+
+# 수집 파이프라인 (받기 → 변환 → 저장)
+# 변환·Parquet 인코딩을 실행할 프로세스 수 (0이면 프로세스 없이 별도 스레드 하나에서 실행, 기본값은 코어 수 - 1, 최대 4)
+PIPELINE_PROCESSES = int(os.getenv('PIPELINE_PROCESSES') or min(4, max((os.cpu_count() or 1) - 1, 0)))
+# 변환 중이거나 저장을 기다리는 항목이 이 개수에 이르면 받기 단계가 대기
+PIPELINE_QUEUE_SIZE = int(os.getenv('PIPELINE_QUEUE_SIZE', '4'))
+
+# kline의 quote_volume, trades, 테이커 매수 거래량 컬럼도 저장할지 여부
+KLINE_EXTRA_COLUMNS = os.getenv('KLINE_EXTRA_COLUMNS', 'false').lower() in ('1', 'true', 'yes')
+
+# HTTP 연결 풀 (제공자 세션 공용)
+def _parse_pool_sizes(value):
+    """'host=size,host=size' 형식의 문자열을 딕셔너리로 변환"""
+    sizes = {}
+    for item in value.split(','):
+        host, _, size = item.partition('=')
+        if host.strip() and size.strip().isdigit():
+            sizes[host.strip()] = int(size)
+    return sizes
+
+HTTP_POOL_MAXSIZE = int(os.getenv('HTTP_POOL_MAXSIZE', '10'))  # 호스트당 유지할 연결 수
+HTTP_POOL_SIZES = _parse_pool_sizes(os.getenv(                  # 호스트별 연결 수 (동시 요청이 많은 호스트)
+    'HTTP_POOL_SIZES',
+    'query1.finance.yahoo.com=20,query2.finance.yahoo.com=20,api.binance.com=16'
+))
+HTTP_CONNECT_TIMEOUT = float(os.getenv('HTTP_CONNECT_TIMEOUT', '5'))  # 초
+HTTP_READ_TIMEOUT = float(os.getenv('HTTP_READ_TIMEOUT', '30'))       # 초
+HTTP_GZIP = os.getenv('HTTP_GZIP', 'true').lower() in ('1', 'true', 'yes')
+
+# 제공자 응답 디스크 캐시 (확정된 과거 구간은 만료 없음, 최근 구간은 TTL 적용, 크기 초과 시 LRU 삭제)
+RESPONSE_CACHE_ENABLED = os.getenv('RESPONSE_CACHE', 'true').lower() in ('1', 'true', 'yes')
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv('RESPONSE_CACHE_MAX_MB', '1024')) * 1024 * 1024
+RESPONSE_CACHE_OPEN_TTL = int(os.getenv('RESPONSE_CACHE_OPEN_TTL', '900'))  # 초
+
+# 기준 간격 데이터에서 로컬로 만들어 둘 파생 간격 (기준 간격보다 긴 것만 생성)
+RESAMPLE_INTERVALS = [interval.strip() for interval in os.getenv('RESAMPLE_INTERVALS', '1h,1d,1w,1mo').split(',') if interval.strip()]
+
+# 데몬 모드의 시장별 수집 주기 (시장=주기, 단위: S(초), M(분), H(시간), D(일), W(주), MO(달), Y(년))
+COLLECTION_SCHEDULE = os.getenv(
+    'COLLECTION_SCHEDULE',
+    'stocks=1D,commodities=1D,bonds=1D,forex=1D,crypto=1H,real_estate=1D'
+)
+
+# 실행 이벤트 로그 (JSON lines, 실행마다 run id 부여) 와 최근 실행 목록
+RUN_EVENTS_FILE = log_dir / 'run_events.jsonl'
+RUN_INDEX_FILE = log_dir / 'run_index.json'
+RUN_INDEX_LIMIT = int(os.getenv('RUN_INDEX_LIMIT', '500'))  # 목록에 남길 최근 실행 수
+
+# 마지막 실행의 메트릭 (Prometheus 텍스트 파일과 JSON 요약, data_range.json과 같은 위치)
+METRICS_FILE = data_dir / 'metrics.prom'
+RUN_SUMMARY_FILE = data_dir / 'run_summary.json'
+
 # 데이터 수집 설정
 class DataCollectionConfig:
     def __init__(self):
         self._interval = '1mo'  # 기본값
         self._start_date = None
         self._end_date = None
+        self._symbols = None  # None이면 시장에 등록된 모든 종목
         self._data_dir = data_dir
 
     @property
@@ -64,39 +174,41 @@ class DataCollectionConfig:
     def interval(self, value):
         self._interval = value
 
-    def get_yfinance_interval(self):
-        """yfinance API용 interval 형식"""
+    def get_yfinance_interval(self, interval=None):
+        """yfinance API용 interval 형식 (interval을 주지 않으면 설정된 간격)"""
         # yfinance는 소문자 사용
-        return self._interval.lower()
+        return (interval or self._interval).lower()
 
-    def get_binance_interval(self):
-        """Binance API용 interval 형식"""
+    def get_binance_interval(self, interval=None):
+        """Binance API용 interval 형식 (interval을 주지 않으면 설정된 간격)"""
+        interval = interval or self._interval
         # Binance는 대문자 사용
-        value = float(self._interval[:-1])
-        unit = self._interval[-1].upper()
+        value = float(interval[:-1])
+        unit = interval[-1].upper()
         
         if unit == 'D':
             return f"{int(value)}D"
         elif unit == 'W':
             return f"{int(value)}W"
-        elif unit == 'M' and self._interval[-2] != 'o':  # 분(M)과 월(mo) 구분
+        elif unit == 'M' and interval[-2] != 'o':  # 분(M)과 월(mo) 구분
             return f"{int(value)}M"
         elif unit == 'H':
             return f"{int(value)}H"
-        elif self._interval.endswith('mo'):
+        elif interval.endswith('mo'):
             return '1M'  # Binance는 월간 데이터를 '1M'으로 표현
         return '1D'  # 기본값
 
-    def get_fred_interval(self):
-        """FRED API용 interval 형식"""
+    def get_fred_interval(self, interval=None):
+        """FRED API용 interval 형식 (interval을 주지 않으면 설정된 간격)"""
+        interval = interval or self._interval
         # FRED는 소문자 한 글자 사용
-        if self._interval.endswith('mo'):
+        if interval.endswith('mo'):
             return 'm'
-        elif self._interval.endswith('d'):
+        elif interval.endswith('d'):
             return 'd'
-        elif self._interval.endswith('w'):
+        elif interval.endswith('w'):
             return 'w'
-        elif self._interval.endswith('y'):
+        elif interval.endswith('y'):
             return 'a'
         return 'd'  # 기본값
 
@@ -116,6 +228,20 @@ class DataCollectionConfig:
     def end_date(self, value):
         self._end_date = value
 
+    @property
+    def symbols(self):
+        return self._symbols
+
+    @symbols.setter
+    def symbols(self, value):
+        self._symbols = set(value) if value else None
+
+    def select_symbols(self, symbols):
+        """시장에 등록된 종목 중 이번 실행에서 수집할 종목 (등록 순서 유지)"""
+        if self._symbols is None:
+            return list(symbols)
+        return [symbol for symbol in symbols if symbol in self._symbols]
+
     @property
     def data_dir(self):
         return self._data_dir
@@ -1,24 +1,80 @@
 import pandas as pd
 from datetime import datetime, timedelta
 import os
-from dotenv import load_dotenv
 import json
 import logging
 from pathlib import Path
 import time
-from fredapi import Fred
 from .config import data_dir, TRACKER_FILE, config, get_logger
-
-# 환경 변수 로드
-load_dotenv()
+from . import metrics, pipeline, resume_tracker, retry, resample
+from .retry import CircuitOpenError
+from .storage import get_store
+from .response_cache import get_response_cache, is_closed_date
+from .http_pool import get_session
 
 # 모듈별 로거 가져오기
 logger = get_logger('fetch_bonds')
 
+# FRED REST API 주소
+FRED_API_URL = 'https://api.stlouisfed.org/fred'
+
+def series_to_batch(series, observations):
+    """
+    시리즈 관측값을 저장 스키마의 Arrow record batch로 변환
+
+    Args:
+        observations (Series): 날짜 인덱스의 관측값 (비어 있지 않아야 함)
+    """
+    df = observations.reset_index()
+    df.columns = ['date', 'value']
+    df['series'] = series
+    return get_store().to_batch('bonds', df)
+
+
+def encode_series(item):
+    """
+    수집 파이프라인의 변환 단계 (작업 프로세스에서 실행)
+
+    Args:
+        item (tuple): (series, 시작일, 관측값 Series, last_updated)
+
+    Returns:
+        tuple: (series, 시작일, ParquetStore.encode_batch() 결과 (관측값이 없으면 빈 목록), last_updated)
+    """
+    series, series_start, observations, last_updated = item
+    if observations.empty:
+        return series, series_start, [], last_updated
+    return series, series_start, get_store().encode_batch('bonds', series_to_batch(series, observations)), last_updated
+
+
+def is_covered(watermark, series_start, end_date, frequency, info):
+    """
+    지난 실행에서 받은 구간이 이번 요청을 포함하고 그 뒤로 시리즈가 갱신되지 않았는지
+
+    같은 frequency로 받았고 last_updated가 그대로이며, 받은 구간이 이번 종료일(시리즈의 마지막
+    관측일이 더 이르면 그날)까지 이어지면 새로 받을 관측값이 없다.
+
+    Args:
+        watermark (dict): 시리즈 워터마크 (last, last_updated, covered_until, frequency)
+        series_start (str): 이번 요청 시작일
+        end_date (str): 이번 요청 종료일
+        frequency (str): 이번 요청의 FRED frequency
+        info (dict): 시리즈 메타데이터 (last_updated, observation_end)
+    """
+    if watermark.get('last_updated') != info.get('last_updated') or watermark.get('frequency') != frequency:
+        return False
+    if watermark.get('last', '')[:10] != series_start or not watermark.get('covered_until'):
+        return False
+    needed = min(end_date, info.get('observation_end') or end_date)
+    return watermark['covered_until'] >= needed
+
+
 class BondDataFetcher:
+    # 같은 제공자의 호출은 동시에 실행하지 않도록 묶는 키
+    provider = 'fred'
+
     def __init__(self):
         self.api_key = os.getenv('FRED_API_KEY')
-        self.fred = Fred(api_key=self.api_key)
         self.data_dir = data_dir
         self.tracker_file = TRACKER_FILE
         
@@ -40,91 +96,218 @@ class BondDataFetcher:
                 ]
             }
         }
-        with open(self.tracker_file, 'w') as f:
-            json.dump(tracker_data, f, indent=4)
+        resume_tracker.init_market('bonds', tracker_data['bonds'], self.tracker_file)
 
     def _load_tracker(self):
         """진행 상태 로드"""
-        with open(self.tracker_file, 'r') as f:
-            return json.load(f)
+        return resume_tracker.load_tracker(self.tracker_file)
 
     def _save_tracker(self, tracker_data):
-        """진행 상태 저장"""
-        with open(self.tracker_file, 'w') as f:
-            json.dump(tracker_data, f, indent=4)
+        """진행 상태 저장 (다른 시장의 항목은 건드리지 않음)"""
+        resume_tracker.save_market('bonds', tracker_data['bonds'], self.tracker_file)
+
+    def _fred_request(self, endpoint, **params):
+        """
+        FRED API 호출 (공용 연결 풀 세션 사용)
+
+        Returns:
+            dict: JSON 응답
+        """
+        if not self.api_key:
+            raise ValueError("FRED_API_KEY is not set")
+        response = get_session(self.provider).get(
+            f'{FRED_API_URL}/{endpoint}',
+            params={**params, 'api_key': self.api_key, 'file_type': 'json'}
+        )
+        response.raise_for_status()
+        return response.json()
+
+    def _observations(self, series, start_date, end_date, frequency):
+        """시리즈 관측값을 날짜 인덱스 Series로 변환 (결측값 '.'은 NaN)"""
+        payload = self._fred_request(
+            'series/observations',
+            series_id=series,
+            observation_start=start_date,
+            observation_end=end_date,
+            frequency=frequency
+        )
+        with metrics.stage('convert', market='bonds'):
+            observations = payload.get('observations', [])
+            return pd.Series(
+                pd.to_numeric([item['value'] for item in observations], errors='coerce'),
+                index=pd.to_datetime([item['date'] for item in observations]),
+                dtype='float64'
+            )
+
+    def _series_info(self, series):
+        """시리즈 메타데이터 (last_updated 예: '2024-01-05 15:21:02-06', observation_end 예: '2024-07-12')"""
+        payload = retry.call(self.provider, lambda: self._fred_request('series', series_id=series), symbol=series)
+        return payload['seriess'][0]
+
+    def _get_series(self, series, start_date, end_date, frequency, last_updated=None):
+        """
+        시리즈 관측값 조회 (디스크 캐시에 있으면 API를 호출하지 않고, 일시적 오류는 재시도)
+
+        last_updated를 캐시 키에 포함하므로 시리즈가 갱신되면 이전 응답은 사용하지 않고,
+        같은 갱신 시각의 응답은 바뀌지 않으므로 만료 없이 보관한다.
+        """
+        cache = get_response_cache()
+        params = {'series': series, 'start': start_date, 'end': end_date, 'frequency': frequency}
+        if last_updated:
+            params['last_updated'] = last_updated
+        cached = cache.get_frame(self.provider, 'series/observations', params)
+        if cached is not None:
+            return cached['value']
+
+        df = retry.call(self.provider, lambda: self._observations(series, start_date, end_date, frequency),
+                        symbol=series)
+        if not df.empty:
+            closed = bool(last_updated) or is_closed_date(end_date)
+            cache.put_frame(self.provider, 'series/observations', params, df.to_frame('value'), closed=closed)
+        return df
+
+    def _record_coverage(self, tracker, series, last_updated, end_date, frequency):
+        """저장한 시리즈의 메타데이터 갱신 시각과 받은 구간의 종료일·frequency 기록"""
+        watermarks = tracker['bonds'].setdefault('watermarks', {})
+        watermarks.setdefault(series, {}).update({
+            'last_updated': last_updated,
+            'covered_until': end_date,
+            'frequency': frequency
+        })
+        self._save_tracker(tracker)
+
+    def _commit_chunk(self, tracker, parts, requested_starts):
+        """
+        수집한 구간을 바로 저장하고 진행 상태 기록
+
+        중단되더라도 다음 실행은 마지막으로 기록된 구간 이후부터 이어서 수집한다.
+
+        Args:
+            parts (list): ParquetStore.encode() 결과
+        """
+        # 시장 데이터셋에 delta 파일로 추가 (기존 파일은 다시 쓰지 않음)
+        get_store().commit('bonds', parts)
+        # 실제로 저장된 시리즈만 워터마크 갱신
+        resume_tracker.update_watermark_bounds(
+            tracker['bonds'], [(series, first, last) for series, _, _, first, last, _ in parts], requested_starts
+        )
+        self._save_tracker(tracker)
+
+    def _iter_series(self, requests, watermarks, end_date, frequency, unchanged):
+        """
+        시리즈별 관측값을 받아 반환 (수집 파이프라인의 받기 단계)
+
+        지난 실행에서 받은 구간이 이번 요청을 포함하고 그 뒤로 갱신되지 않은 시리즈는
+        관측값을 요청하지 않고 unchanged에 추가한다 (is_covered() 참고).
+
+        Yields:
+            tuple: (series, 시작일, 관측값 Series, last_updated) - 관측값이 없어도 갱신 시각 기록을 위해 반환
+        """
+        for series, series_start, _ in requests:
+            try:
+                # 메타데이터만 확인하여 이미 받은 구간에 새 관측값이 없으면 요청하지 않음
+                info = self._series_info(series)
+                last_updated = info['last_updated']
+                if is_covered(watermarks.get(series, {}), series_start, end_date, frequency, info):
+                    unchanged.append(series)
+                    logger.info(f"{series} already covered until {end_date} and unchanged since {last_updated}, skipping")
+                    continue
+
+                observations = self._get_series(series, series_start, end_date, frequency, last_updated)
+            except CircuitOpenError as e:
+                # 남은 시리즈는 다음 실행에서 워터마크부터 이어서 수집
+                logger.warning(f"Stopping bonds collection: {str(e)}")
+                return
+            except Exception as e:
+                logger.error(f"Error fetching {series}: {str(e)}")
+                continue
+            yield series, series_start, observations, last_updated
+
+    def _plan_requests(self, start_date=None, end_date=None):
+        """
+        시리즈별 요청 구간 계산 (이미 저장된 구간은 워터마크로 건너뜀)
+
+        Returns:
+            tuple: (진행 상태, [(series, 시작일, 종료일)], FRED frequency, 종료일)
+        """
+        tracker = self._load_tracker()
+        if 'bonds' not in tracker:
+            tracker['bonds'] = {
+                'last_fetch_date': None,
+                'series': [
+                    'DGS10', 'DGS2', 'DGS30', 'BAA10Y', 'AAA10Y'
+                ]
+            }
+        section = tracker['bonds']
+        resume_tracker.ensure_watermarks('bonds', section)
+        # 저장된 기준 간격보다 긴 간격은 받지 않고 로컬에서 집계
+        frequency = config.get_fred_interval(resample.collection_interval('bonds', section))
+
+        # 날짜 설정 (이미 저장된 구간은 시리즈별 워터마크로 건너뜀)
+        if not start_date:
+            start_date = (datetime.now() - timedelta(days=3650)).strftime('%Y-%m-%d')
+        if not end_date:
+            end_date = datetime.now().strftime('%Y-%m-%d')
+
+        # 시리즈별로 저장된 이후 구간만 요청
+        requests = resume_tracker.plan_requests(section, config.select_symbols(section['series']), start_date, end_date)
+        return tracker, requests, frequency, end_date
+
+    def iter_batches(self, start_date=None, end_date=None):
+        """
+        저장된 이후 구간의 관측값을 시리즈별 Arrow record batch로 반환 (스트리밍 수집)
+
+        시리즈를 받을 때마다 변환하여 내보내므로 메모리에는 시리즈 하나만 남는다.
+        진행 상태는 기록하지 않으며, 저장소에 쓰려면 ParquetStore.write_batches()에 넘긴다.
+
+        Yields:
+            pyarrow.RecordBatch: 저장 스키마의 시리즈 관측값 (ParquetStore.to_batch() 참고)
+        """
+        tracker, requests, frequency, end_date = self._plan_requests(start_date, end_date)
+        watermarks = tracker['bonds'].get('watermarks', {})
+        for series, _, observations, _ in self._iter_series(requests, watermarks, end_date, frequency, []):
+            if not observations.empty:
+                yield series_to_batch(series, observations)
 
     def fetch_data(self, start_date=None, end_date=None):
         """채권 데이터 수집"""
         try:
-            tracker = self._load_tracker()
-            if 'bonds' not in tracker:
-                tracker['bonds'] = {
-                    'last_fetch_date': None,
-                    'series': [
-                        'DGS10', 'DGS2', 'DGS30', 'BAA10Y', 'AAA10Y'
-                    ]
-                }
-            last_fetch = tracker['bonds']['last_fetch_date']
-            
-            # 날짜 설정
-            if not start_date:
-                start_date = last_fetch or (datetime.now() - timedelta(days=3650)).strftime('%Y-%m-%d')
-            if not end_date:
-                end_date = datetime.now().strftime('%Y-%m-%d')
-
-            # FRED API frequency 매핑
-            fred_frequency = {
-                '1m': 'm',     # 월간
-                '1d': 'd',     # 일간
-                '1w': 'w',     # 주간
-                '1mo': 'm',    # 월간
-                '3mo': 'q',    # 분기
-                '6mo': 'sa',   # 반기
-                '1y': 'a'      # 연간
-            }.get(config.interval, 'd')  # 기본값은 일간
-
-            all_data = []
-            
-            # 각 시리즈별 데이터 수집
-            for series in tracker['bonds']['series']:
-                try:
-                    df = self.fred.get_series(
-                        series,
-                        observation_start=start_date,
-                        observation_end=end_date,
-                        frequency=config.get_fred_interval()  # FRED API 형식으로 변환
-                    )
-                    
-                    if not df.empty:
-                        df = df.reset_index()
-                        df.columns = ['date', 'value']
-                        df['series'] = series
-                        all_data.append(df)
-                        logger.info(f"Successfully fetched {series} from {start_date} to {end_date}")
-                        time.sleep(1)  # API 제한 고려
-                    
-                except Exception as e:
-                    logger.error(f"Error fetching {series}: {str(e)}")
-                    continue
+            tracker, requests, frequency, end_date = self._plan_requests(start_date, end_date)
+            if not requests:
+                logger.info(f"bonds data is already up to date until {end_date}")
+                return True
+            requested_starts = {series: series_start for series, series_start, _ in requests}
+
+            unchanged = []
+            saved = []
+
+            # 시리즈마다 저장한 뒤 받은 구간 기록 (저장하지 못한 시리즈는 다음 실행에서 다시 요청)
+            def commit(result):
+                series, series_start, parts, last_updated = result
+                if parts:
+                    self._commit_chunk(tracker, parts, requested_starts)
+                    saved.append(series)
+                    logger.info(f"Successfully fetched {series} from {series_start} to {end_date}")
+                elif tracker['bonds'].get('watermarks', {}).get(series, {}).get('last'):
+                    # 새 관측값이 없어도 이미 저장된 시리즈는 이번 종료일까지 받은 것으로 기록
+                    unchanged.append(series)
+                else:
+                    return
+                self._record_coverage(tracker, series, last_updated, end_date, frequency)
+
+            # 각 시리즈별 데이터 수집 (다음 시리즈를 받는 동안 받은 시리즈를 변환·인코딩하고 바로 저장)
+            pipeline.run(
+                self._iter_series(requests, tracker['bonds'].get('watermarks', {}), end_date, frequency, unchanged),
+                encode_series,
+                commit,
+                'bonds'
+            )
+            saved_series = len(saved)
+            unchanged_series = len(unchanged)
 
-            if all_data:
-                # DataFrame 생성 및 전처리
-                df = pd.concat(all_data, ignore_index=True)
-                
-                # 기존 데이터가 있다면 병합
-                existing_file = self.data_dir / 'bonds.parquet'
-                if existing_file.exists():
-                    existing_df = pd.read_parquet(existing_file)
-                    df = pd.concat([existing_df, df]).drop_duplicates()
-                
-                # Parquet 파일로 저장
-                df.to_parquet(self.data_dir / 'bonds.parquet')
-                
-                # 진행 상태 업데이트
-                tracker['bonds']['last_fetch_date'] = end_date
-                self._save_tracker(tracker)
-                
-                logger.info(f"Successfully saved bonds data from {start_date} to {end_date}")
+            if saved_series or unchanged_series:
+                logger.info(f"Successfully saved bonds data for {saved_series}/{len(requests)} series until {end_date} "
+                            f"({unchanged_series} unchanged)")
                 return True
             
             return False
@@ -136,8 +319,8 @@ class BondDataFetcher:
     def save_data(self, data):
         """데이터 저장"""
         try:
-            # 데이터 저장
-            data.to_parquet(self.data_dir / 'bonds.parquet')
+            # 시장 데이터 전체 교체
+            get_store().write('bonds', data)
             return True
         except Exception as e:
             logger.error(f"Error saving bonds data: {str(e)}")
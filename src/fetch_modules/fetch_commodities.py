@@ -1,21 +1,23 @@
-import yfinance as yf
 import pandas as pd
 from datetime import datetime, timedelta
 import os
-from dotenv import load_dotenv
 import json
 import logging
 from pathlib import Path
 import time
+from functools import partial
 from .config import data_dir, TRACKER_FILE, config, get_logger
-
-# 환경 변수 로드
-load_dotenv()
+from . import pipeline, resume_tracker, resample
+from .storage import get_store
+from .yahoo_engine import get_yahoo_engine, encode_history, history_to_batch
 
 # 모듈별 로거 가져오기
 logger = get_logger('fetch_commodities')
 
 class CommodityDataFetcher:
+    # 같은 제공자의 호출은 동시에 실행하지 않도록 묶는 키
+    provider = 'yahoo'
+
     def __init__(self):
         self.data_dir = data_dir
         self.tracker_file = TRACKER_FILE
@@ -40,83 +42,102 @@ class CommodityDataFetcher:
                 ]
             }
         }
-        with open(self.tracker_file, 'w') as f:
-            json.dump(tracker_data, f, indent=4)
+        resume_tracker.init_market('commodities', tracker_data['commodities'], self.tracker_file)
 
     def _load_tracker(self):
         """진행 상태 로드"""
-        with open(self.tracker_file, 'r') as f:
-            return json.load(f)
+        return resume_tracker.load_tracker(self.tracker_file)
 
     def _save_tracker(self, tracker_data):
-        """진행 상태 저장"""
-        with open(self.tracker_file, 'w') as f:
-            json.dump(tracker_data, f, indent=4)
+        """진행 상태 저장 (다른 시장의 항목은 건드리지 않음)"""
+        resume_tracker.save_market('commodities', tracker_data['commodities'], self.tracker_file)
+
+    def _commit_chunk(self, tracker, parts, requested_starts):
+        """
+        수집한 구간을 바로 저장하고 진행 상태 기록
+
+        중단되더라도 다음 실행은 마지막으로 기록된 구간 이후부터 이어서 수집한다.
+
+        Args:
+            parts (list): ParquetStore.encode() 결과
+        """
+        # 시장 데이터셋에 delta 파일로 추가 (기존 파일은 다시 쓰지 않음)
+        get_store().commit('commodities', parts)
+        # 실제로 저장된 종목만 워터마크 갱신
+        resume_tracker.update_watermark_bounds(
+            tracker['commodities'], [(symbol, first, last) for symbol, _, _, first, last, _ in parts], requested_starts
+        )
+        self._save_tracker(tracker)
+
+    def _plan_requests(self, start_date=None, end_date=None):
+        """
+        종목별 요청 구간 계산 (이미 저장된 구간은 워터마크로 건너뜀)
+
+        Returns:
+            tuple: (진행 상태, [(symbol, 시작일, 종료일)], 수집 간격, 종료일)
+        """
+        tracker = self._load_tracker()
+        if 'commodities' not in tracker:
+            tracker['commodities'] = {
+                'last_fetch_date': None,
+                'symbols': [
+                    'GLD', 'USO', 'SLV', 'DBC'
+                ]
+            }
+        section = tracker['commodities']
+        resume_tracker.ensure_watermarks('commodities', section)
+        # 저장된 기준 간격보다 긴 간격은 받지 않고 로컬에서 집계
+        interval = resample.collection_interval('commodities', section)
+
+        # 날짜 설정 (이미 저장된 구간은 종목별 워터마크로 건너뜀)
+        if not start_date:
+            start_date = (datetime.now() - timedelta(days=3650)).strftime('%Y-%m-%d')
+        if not end_date:
+            end_date = datetime.now().strftime('%Y-%m-%d')
+
+        # 종목별로 저장된 이후 구간만 요청
+        requests = resume_tracker.plan_requests(section, config.select_symbols(section['symbols']), start_date, end_date)
+        return tracker, requests, interval, end_date
+
+    def iter_batches(self, start_date=None, end_date=None):
+        """
+        저장된 이후 구간의 시세를 종목별 Arrow record batch로 반환 (스트리밍 수집)
+
+        다운로드 배치가 끝날 때마다 종목별로 변환하여 내보내므로 전체 종목·기간을 메모리에 모으지 않는다.
+        진행 상태는 기록하지 않으며, 저장소에 쓰려면 ParquetStore.write_batches()에 넘긴다.
+
+        Yields:
+            pyarrow.RecordBatch: 저장 스키마의 종목 시세 (ParquetStore.to_batch() 참고)
+        """
+        _, requests, interval, _ = self._plan_requests(start_date, end_date)
+        for item in get_yahoo_engine().iter_frames(requests, config.get_yfinance_interval(interval)):
+            yield history_to_batch('commodities', item)
 
     def fetch_data(self, start_date=None, end_date=None):
         """원자재 데이터 수집"""
         try:
-            tracker = self._load_tracker()
-            if 'commodities' not in tracker:
-                tracker['commodities'] = {
-                    'last_fetch_date': None,
-                    'symbols': [
-                        'GLD', 'USO', 'SLV', 'DBC'
-                    ]
-                }
-            last_fetch = tracker['commodities']['last_fetch_date']
-            
-            # 날짜 설정
-            if not start_date:
-                start_date = last_fetch or (datetime.now() - timedelta(days=3650)).strftime('%Y-%m-%d')
-            if not end_date:
-                end_date = datetime.now().strftime('%Y-%m-%d')
+            tracker, requests, interval, end_date = self._plan_requests(start_date, end_date)
+            if not requests:
+                logger.info(f"commodities data is already up to date until {end_date}")
+                return True
+            requested_starts = {symbol: symbol_start for symbol, symbol_start, _ in requests}
 
-            all_data = []
-            
-            # 각 원자재별 데이터 수집
-            for symbol in tracker['commodities']['symbols']:
-                try:
-                    ticker = yf.Ticker(symbol)
-                    df = ticker.history(start=start_date, end=end_date, interval=config.interval)
-                    
-                    if not df.empty:
-                        df = df.reset_index()
-                        df['symbol'] = symbol
-                        all_data.append(df)
-                        logger.info(f"Successfully fetched {symbol} from {start_date} to {end_date}")
-                        time.sleep(1)  # API 제한 고려
-                    
-                except Exception as e:
-                    logger.error(f"Error fetching {symbol}: {str(e)}")
-                    continue
-
-            if all_data:
-                # DataFrame 생성 및 전처리
-                df = pd.concat(all_data, ignore_index=True)
-                df = df.rename(columns={
-                    'Date': 'date',
-                    'Open': 'open',
-                    'High': 'high',
-                    'Low': 'low',
-                    'Close': 'close',
-                    'Volume': 'volume'
-                })
-                
-                # 기존 데이터가 있다면 병합
-                existing_file = self.data_dir / 'commodities.parquet'
-                if existing_file.exists():
-                    existing_df = pd.read_parquet(existing_file)
-                    df = pd.concat([existing_df, df]).drop_duplicates()
-                
-                # Parquet 파일로 저장
-                df.to_parquet(self.data_dir / 'commodities.parquet')
-                
-                # 진행 상태 업데이트
-                tracker['commodities']['last_fetch_date'] = end_date
-                self._save_tracker(tracker)
-                
-                logger.info(f"Successfully saved commodities data from {start_date} to {end_date}")
+            # 종목마다 저장하고 진행 상태 기록
+            def commit(result):
+                symbol, parts = result
+                self._commit_chunk(tracker, parts, requested_starts)
+                logger.info(f"Successfully fetched {symbol} from {requested_starts[symbol]} to {end_date}")
+
+            # 각 원자재별 데이터 수집 (다음 배치를 받는 동안 받은 종목을 변환·인코딩하고 종목마다 바로 저장)
+            saved_symbols = pipeline.run(
+                get_yahoo_engine().iter_frames(requests, config.get_yfinance_interval(interval)),
+                partial(encode_history, 'commodities'),
+                commit,
+                'commodities'
+            )
+
+            if saved_symbols:
+                logger.info(f"Successfully saved commodities data for {saved_symbols}/{len(requests)} symbols until {end_date}")
                 return True
             
             return False
@@ -128,8 +149,8 @@ class CommodityDataFetcher:
     def save_data(self, data):
         """데이터 저장"""
         try:
-            # 데이터 저장
-            data.to_parquet(self.data_dir / 'commodities.parquet')
+            # 시장 데이터 전체 교체
+            get_store().write('commodities', data)
             return True
         except Exception as e:
             logger.error(f"Error saving commodities data: {str(e)}")
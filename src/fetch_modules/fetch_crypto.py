@@ -1,25 +1,57 @@
 import pandas as pd
 from datetime import datetime, timedelta
 import os
-from dotenv import load_dotenv
 import json
 import logging
 from pathlib import Path
 from binance.client import Client
+from binance.helpers import interval_to_milliseconds
 import time
-from .config import data_dir, TRACKER_FILE, config, get_logger
-
-# 환경 변수 로드
-load_dotenv()
+from .config import data_dir, TRACKER_FILE, CHECKPOINT_WINDOW_CANDLES, KLINE_EXTRA_COLUMNS, config, get_logger
+from . import pipeline, resume_tracker, resample
+from .kline_engine import KlineEngine, klines_to_columns
+from .retry import CircuitOpenError
+from .http_pool import get_session
+from .storage import get_store
 
 # 모듈별 로거 가져오기
 logger = get_logger('fetch_crypto')
 
+def klines_to_batch(window):
+    """
+    _iter_windows()가 반환한 kline 페이지 묶음을 저장 스키마의 Arrow record batch로 변환
+
+    Args:
+        window (tuple): (symbol, kline 페이지 목록)
+    """
+    symbol, pages = window
+    df = pd.DataFrame(klines_to_columns(pages, extra_columns=KLINE_EXTRA_COLUMNS))
+    df['symbol'] = symbol
+    return get_store().to_batch('crypto', df)
+
+
+def encode_klines(window):
+    """
+    수집 파이프라인의 변환 단계 (작업 프로세스에서 실행)
+
+    Args:
+        window (tuple): (symbol, kline 페이지 목록)
+
+    Returns:
+        tuple: (symbol, ParquetStore.encode_batch() 결과)
+    """
+    return window[0], get_store().encode_batch('crypto', klines_to_batch(window))
+
+
 class CryptoDataFetcher:
+    # 같은 제공자의 호출은 동시에 실행하지 않도록 묶는 키
+    provider = 'binance'
+
     def __init__(self):
         self.api_key = os.getenv('BINANCE_API_KEY')
         self.api_secret = os.getenv('BINANCE_API_SECRET')
-        self.client = Client(self.api_key, self.api_secret)
+        self._client = None
+        self._kline_engine = None
         self.data_dir = data_dir
         self.tracker_file = TRACKER_FILE
         
@@ -30,6 +62,26 @@ class CryptoDataFetcher:
         if not self.tracker_file.exists():
             self._init_tracker()
 
+    @property
+    def client(self):
+        """Binance 클라이언트 (생성 시 서버에 접속하므로 처음 사용할 때 생성)"""
+        if self._client is None:
+            client = Client(self.api_key, self.api_secret)
+            # 클라이언트가 만든 인증 헤더를 옮기고 공용 연결 풀 세션으로 교체
+            session = get_session(self.provider)
+            session.headers.update(client.session.headers)
+            client.session.close()
+            client.session = session
+            self._client = client
+        return self._client
+
+    @property
+    def kline_engine(self):
+        """kline 병렬 수집기"""
+        if self._kline_engine is None:
+            self._kline_engine = KlineEngine(self.client)
+        return self._kline_engine
+
     def _init_tracker(self):
         """진행 상태 추적 파일 초기화"""
         tracker_data = {
@@ -44,18 +96,162 @@ class CryptoDataFetcher:
                 ]
             }
         }
-        with open(self.tracker_file, 'w') as f:
-            json.dump(tracker_data, f, indent=4)
+        resume_tracker.init_market('crypto', tracker_data['crypto'], self.tracker_file)
 
     def _load_tracker(self):
         """진행 상태 로드"""
-        with open(self.tracker_file, 'r') as f:
-            return json.load(f)
+        return resume_tracker.load_tracker(self.tracker_file)
 
     def _save_tracker(self, tracker_data):
-        """진행 상태 저장"""
-        with open(self.tracker_file, 'w') as f:
-            json.dump(tracker_data, f, indent=4)
+        """진행 상태 저장 (다른 시장의 항목은 건드리지 않음)"""
+        resume_tracker.save_market('crypto', tracker_data['crypto'], self.tracker_file)
+
+    def _commit_chunk(self, tracker, parts, requested_starts):
+        """
+        수집한 구간을 바로 저장하고 진행 상태 기록
+
+        중단되더라도 다음 실행은 마지막으로 기록된 구간 이후부터 이어서 수집한다.
+
+        Args:
+            parts (list): ParquetStore.encode() 결과
+        """
+        # 시장 데이터셋에 delta 파일로 추가 (기존 파일은 다시 쓰지 않음)
+        get_store().commit('crypto', parts)
+        # 실제로 저장된 종목만 워터마크 갱신
+        resume_tracker.update_watermark_bounds(
+            tracker['crypto'], [(symbol, first, last) for symbol, _, _, first, last, _ in parts], requested_starts
+        )
+        self._save_tracker(tracker)
+
+    def _iter_windows(self, requests, watermarks, interval, interval_ms, end_ts):
+        """
+        종목별로 받은 kline 페이지를 체크포인트 크기 단위로 묶어 반환 (수집 파이프라인의 받기 단계)
+
+        Yields:
+            tuple: (symbol, pages) - 종목의 연속된 페이지 묶음 (시작 시각 순서)
+        """
+        for symbol, symbol_start, _ in requests:
+            watermark = watermarks.get(symbol)
+            if watermark and watermark.get('last', '')[:10] == symbol_start:
+                # 이어받기: 마지막으로 저장된 캔들부터 정확히 요청
+                start_ts = pd.Timestamp(watermark['last']).value // 10**6
+            else:
+                start_ts = int(datetime.strptime(symbol_start, '%Y-%m-%d').timestamp() * 1000)
+
+            # 페이지를 병렬로 받아 순서대로 모으고, 체크포인트 크기가 차면 바로 내보냄
+            windows = 0
+            pages = []
+            buffered_candles = 0
+            circuit_open = False
+            try:
+                for klines in self.kline_engine.iter_pages(symbol, interval, interval_ms, start_ts, end_ts):
+                    pages.append(klines)
+                    buffered_candles += len(klines)
+                    if buffered_candles >= CHECKPOINT_WINDOW_CANDLES:
+                        yield symbol, pages
+                        windows += 1
+                        pages = []
+                        buffered_candles = 0
+
+            except CircuitOpenError as e:
+                # 남은 종목은 다음 실행에서 워터마크부터 이어서 수집
+                logger.warning(f"Stopping crypto collection at {symbol}: {str(e)}")
+                circuit_open = True
+            except Exception as e:
+                # 이후 구간은 다음 실행에서 마지막 체크포인트부터 이어서 수집
+                logger.error(f"Error fetching {symbol}: {str(e)}")
+
+            # 오류 전까지 연속으로 받은 페이지는 저장
+            if pages:
+                yield symbol, pages
+                windows += 1
+
+            if not windows:
+                logger.warning(f"No data available for {symbol} in the specified date range")
+
+            if circuit_open:
+                return
+
+    def _plan_requests(self, start_date=None, end_date=None):
+        """
+        종목별 요청 구간과 kline 간격 계산 (이미 저장된 구간은 워터마크로 건너뜀)
+
+        Returns:
+            tuple: (진행 상태, [(symbol, 시작일, 종료일)], Binance 간격, 캔들 길이(밀리초), 종료 타임스탬프(밀리초), 종료일)
+        """
+        # 바이낸스 설립일 체크 (2017년 7월)
+        binance_launch_date = '2017-07-01'
+        if start_date and start_date < binance_launch_date:
+            logger.warning(f"Requested start date ({start_date}) is before Binance launch date ({binance_launch_date}). Adjusting start date.")
+            start_date = binance_launch_date
+
+        tracker = self._load_tracker()
+        if 'crypto' not in tracker:
+            tracker['crypto'] = {
+                'last_fetch_date': None,
+                'symbols': [
+                    'BTCUSDT', 'ETHUSDT', 'BNBUSDT',
+                    'XRPUSDT', 'ADAUSDT'
+                ]
+            }
+        section = tracker['crypto']
+        resume_tracker.ensure_watermarks('crypto', section)
+        # 저장된 기준 간격보다 긴 간격은 받지 않고 로컬에서 집계 (더 짧은 간격이면 워터마크가 초기화됨)
+        collection_interval = resample.collection_interval('crypto', section)
+
+        # 날짜 설정 (이미 저장된 구간은 종목별 워터마크로 건너뜀)
+        if not start_date:
+            start_date = binance_launch_date
+        if not end_date:
+            end_date = datetime.now().strftime('%Y-%m-%d')
+
+        # Binance API는 밀리초 단위의 타임스탬프 사용
+        end_ts = int(datetime.strptime(end_date, '%Y-%m-%d').timestamp() * 1000)
+
+        # 종목별로 저장된 이후 구간만 요청
+        requests = resume_tracker.plan_requests(section, config.select_symbols(section['symbols']), start_date, end_date)
+
+        # 기본 interval을 1일로 설정
+        interval = Client.KLINE_INTERVAL_1DAY
+
+        # 만약 config에서 interval이 설정되어 있다면 사용
+        if hasattr(config, 'interval'):
+            interval_map = {
+                '1m': Client.KLINE_INTERVAL_1MINUTE,
+                '3m': Client.KLINE_INTERVAL_3MINUTE,
+                '5m': Client.KLINE_INTERVAL_5MINUTE,
+                '15m': Client.KLINE_INTERVAL_15MINUTE,
+                '30m': Client.KLINE_INTERVAL_30MINUTE,
+                '1h': Client.KLINE_INTERVAL_1HOUR,
+                '2h': Client.KLINE_INTERVAL_2HOUR,
+                '4h': Client.KLINE_INTERVAL_4HOUR,
+                '6h': Client.KLINE_INTERVAL_6HOUR,
+                '8h': Client.KLINE_INTERVAL_8HOUR,
+                '12h': Client.KLINE_INTERVAL_12HOUR,
+                '1d': Client.KLINE_INTERVAL_1DAY,
+                '3d': Client.KLINE_INTERVAL_3DAY,
+                '1w': Client.KLINE_INTERVAL_1WEEK,
+                '1mo': Client.KLINE_INTERVAL_1MONTH
+            }
+            interval = interval_map.get(collection_interval.lower(), Client.KLINE_INTERVAL_1DAY)
+
+        # 페이지 구간 계산용 캔들 길이 (밀리초)
+        interval_ms = interval_to_milliseconds(interval) or 31 * 24 * 60 * 60 * 1000  # 월 단위는 31일로 계산
+        return tracker, requests, interval, interval_ms, end_ts, end_date
+
+    def iter_batches(self, start_date=None, end_date=None):
+        """
+        저장된 이후 구간의 kline을 체크포인트 크기 단위의 Arrow record batch로 반환 (스트리밍 수집)
+
+        CHECKPOINT_WINDOW_CANDLES개마다 변환하여 내보내므로 종목 수나 기간과 관계없이 메모리에는 구간 하나만 남는다.
+        진행 상태는 기록하지 않으며, 저장소에 쓰려면 ParquetStore.write_batches()에 넘긴다.
+
+        Yields:
+            pyarrow.RecordBatch: 저장 스키마의 종목 구간 (ParquetStore.to_batch() 참고)
+        """
+        tracker, requests, interval, interval_ms, end_ts, _ = self._plan_requests(start_date, end_date)
+        for window in self._iter_windows(requests, tracker['crypto']['watermarks'], interval, interval_ms, end_ts):
+            yield klines_to_batch(window)
 
     def fetch_data(self, start_date=None, end_date=None):
         """암호화폐 데이터 수집"""
@@ -64,118 +260,34 @@ class CryptoDataFetcher:
                 logger.error("Binance API credentials not found")
                 return False
 
-            # 바이낸스 설립일 체크 (2017년 7월)
-            binance_launch_date = '2017-07-01'
-            if start_date and start_date < binance_launch_date:
-                logger.warning(f"Requested start date ({start_date}) is before Binance launch date ({binance_launch_date}). Adjusting start date.")
-                start_date = binance_launch_date
-
-            tracker = self._load_tracker()
-            if 'crypto' not in tracker:
-                tracker['crypto'] = {
-                    'last_fetch_date': None,
-                    'symbols': [
-                        'BTCUSDT', 'ETHUSDT', 'BNBUSDT',
-                        'XRPUSDT', 'ADAUSDT'
-                    ]
-                }
-            last_fetch = tracker['crypto']['last_fetch_date']
-            
-            # 날짜 설정
-            if not start_date:
-                start_date = last_fetch or binance_launch_date
-            if not end_date:
-                end_date = datetime.now().strftime('%Y-%m-%d')
-
-            # Binance API는 밀리초 단위의 타임스탬프 사용
-            start_ts = int(datetime.strptime(start_date, '%Y-%m-%d').timestamp() * 1000)
-            end_ts = int(datetime.strptime(end_date, '%Y-%m-%d').timestamp() * 1000)
-
-            all_data = []
-            
-            # 각 암호화폐별 데이터 수집
-            for symbol in tracker['crypto']['symbols']:
-                try:
-                    # 기본 interval을 1일로 설정
-                    interval = Client.KLINE_INTERVAL_1DAY
-                    
-                    # 만약 config에서 interval이 설정되어 있다면 사용
-                    if hasattr(config, 'interval'):
-                        interval_map = {
-                            '1m': Client.KLINE_INTERVAL_1MINUTE,
-                            '3m': Client.KLINE_INTERVAL_3MINUTE,
-                            '5m': Client.KLINE_INTERVAL_5MINUTE,
-                            '15m': Client.KLINE_INTERVAL_15MINUTE,
-                            '30m': Client.KLINE_INTERVAL_30MINUTE,
-                            '1h': Client.KLINE_INTERVAL_1HOUR,
-                            '2h': Client.KLINE_INTERVAL_2HOUR,
-                            '4h': Client.KLINE_INTERVAL_4HOUR,
-                            '6h': Client.KLINE_INTERVAL_6HOUR,
-                            '8h': Client.KLINE_INTERVAL_8HOUR,
-                            '12h': Client.KLINE_INTERVAL_12HOUR,
-                            '1d': Client.KLINE_INTERVAL_1DAY,
-                            '3d': Client.KLINE_INTERVAL_3DAY,
-                            '1w': Client.KLINE_INTERVAL_1WEEK,
-                            '1mo': Client.KLINE_INTERVAL_1MONTH
-                        }
-                        interval = interval_map.get(config.interval.lower(), Client.KLINE_INTERVAL_1DAY)
-                    
-                    klines = self.client.get_historical_klines(
-                        symbol,
-                        interval,
-                        start_ts,
-                        end_ts
-                    )
-                    
-                    if klines:
-                        # 데이터 전처리
-                        df = pd.DataFrame(klines, columns=[
-                            'timestamp', 'open', 'high', 'low', 'close',
-                            'volume', 'close_time', 'quote_volume', 'trades',
-                            'buy_base_volume', 'buy_quote_volume', 'ignore'
-                        ])
-                        
-                        # 필요한 컬럼만 선택
-                        df = df[['timestamp', 'open', 'high', 'low', 'close', 'volume']]
-                        
-                        # 데이터 타입 변환
-                        df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-                        for col in ['open', 'high', 'low', 'close', 'volume']:
-                            df[col] = pd.to_numeric(df[col], errors='coerce')
-                        
-                        # 컬럼명 변경
-                        df = df.rename(columns={'timestamp': 'date'})
-                        df['symbol'] = symbol
-                        
-                        all_data.append(df)
-                        logger.info(f"Successfully fetched {symbol} from {start_date} to {end_date}")
-                        time.sleep(1)  # API 제한 고려
-                    else:
-                        logger.warning(f"No data available for {symbol} in the specified date range")
-                    
-                except Exception as e:
-                    logger.error(f"Error fetching {symbol}: {str(e)}")
-                    continue
-
-            if all_data:
-                # DataFrame 생성 및 전처리
-                df = pd.concat(all_data, ignore_index=True)
-                
-                # 기존 데이터가 있다면 병합
-                existing_file = self.data_dir / 'crypto.parquet'
-                if existing_file.exists():
-                    existing_df = pd.read_parquet(existing_file)
-                    df = pd.concat([existing_df, df]).drop_duplicates(subset=['date', 'symbol'])
-                    df = df.sort_values(['symbol', 'date'])
-                
-                # Parquet 파일로 저장
-                df.to_parquet(self.data_dir / 'crypto.parquet')
-                
-                # 진행 상태 업데이트
-                tracker['crypto']['last_fetch_date'] = end_date
-                self._save_tracker(tracker)
-                
-                logger.info(f"Successfully saved crypto data from {start_date} to {end_date}")
+            tracker, requests, interval, interval_ms, end_ts, end_date = self._plan_requests(start_date, end_date)
+            if not requests:
+                logger.info(f"crypto data is already up to date until {end_date}")
+                return True
+            requested_starts = {symbol: symbol_start for symbol, symbol_start, _ in requests}
+
+            # 구간마다 저장하고 진행 상태 기록
+            saved = []
+
+            def commit(result):
+                symbol, parts = result
+                self._commit_chunk(tracker, parts, requested_starts)
+                if symbol not in saved:
+                    saved.append(symbol)
+
+            # 각 암호화폐별 데이터 수집 (다음 페이지를 받는 동안 받은 구간을 변환·인코딩하고 구간마다 바로 저장)
+            pipeline.run(
+                self._iter_windows(requests, tracker['crypto']['watermarks'], interval, interval_ms, end_ts),
+                encode_klines,
+                commit,
+                'crypto'
+            )
+            for symbol in saved:
+                logger.info(f"Successfully fetched {symbol} from {requested_starts[symbol]} to {end_date}")
+            saved_symbols = len(saved)
+
+            if saved_symbols:
+                logger.info(f"Successfully saved crypto data for {saved_symbols}/{len(requests)} symbols until {end_date}")
                 return True
             else:
                 logger.warning("No data was collected for any cryptocurrency")
@@ -188,8 +300,8 @@ class CryptoDataFetcher:
     def save_data(self, data):
         """데이터 저장"""
         try:
-            # 데이터 저장
-            data.to_parquet(self.data_dir / 'crypto.parquet')
+            # 시장 데이터 전체 교체
+            get_store().write('crypto', data)
             return True
         except Exception as e:
             logger.error(f"Error saving crypto data: {str(e)}")
@@ -0,0 +1,144 @@
+import threading
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from .config import HTTP_POOL_MAXSIZE, HTTP_POOL_SIZES, HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT, HTTP_GZIP, get_logger
+from . import metrics
+
+# 모듈별 로거 가져오기
+logger = get_logger('http_pool')
+
+
+class ConnectionStats:
+    """호스트별 요청 수와 새로 연 연결 수 (나머지 요청은 기존 연결 재사용)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._hosts = {}
+
+    def _host(self, host):
+        return self._hosts.setdefault(host, {'requests': 0, 'new': 0})
+
+    def record_request(self, host):
+        with self._lock:
+            self._host(host)['requests'] += 1
+        metrics.inc('http_requests_total', host=host)
+
+    def record_new(self, host):
+        with self._lock:
+            self._host(host)['new'] += 1
+        metrics.inc('http_new_connections_total', host=host)
+
+    def snapshot(self):
+        """
+        Returns:
+            dict: {host: {'requests': 요청 수, 'new': 새 연결 수, 'reused': 재사용 수}}
+        """
+        with self._lock:
+            return {
+                host: {**counts, 'reused': max(counts['requests'] - counts['new'], 0)}
+                for host, counts in self._hosts.items()
+            }
+
+    def reset(self):
+        with self._lock:
+            self._hosts.clear()
+
+
+_stats = ConnectionStats()
+
+
+class _CountingPoolMixin:
+    """연결 생성과 요청 시 통계 기록"""
+
+    def _new_conn(self):
+        _stats.record_new(self.host)
+        return super()._new_conn()
+
+    def _make_request(self, conn, method, url, *args, **kwargs):
+        _stats.record_request(self.host)
+        return super()._make_request(conn, method, url, *args, **kwargs)
+
+
+class CountingHTTPConnectionPool(_CountingPoolMixin, HTTPConnectionPool):
+    pass
+
+
+class CountingHTTPSConnectionPool(_CountingPoolMixin, HTTPSConnectionPool):
+    pass
+
+
+class PooledAdapter(HTTPAdapter):
+    """
+    keep-alive 연결 풀 어댑터
+
+    연결 재사용 통계를 기록하고, 호출하는 쪽에서 timeout을 주지 않으면 기본 timeout을 적용한다.
+    """
+
+    def __init__(self, pool_maxsize=HTTP_POOL_MAXSIZE, timeout=(HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT)):
+        self.timeout = timeout
+        super().__init__(pool_connections=4, pool_maxsize=pool_maxsize)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': CountingHTTPConnectionPool,
+            'https': CountingHTTPSConnectionPool
+        }
+
+    def send(self, request, timeout=None, **kwargs):
+        response = super().send(request, timeout=self.timeout if timeout is None else timeout, **kwargs)
+        # 전송된 크기 (gzip이면 압축된 크기), 헤더가 없으면 스트리밍이 아닐 때만 본문 크기
+        length = response.headers.get('Content-Length')
+        if length is None and not kwargs.get('stream'):
+            length = len(response.content)
+        if length is not None:
+            metrics.inc('http_response_bytes_total', int(length), host=urlsplit(request.url).hostname)
+        return response
+
+
+def create_session():
+    """호스트별 크기의 연결 풀을 쓰는 세션 생성"""
+    session = requests.Session()
+    session.headers.update({
+        'Connection': 'keep-alive',
+        'Accept-Encoding': 'gzip, deflate' if HTTP_GZIP else 'identity'
+    })
+    adapter = PooledAdapter()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    # 더 긴 접두사가 우선하므로 호스트별 어댑터가 기본 어댑터보다 먼저 선택됨
+    for host, pool_maxsize in HTTP_POOL_SIZES.items():
+        session.mount(f'https://{host}/', PooledAdapter(pool_maxsize=pool_maxsize))
+    return session
+
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def get_session(provider):
+    """
+    제공자별 공유 세션 (프로세스 전체에서 재사용)
+
+    제공자마다 쿠키와 인증 헤더가 다르므로 세션은 제공자별로 두고, 풀 설정과 통계는 함께 쓴다.
+    """
+    with _sessions_lock:
+        session = _sessions.get(provider)
+        if session is None:
+            session = create_session()
+            _sessions[provider] = session
+        return session
+
+
+def connection_stats():
+    """호스트별 연결 재사용 통계"""
+    return _stats.snapshot()
+
+
+def log_connection_stats():
+    """호스트별 연결 재사용 통계를 로그로 기록"""
+    for host, counts in sorted(connection_stats().items()):
+        logger.info(f"HTTP {host}: {counts['requests']} requests, {counts['new']} new connections, "
+                    f"{counts['reused']} reused")
@@ -0,0 +1,153 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
+from operator import itemgetter
+import numpy as np
+from .config import KLINE_WORKERS, get_logger
+from . import retry
+from .response_cache import get_response_cache, is_closed_timestamp
+
+# 모듈별 로거 가져오기
+logger = get_logger('kline_engine')
+
+# 요청 1회당 최대 캔들 수와 요청 가중치
+KLINES_PAGE_LIMIT = 1000
+KLINES_REQUEST_WEIGHT = 2
+
+# kline 응답 배열에서 각 값의 위치와 변환할 타입
+KLINE_FIELDS = {
+    'open': (1, np.float64),
+    'high': (2, np.float64),
+    'low': (3, np.float64),
+    'close': (4, np.float64),
+    'volume': (5, np.float64)
+}
+KLINE_EXTRA_FIELDS = {
+    'quote_volume': (7, np.float64),
+    'trades': (8, np.int64),
+    'buy_base_volume': (9, np.float64),
+    'buy_quote_volume': (10, np.float64)
+}
+
+
+def klines_to_columns(pages, extra_columns=False):
+    """
+    원본 kline 페이지를 타입이 지정된 NumPy 배열로 변환
+
+    DataFrame(object dtype)을 거치지 않고 컬럼마다 한 번씩 응답을 훑어 바로 int64/float64 배열을 만든다.
+
+    Args:
+        pages (list): get_klines 응답 목록
+        extra_columns (bool): quote_volume, trades, 테이커 매수 거래량도 포함할지 여부
+
+    Returns:
+        dict: {'date': datetime64[ns], 'open': float64, ...}
+    """
+    count = sum(len(page) for page in pages)
+    timestamps = np.fromiter(map(itemgetter(0), chain.from_iterable(pages)), dtype=np.int64, count=count)
+    columns = {'date': timestamps.astype('datetime64[ms]').astype('datetime64[ns]')}
+
+    fields = {**KLINE_FIELDS, **KLINE_EXTRA_FIELDS} if extra_columns else KLINE_FIELDS
+    for name, (index, dtype) in fields.items():
+        columns[name] = np.fromiter(map(itemgetter(index), chain.from_iterable(pages)), dtype=dtype, count=count)
+    return columns
+
+
+class KlineEngine:
+    """
+    Binance kline 병렬 페이지 수집기
+
+    요청 구간을 1000개 캔들 단위의 독립된 페이지로 나누고 여러 스레드에서 동시에 받는다.
+    페이지는 시작 시각 순서대로 내보내므로 호출하는 쪽은 받은 순서대로 저장하면 되고,
+    동시에 진행되는 페이지 수가 max_workers로 제한되어 메모리 사용량이 전체 기간과 무관하다.
+    """
+
+    provider = 'binance'
+
+    def __init__(self, client, max_workers=KLINE_WORKERS):
+        self.client = client
+        self.max_workers = max_workers
+
+    def earliest_timestamp(self, symbol, interval):
+        """종목의 첫 캔들 시각 (상장 전 구간을 요청하지 않도록)"""
+        cache = get_response_cache()
+        params = {'symbol': symbol, 'interval': interval}
+        cached = cache.get_json(self.provider, 'earliest', params)
+        if cached is not None:
+            return cached['timestamp']
+
+        klines = retry.call(
+            self.provider,
+            lambda: self.client.get_klines(symbol=symbol, interval=interval, startTime=0, limit=1),
+            tokens=KLINES_REQUEST_WEIGHT,
+            symbol=symbol
+        )
+        if not klines:
+            return None
+        # 상장 시각은 바뀌지 않으므로 만료 없이 보관
+        cache.put_json(self.provider, 'earliest', params, {'timestamp': klines[0][0]}, closed=True)
+        return klines[0][0]
+
+    def _fetch_page(self, symbol, interval, interval_ms, page_start, page_end):
+        """한 페이지 요청 (캐시에 없을 때만 요청 가중치만큼 토큰 획득 후 호출, 일시적 오류는 재시도)"""
+        cache = get_response_cache()
+        params = {'symbol': symbol, 'interval': interval, 'start': page_start, 'end': page_end}
+        cached = cache.get_json(self.provider, 'klines', params)
+        if cached is not None:
+            return cached
+
+        klines = retry.call(self.provider, lambda: self.client.get_klines(
+            symbol=symbol,
+            interval=interval,
+            startTime=page_start,
+            endTime=page_end,
+            limit=KLINES_PAGE_LIMIT
+        ), tokens=KLINES_REQUEST_WEIGHT, symbol=symbol)
+        cache.put_json(self.provider, 'klines', params, klines, closed=is_closed_timestamp(page_end, interval_ms))
+        return klines
+
+    def iter_pages(self, symbol, interval, interval_ms, start_ts, end_ts):
+        """
+        [start_ts, end_ts) 구간의 kline을 페이지 단위로 반환
+
+        페이지는 epoch 기준의 고정된 격자에 맞춰 요청하므로 구간의 시작·끝이 달라도
+        같은 페이지(캐시 키)가 되고, 구간 밖의 캔들은 받은 뒤에 잘라낸다.
+
+        Yields:
+            list: 페이지의 원본 kline 목록 (시작 시각 순서)
+        """
+        earliest = self.earliest_timestamp(symbol, interval)
+        if earliest is None:
+            return
+        start_ts = max(start_ts, earliest)
+
+        page_ms = interval_ms * KLINES_PAGE_LIMIT
+        pages = iter(range(start_ts - start_ts % page_ms, end_ts, page_ms))
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=f'klines-{symbol}') as executor:
+            in_flight = deque()
+
+            def submit_next():
+                page_start = next(pages, None)
+                if page_start is None:
+                    return False
+                page_end = page_start + page_ms - 1
+                in_flight.append(executor.submit(self._fetch_page, symbol, interval, interval_ms, page_start, page_end))
+                return True
+
+            for _ in range(self.max_workers):
+                if not submit_next():
+                    break
+
+            try:
+                while in_flight:
+                    klines = in_flight.popleft().result()
+                    submit_next()
+                    if klines and (klines[0][0] < start_ts or klines[-1][0] >= end_ts):
+                        klines = [kline for kline in klines if start_ts <= kline[0] < end_ts]
+                    if klines:
+                        yield klines
+            finally:
+                # 실패하거나 중단되면 아직 시작하지 않은 페이지는 취소
+                for future in in_flight:
+                    future.cancel()
@@ -0,0 +1,257 @@
+import json
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from .config import METRICS_FILE, RUN_SUMMARY_FILE, get_logger
+
+# 모듈별 로거 가져오기
+logger = get_logger('metrics')
+
+# Prometheus 메트릭 이름 접두사
+PREFIX = 'fund_collector_'
+
+# 지연 시간 히스토그램 구간 (초)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+# 메트릭 설명 (Prometheus HELP)
+DESCRIPTIONS = {
+    'provider_request_seconds': 'Provider API call latency, one observation per attempt',
+    'provider_retries_total': 'Provider calls retried after a retryable error',
+    'provider_errors_total': 'Provider calls that failed for good',
+    'rate_limit_wait_seconds_total': 'Time spent waiting for rate limit tokens',
+    'response_cache_requests_total': 'Response cache lookups by result',
+    'http_requests_total': 'HTTP requests sent through the shared connection pools',
+    'http_new_connections_total': 'HTTP connections opened (the rest reused a kept-alive connection)',
+    'http_response_bytes_total': 'HTTP response bytes received',
+    'stage_seconds': 'Pipeline stage duration',
+    'stage_errors_total': 'Pipeline stages that raised',
+    'rows_written_total': 'Rows written to the store',
+    'bytes_written_total': 'Parquet bytes written to the store'
+}
+
+
+def _label_key(labels):
+    return tuple(sorted((name, str(value)) for name, value in labels.items() if value is not None))
+
+
+class _Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+                break
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q):
+        """구간 안에서 선형 보간한 분위수 추정값"""
+        if not self.count:
+            return math.nan
+        rank = q * self.count
+        cumulative = 0
+        lower = 0.0
+        for bound, count in zip(self.buckets, self.counts):
+            if count and cumulative + count >= rank:
+                return min(lower + (bound - lower) * (rank - cumulative) / count, self.max)
+            cumulative += count
+            lower = bound
+        return self.max
+
+
+class Metrics:
+    """
+    프로세스 내 메트릭 (카운터와 히스토그램, 레이블별)
+
+    실행이 시작될 때 reset()하므로 내보낸 값은 마지막 실행의 값이다.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def inc(self, name, value=1, **labels):
+        """카운터 증가"""
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        """히스토그램에 값 기록"""
+        key = (name, _label_key(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = _Histogram(self.buckets)
+            histogram.observe(value)
+
+    def quantile(self, name, q, **labels):
+        """
+        레이블이 일치하는 히스토그램을 합친 분위수 추정값
+
+        Args:
+            q (float): 0~1 사이 분위
+            labels: 이 레이블 값을 가진 계열만 합침 (없으면 같은 이름의 모든 계열)
+        """
+        wanted = set(_label_key(labels))
+        merged = _Histogram(self.buckets)
+        with self._lock:
+            for (series, series_labels), histogram in self._histograms.items():
+                if series != name or not wanted <= set(series_labels):
+                    continue
+                merged.counts = [a + b for a, b in zip(merged.counts, histogram.counts)]
+                merged.count += histogram.count
+                merged.sum += histogram.sum
+                merged.max = max(merged.max, histogram.max)
+        return merged.quantile(q)
+
+    def total(self, name, **labels):
+        """레이블이 일치하는 카운터 값의 합"""
+        wanted = set(_label_key(labels))
+        with self._lock:
+            return sum(
+                value for (series, series_labels), value in self._counters.items()
+                if series == name and wanted <= set(series_labels)
+            )
+
+    @contextmanager
+    def stage(self, stage, **labels):
+        """블록 실행 시간을 stage_seconds에 기록 (예외가 나면 stage_errors_total도 증가)"""
+        started = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.inc('stage_errors_total', stage=stage, **labels)
+            raise
+        finally:
+            self.observe('stage_seconds', time.perf_counter() - started, stage=stage, **labels)
+
+    def to_prometheus(self):
+        """Prometheus 텍스트 형식 (node_exporter textfile collector용)"""
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(self._histograms.items(), key=lambda item: item[0])
+            histograms = [(key, (list(h.counts), h.count, h.sum)) for key, h in histograms]
+
+        lines = []
+        described = set()
+
+        def header(name, kind):
+            if name not in described:
+                described.add(name)
+                lines.append(f'# HELP {PREFIX}{name} {DESCRIPTIONS.get(name, name)}')
+                lines.append(f'# TYPE {PREFIX}{name} {kind}')
+
+        for (name, labels), value in counters:
+            header(name, 'counter')
+            lines.append(f'{PREFIX}{name}{_format_labels(labels)} {_format_value(value)}')
+        for (name, labels), (counts, count, total) in histograms:
+            header(name, 'histogram')
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f'{PREFIX}{name}_bucket{_format_labels(labels + (("le", str(bound)),))} {cumulative}')
+            lines.append(f'{PREFIX}{name}_bucket{_format_labels(labels + (("le", "+Inf"),))} {count}')
+            lines.append(f'{PREFIX}{name}_sum{_format_labels(labels)} {_format_value(total)}')
+            lines.append(f'{PREFIX}{name}_count{_format_labels(labels)} {count}')
+        return '\n'.join(lines) + '\n'
+
+    def summary(self):
+        """
+        JSON용 요약
+
+        Returns:
+            dict: {'counters': {name: [{labels, value}]},
+                   'histograms': {name: [{labels, count, sum, mean, p50, p95, max}]}}
+        """
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(self._histograms.items(), key=lambda item: item[0])
+            result = {'counters': {}, 'histograms': {}}
+            for (name, labels), value in counters:
+                result['counters'].setdefault(name, []).append({'labels': dict(labels), 'value': value})
+            for (name, labels), histogram in histograms:
+                result['histograms'].setdefault(name, []).append({
+                    'labels': dict(labels),
+                    'count': histogram.count,
+                    'sum': round(histogram.sum, 6),
+                    'mean': round(histogram.sum / histogram.count, 6),
+                    'p50': round(histogram.quantile(0.5), 6),
+                    'p95': round(histogram.quantile(0.95), 6),
+                    'max': round(histogram.max, 6)
+                })
+        return result
+
+
+def _escape(value):
+    """Prometheus 레이블 값 이스케이프 (역슬래시, 큰따옴표, 줄바꿈)"""
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels) + '}'
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _write_atomic(path, content):
+    """임시 파일에 쓴 뒤 교체 (수집기가 읽는 도중 파일이 바뀌지 않도록)"""
+    tmp_file = path.with_suffix(path.suffix + '.tmp')
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        f.write(content)
+    os.replace(tmp_file, path)
+
+
+_metrics = Metrics()
+
+
+def get_metrics():
+    """프로세스 전체에서 공유하는 메트릭"""
+    return _metrics
+
+
+def inc(name, value=1, **labels):
+    _metrics.inc(name, value, **labels)
+
+
+def observe(name, value, **labels):
+    _metrics.observe(name, value, **labels)
+
+
+def stage(stage, **labels):
+    return _metrics.stage(stage, **labels)
+
+
+def export(run=None, metrics_file=METRICS_FILE, summary_file=RUN_SUMMARY_FILE):
+    """
+    메트릭을 Prometheus 텍스트 파일과 JSON 실행 요약으로 저장 (data_range.json과 같은 디렉토리)
+
+    Args:
+        run (dict): 실행 정보 (RunLog.summary()), 요약 파일의 'run' 항목으로 기록
+    """
+    try:
+        _write_atomic(metrics_file, _metrics.to_prometheus())
+        summary = {'run': run or {}, **_metrics.summary()}
+        _write_atomic(summary_file, json.dumps(summary, ensure_ascii=False, indent=2, default=str))
+    except OSError as e:
+        logger.error(f"Error exporting metrics: {str(e)}")
@@ -0,0 +1,421 @@
+import base64
+import json
+import math
+import os
+import threading
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from .config import get_logger
+from .storage import DATE_TYPE
+
+# 모듈별 로거 가져오기
+logger = get_logger('parquet_stats')
+
+
+def _is_numeric(data_type):
+    return pa.types.is_integer(data_type) or pa.types.is_floating(data_type)
+
+
+class ColumnStats:
+    """
+    수치형 컬럼의 병합 가능한 통계
+
+    최소·최대·null 수는 Parquet row group 통계에서 가져오고,
+    평균과 분산은 row group 단위로 계산한 값을 병렬 분산 공식(Chan et al.)으로 합친다.
+    """
+
+    def __init__(self):
+        self.count = 0      # null이 아닌 값 수
+        self.nulls = 0
+        self.min = None
+        self.max = None
+        self.mean = 0.0
+        self.m2 = 0.0       # 평균과의 편차 제곱합
+
+    def update_range(self, minimum, maximum):
+        if minimum is not None:
+            self.min = minimum if self.min is None else min(self.min, minimum)
+        if maximum is not None:
+            self.max = maximum if self.max is None else max(self.max, maximum)
+
+    def update_moments(self, count, mean, m2):
+        """다른 구간의 값 수·평균·편차 제곱합을 합침"""
+        if not count:
+            return
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self.m2 += m2 + delta * delta * self.count * count / total
+        self.count = total
+
+    def add_moments(self, array, with_range=False):
+        """
+        값 배열의 평균·분산을 반영 (null은 제외)
+
+        NaN은 Parquet 통계의 null 수에 들어가지 않으므로 여기서 null로 센다
+        (pandas로 기록한 이전 형식의 파일에 남아 있음).
+
+        Args:
+            with_range (bool): 최소·최대도 배열에서 계산할지 여부 (Parquet 통계가 없는 경우)
+        """
+        values = pc.cast(array, pa.float64())
+        if pa.types.is_floating(array.type):
+            is_nan = pc.fill_null(pc.is_nan(values), False)
+            nan_count = pc.sum(is_nan).as_py() or 0
+            if nan_count:
+                self.nulls += nan_count
+                values = pc.filter(values, pc.invert(is_nan))
+                array = values
+        count = len(values) - values.null_count
+        if not count:
+            return
+        mean = pc.mean(values).as_py()
+        m2 = pc.variance(values, ddof=0).as_py() * count
+        self.update_moments(count, mean, m2)
+        if with_range:
+            bounds = pc.min_max(array)
+            self.update_range(bounds['min'].as_py(), bounds['max'].as_py())
+
+    def add_array(self, array):
+        """메모리에 있는 값 배열로 모든 통계 반영"""
+        self.nulls += array.null_count
+        self.add_moments(array, with_range=True)
+
+    def merge(self, other):
+        self.nulls += other.nulls
+        self.update_range(other.min, other.max)
+        self.update_moments(other.count, other.mean, other.m2)
+
+    @property
+    def std(self):
+        """표본 표준편차 (pandas의 std()와 같은 ddof=1)"""
+        if self.count < 2:
+            return math.nan
+        return math.sqrt(self.m2 / (self.count - 1))
+
+    def to_dict(self):
+        # Parquet 통계는 0의 최소값을 -0.0으로 기록하므로 0.0을 더해 부호 제거
+        return {
+            "min": float(self.min) + 0.0 if self.min is not None else math.nan,
+            "max": float(self.max) + 0.0 if self.max is not None else math.nan,
+            "mean": float(self.mean) if self.count else math.nan,
+            "std": float(self.std),
+            "null_count": int(self.nulls)
+        }
+
+    def to_state(self):
+        """캐시에 저장할 누적 상태 (다시 병합할 수 있는 형태)"""
+        return {
+            "count": self.count,
+            "nulls": self.nulls,
+            "min": self.min,
+            "max": self.max,
+            "mean": self.mean,
+            "m2": self.m2
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        stats = cls()
+        for name, value in state.items():
+            setattr(stats, name, value)
+        return stats
+
+
+class DatasetStats:
+    """시장 데이터셋의 병합 가능한 통계 (행 수, 기간, 종목 수, 수치형 컬럼 통계)"""
+
+    def __init__(self, key):
+        self.key = key
+        self.rows = 0
+        self.first = None
+        self.last = None
+        self.symbols = set()
+        self.schemas = []
+        self.columns = {}
+
+    def column(self, name):
+        return self.columns.setdefault(name, ColumnStats())
+
+    def add_schema(self, schema):
+        # 파티션마다 스키마가 거의 같으므로 서로 다른 스키마만 보관
+        if not any(schema.equals(existing) for existing in self.schemas):
+            self.schemas.append(schema)
+
+    def update_dates(self, first, last):
+        if first is not None:
+            first = _to_utc(first)
+            self.first = first if self.first is None else min(self.first, first)
+        if last is not None:
+            last = _to_utc(last)
+            self.last = last if self.last is None else max(self.last, last)
+
+    def merge(self, other):
+        self.rows += other.rows
+        self.update_dates(other.first, other.last)
+        self.symbols |= other.symbols
+        for schema in other.schemas:
+            self.add_schema(schema)
+        for name, stats in other.columns.items():
+            self.column(name).merge(stats)
+
+    def to_state(self):
+        """캐시에 저장할 누적 상태 (스키마는 Arrow IPC 직렬화 후 base64)"""
+        return {
+            "rows": self.rows,
+            "first": self.first.isoformat() if self.first is not None else None,
+            "last": self.last.isoformat() if self.last is not None else None,
+            "symbols": sorted(self.symbols),
+            "schemas": [base64.b64encode(schema.serialize().to_pybytes()).decode('ascii') for schema in self.schemas],
+            "columns": {name: stats.to_state() for name, stats in self.columns.items()}
+        }
+
+    @classmethod
+    def from_state(cls, key, state):
+        stats = cls(key)
+        stats.rows = state["rows"]
+        stats.update_dates(state["first"], state["last"])
+        stats.symbols = set(state["symbols"])
+        stats.schemas = [pa.ipc.read_schema(pa.py_buffer(base64.b64decode(schema))) for schema in state["schemas"]]
+        stats.columns = {name: ColumnStats.from_state(column) for name, column in state["columns"].items()}
+        return stats
+
+    def data_types(self):
+        """pandas로 읽었을 때의 컬럼 타입 (파일을 읽지 않고 스키마로 계산)"""
+        if not self.schemas:
+            return {}
+        schema = pa.unify_schemas(self.schemas, promote_options='permissive')
+        return schema.empty_table().to_pandas().dtypes.astype(str).to_dict()
+
+    def to_analysis(self):
+        """DataDictionaryGenerator.analyze_dataframe()과 같은 형식의 결과"""
+        columns = list(dict.fromkeys(name for schema in self.schemas for name in schema.names))
+        return {
+            "columns": columns,
+            "data_types": self.data_types(),
+            "row_count": self.rows,
+            "date_range": {
+                "start": self.first.strftime("%Y-%m-%d") if self.first is not None else None,
+                "end": self.last.strftime("%Y-%m-%d") if self.last is not None else None
+            },
+            "unique_symbols": len(self.symbols),
+            "column_stats": {name: stats.to_dict() for name, stats in self.columns.items()}
+        }
+
+
+def _to_utc(timestamp):
+    timestamp = pd.Timestamp(timestamp)
+    return timestamp.tz_localize('UTC') if timestamp.tzinfo is None else timestamp.tz_convert('UTC')
+
+
+def _normalized_schema(schema, key):
+    """파일 스키마를 load()가 돌려주는 형태(UTC date, 문자열 종목)로 맞춤"""
+    fields = []
+    for field in schema:
+        if field.name == 'date':
+            field = field.with_type(DATE_TYPE)
+        elif field.name == key:
+            field = field.with_type(pa.string())
+        fields.append(field)
+    return pa.schema(fields)
+
+
+def file_stats(path, key):
+    """
+    Parquet 파일 하나의 통계
+
+    행 수, 기간, 최소·최대·null 수는 footer 메타데이터에서 읽고,
+    평균·분산만 수치형 컬럼을 row group 하나씩 읽어 계산한다.
+    """
+    parquet_file = pq.ParquetFile(path)
+    metadata = parquet_file.metadata
+    schema = parquet_file.schema_arrow
+    stats = DatasetStats(key)
+    stats.rows = metadata.num_rows
+    stats.add_schema(_normalized_schema(schema, key))
+
+    numeric = [field.name for field in schema if field.name not in ('date', key) and _is_numeric(field.type)]
+    # footer에 통계가 없는 (row group, 컬럼)은 값을 읽을 때 함께 계산
+    missing = set()
+    for index in range(metadata.num_row_groups):
+        row_group = metadata.row_group(index)
+        for position in range(row_group.num_columns):
+            chunk = row_group.column(position)
+            name = chunk.path_in_schema
+            if name != 'date' and name not in numeric:
+                continue
+            statistics = chunk.statistics
+            if statistics is None or not statistics.has_null_count:
+                missing.add((index, name))
+                continue
+            # 값이 모두 null인 row group에는 최소·최대가 없음
+            if name == 'date':
+                if statistics.has_min_max:
+                    stats.update_dates(statistics.min, statistics.max)
+                continue
+            column = stats.column(name)
+            column.nulls += statistics.null_count
+            if statistics.has_min_max:
+                column.update_range(statistics.min, statistics.max)
+
+    for index in range(metadata.num_row_groups):
+        names = numeric + (['date'] if (index, 'date') in missing else [])
+        if not names:
+            continue
+        row_group = parquet_file.read_row_group(index, columns=names)
+        if (index, 'date') in missing:
+            dates = pc.min_max(row_group['date'])
+            stats.update_dates(dates['min'].as_py(), dates['max'].as_py())
+        for name in numeric:
+            if (index, name) in missing:
+                stats.column(name).add_array(row_group[name])
+            else:
+                stats.column(name).add_moments(row_group[name])
+    return stats
+
+
+def table_stats(table, key):
+    """메모리에 있는 Arrow 테이블의 통계 (배치 단위로 계산)"""
+    stats = DatasetStats(key)
+    stats.rows = table.num_rows
+    stats.add_schema(table.schema)
+    if 'date' in table.column_names and table.num_rows:
+        dates = pc.min_max(table['date'])
+        stats.update_dates(dates['min'].as_py(), dates['max'].as_py())
+    numeric = [field.name for field in table.schema if field.name not in ('date', key) and _is_numeric(field.type)]
+    for batch in table.to_batches():
+        for name in numeric:
+            stats.column(name).add_array(batch.column(name))
+    return stats
+
+
+def partition_stats(store, market, partition):
+    """
+    파티션(종목·연도) 하나의 통계
+
+    파일이 base 하나뿐이면 메타데이터와 row group 단위 읽기로 계산한다.
+    병합되지 않은 delta가 있으면 중복 행을 빼야 하므로 파티션을 로드해 계산한다
+    (delta는 COMPACT_THRESHOLD 개마다 병합되므로 파티션 하나 크기로 제한됨).
+    """
+    key = store.key_column(market)
+    files = store.partition_files(partition)
+    if len(files) == 1:
+        stats = file_stats(files[0], key)
+    else:
+        table = store.load_partition(market, partition)
+        stats = table_stats(table, key) if table is not None else DatasetStats(key)
+    if stats.rows:
+        stats.symbols.add(partition.parent.name)
+    return stats
+
+
+class StatsCache:
+    """
+    파티션별 통계 캐시 (JSON 파일)
+
+    파티션 경로를 키로, 파티션 파일들의 (이름, 크기, 수정 시각)을 지문으로 저장한다.
+    지문이 같은 파티션은 파일을 열지 않고 저장된 누적 상태를 병합한다.
+    """
+
+    VERSION = 1
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries = self._load()
+        self.hits = 0
+        self.misses = 0
+
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable statistics cache {self.path}: {str(e)}")
+            return {}
+        if data.get("version") != self.VERSION:
+            return {}
+        return data.get("partitions", {})
+
+    @staticmethod
+    def fingerprint(files):
+        """파티션 파일 목록의 지문 (병합이나 추가가 있으면 바뀜)"""
+        fingerprint = []
+        for path in files:
+            stat = path.stat()
+            fingerprint.append([path.name, stat.st_size, stat.st_mtime_ns])
+        return fingerprint
+
+    def get(self, key, fingerprint):
+        """지문이 같으면 저장된 상태 (없으면 None)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry["files"] == fingerprint:
+                self.hits += 1
+                return entry["stats"]
+            self.misses += 1
+            return None
+
+    def put(self, key, fingerprint, state):
+        with self._lock:
+            self._entries[key] = {"files": fingerprint, "stats": state}
+
+    def retain(self, prefix, keys):
+        """prefix로 시작하는 항목 중 keys에 없는 항목 삭제 (삭제된 파티션 정리)"""
+        keys = set(keys)
+        with self._lock:
+            for key in [key for key in self._entries if key.startswith(prefix) and key not in keys]:
+                del self._entries[key]
+
+    def save(self):
+        """임시 파일에 쓴 뒤 교체하여 중단 시에도 파일이 깨지지 않도록 저장"""
+        with self._lock:
+            data = {"version": self.VERSION, "partitions": self._entries}
+            tmp_file = self.path.with_suffix(self.path.suffix + '.tmp')
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.replace(tmp_file, self.path)
+
+
+def market_stats(store, market, cache=None):
+    """
+    시장 데이터셋 전체의 통계 (파티션별 통계를 병합)
+
+    Args:
+        cache (StatsCache): 파티션별 통계 캐시 (None이면 모든 파티션 계산)
+
+    Returns:
+        DatasetStats: 데이터가 없으면 rows가 0
+    """
+    store.migrate_legacy(market)
+    key = store.key_column(market)
+    stats = DatasetStats(key)
+    partition_keys = []
+    computed = 0
+    for partition in store.partitions(market):
+        if cache is None:
+            stats.merge(partition_stats(store, market, partition))
+            continue
+        partition_key = partition.relative_to(store.root).as_posix()
+        partition_keys.append(partition_key)
+        fingerprint = cache.fingerprint(store.partition_files(partition))
+        state = cache.get(partition_key, fingerprint)
+        if state is not None:
+            stats.merge(DatasetStats.from_state(key, state))
+            continue
+        partition_result = partition_stats(store, market, partition)
+        cache.put(partition_key, fingerprint, partition_result.to_state())
+        stats.merge(partition_result)
+        computed += 1
+
+    if cache is not None:
+        cache.retain(f'{market}/', partition_keys)
+        logger.info(f"Computed {market} statistics: {stats.rows} rows in {len(stats.symbols)} symbols "
+                    f"({computed} of {len(partition_keys)} partitions changed)")
+    else:
+        logger.info(f"Computed {market} statistics: {stats.rows} rows in {len(stats.symbols)} symbols")
+    return stats
@@ -0,0 +1,161 @@
+import logging
+import multiprocessing
+import queue
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from logging.handlers import QueueHandler, QueueListener
+from .config import PIPELINE_PROCESSES, PIPELINE_QUEUE_SIZE, get_logger
+from . import metrics
+
+# 모듈별 로거 가져오기
+logger = get_logger('pipeline')
+
+# 받기 단계가 끝났음을 알리는 표시
+_DONE = object()
+
+
+class _SourceError:
+    """받기 단계에서 난 예외 (그 전까지 받은 항목을 저장한 뒤 다시 발생)"""
+
+    def __init__(self, error):
+        self.error = error
+
+
+class _ForwardHandler(logging.Handler):
+    """작업 프로세스에서 받은 로그 레코드를 이 프로세스의 같은 이름 로거로 전달"""
+
+    def emit(self, record):
+        logging.getLogger(record.name).handle(record)
+
+
+def _init_worker(log_queue):
+    """
+    작업 프로세스 초기화
+
+    spawn한 프로세스도 config를 임포트하면서 error_log.txt 파일 핸들러를 붙이므로,
+    여러 프로세스가 같은 파일을 회전시키지 않도록 떼어 내고 로그는 부모 프로세스로 보낸다.
+    """
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+        handler.close()
+    root.addHandler(QueueHandler(log_queue))
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_process_pool():
+    """
+    변환 단계용 프로세스 풀 (PIPELINE_PROCESSES가 0이면 None)
+
+    모든 제공자의 파이프라인이 같은 풀을 쓰므로 동시에 실행되는 변환 작업 수는 코어 수로 제한된다.
+    """
+    global _pool
+    if PIPELINE_PROCESSES <= 0:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            # 수집 스레드가 실행 중이므로 잠금 상태까지 복사하는 fork 대신 spawn 사용
+            context = multiprocessing.get_context('spawn')
+            # 작업 프로세스의 로그는 큐로 받아 이 프로세스의 핸들러(로그 파일, 실행 기록)로 기록
+            log_queue = context.Queue()
+            QueueListener(log_queue, _ForwardHandler()).start()
+            _pool = ProcessPoolExecutor(
+                max_workers=PIPELINE_PROCESSES,
+                mp_context=context,
+                initializer=_init_worker,
+                initargs=(log_queue,)
+            )
+            logger.info(f"Started {PIPELINE_PROCESSES} pipeline worker processes")
+        return _pool
+
+
+def _timed(transform, item):
+    """변환 실행 후 (소요 시간, 결과) 반환 (작업 프로세스의 메트릭은 합쳐지지 않으므로 시간을 함께 돌려줌)"""
+    started = time.perf_counter()
+    result = transform(item)
+    return time.perf_counter() - started, result
+
+
+def run(source, transform, commit, market, queue_size=PIPELINE_QUEUE_SIZE):
+    """
+    받기 → 변환 → 저장 단계를 겹쳐서 실행
+
+    - 받기: source를 별도 스레드에서 순회 (네트워크 대기)
+    - 변환: transform(item)을 프로세스 풀에서 실행 (DataFrame 변환, Parquet 인코딩)
+    - 저장: commit(결과)를 호출한 스레드에서 source 순서대로 실행 (파일 기록, 진행 상태 저장)
+
+    변환 중이거나 저장을 기다리는 항목이 queue_size개이면 받기 단계가 멈추므로(backpressure)
+    메모리에는 최대 queue_size개 항목만 남는다.
+    source에서 예외가 나면 그 전까지 받은 항목을 모두 저장한 뒤 같은 예외를 발생시킨다.
+
+    Args:
+        source (iterable): 받은 항목 (예: kline 페이지 묶음, 종목별 시세)
+        transform (callable): 모듈 최상위 함수 또는 그 partial (다른 프로세스로 보낼 수 있어야 함)
+        commit (callable): 변환 결과를 저장
+        market (str): 스레드 이름과 메트릭 레이블
+        queue_size (int): 변환 중이거나 저장을 기다릴 수 있는 최대 항목 수
+
+    Returns:
+        int: 저장한 항목 수
+    """
+    pool = get_process_pool()
+    local_pool = None
+    if pool is None:
+        # 프로세스를 쓰지 않아도 변환은 별도 스레드에서 받기·저장과 겹쳐 실행
+        pool = local_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f'transform-{market}')
+
+    pending = queue.Queue(maxsize=max(queue_size, 1))
+    stop = threading.Event()
+
+    def put(entry):
+        # 저장 단계가 멈췄으면 더 넣지 않음
+        while not stop.is_set():
+            try:
+                pending.put(entry, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def fetch():
+        try:
+            for item in source:
+                if not put(pool.submit(_timed, transform, item)):
+                    break
+        except Exception as e:
+            put(_SourceError(e))
+        finally:
+            close = getattr(source, 'close', None)
+            if close is not None:
+                close()
+            put(_DONE)
+
+    fetcher = threading.Thread(target=fetch, name=f'fetch-{market}', daemon=True)
+    fetcher.start()
+    committed = 0
+    try:
+        while True:
+            entry = pending.get()
+            if entry is _DONE:
+                break
+            if isinstance(entry, _SourceError):
+                raise entry.error
+            seconds, result = entry.result()
+            metrics.observe('stage_seconds', seconds, stage='transform', market=market)
+            commit(result)
+            committed += 1
+    finally:
+        stop.set()
+        fetcher.join()
+        # 저장하지 않은 변환은 취소 (이미 시작한 변환의 결과는 버림)
+        while not pending.empty():
+            entry = pending.get_nowait()
+            if isinstance(entry, Future):
+                entry.cancel()
+        if local_pool is not None:
+            local_pool.shutdown(wait=True)
+    return committed
@@ -0,0 +1,92 @@
+import threading
+import time
+from .config import RATE_LIMITS, RATE_LIMIT_BACKOFF, get_logger
+from . import metrics
+
+# 모듈별 로거 가져오기
+logger = get_logger('rate_limiter')
+
+
+class TokenBucket:
+    """
+    토큰 버킷 방식의 요청 한도 관리
+
+    윈도우당 capacity개의 토큰이 일정한 속도로 채워지며,
+    요청 전에 토큰을 꺼내고 토큰이 부족하면 채워질 때까지만 대기한다.
+    """
+
+    def __init__(self, capacity, window):
+        self.capacity = capacity
+        self.window = window
+        self.rate = capacity / window  # 초당 충전되는 토큰 수
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        """경과 시간만큼 토큰 충전"""
+        elapsed = now - self._updated
+        if elapsed > 0:
+            self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+            self._updated = now
+
+    def acquire(self, tokens=1):
+        """
+        토큰 획득 (필요하면 대기)
+
+        Args:
+            tokens (int): 요청 가중치. 버킷 크기보다 크면 버킷 크기로 제한된다.
+
+        Returns:
+            float: 대기한 시간 (초)
+        """
+        tokens = min(tokens, self.capacity)
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                wait = self._blocked_until - now
+                if wait <= 0:
+                    if self._tokens >= tokens:
+                        self._tokens -= tokens
+                        return waited
+                    wait = (tokens - self._tokens) / self.rate
+            time.sleep(wait)
+            waited += wait
+
+    def penalize(self, seconds):
+        """요청 실패 후 일정 시간 동안 새 요청을 막음"""
+        with self._lock:
+            now = time.monotonic()
+            self._blocked_until = max(self._blocked_until, now + seconds)
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(provider):
+    """제공자별 토큰 버킷 (프로세스 전체에서 공유)"""
+    with _limiters_lock:
+        limiter = _limiters.get(provider)
+        if limiter is None:
+            capacity, window = RATE_LIMITS.get(provider, (60, 60.0))
+            limiter = TokenBucket(capacity, window)
+            _limiters[provider] = limiter
+        return limiter
+
+
+def acquire(provider, tokens=1):
+    """제공자 호출 전 토큰 획득"""
+    waited = get_rate_limiter(provider).acquire(tokens)
+    if waited > 0:
+        metrics.inc('rate_limit_wait_seconds_total', waited, provider=provider)
+        logger.info(f"Rate limited on {provider}: waited {waited:.2f}s")
+    return waited
+
+
+def penalize(provider, seconds=None):
+    """제공자 호출 실패 시 다음 요청을 늦춤"""
+    get_rate_limiter(provider).penalize(RATE_LIMIT_BACKOFF if seconds is None else seconds)
@@ -0,0 +1,82 @@
+import importlib
+import threading
+from .config import get_logger
+
+# 모듈별 로거 가져오기
+logger = get_logger('registry')
+
+# 시장별 수집기 (모듈, 클래스, 제공자) - 제공자는 수집기 클래스의 provider 속성과 같아야 함
+# 수집기 모듈은 yfinance, python-binance, pandas를 임포트하므로 실제로 수집할 때만 로드한다.
+COLLECTORS = {
+    'stocks': ('fetch_stocks', 'StockDataFetcher', 'yahoo'),
+    'commodities': ('fetch_commodities', 'CommodityDataFetcher', 'yahoo'),
+    'bonds': ('fetch_bonds', 'BondDataFetcher', 'fred'),
+    'forex': ('fetch_forex', 'ForexDataFetcher', 'yahoo'),
+    'crypto': ('fetch_crypto', 'CryptoDataFetcher', 'binance'),
+    'real_estate': ('fetch_real_estate', 'RealEstateDataFetcher', 'yahoo')
+}
+
+MARKETS = list(COLLECTORS)
+
+
+def provider_of(market):
+    """시장의 제공자 (수집기 모듈을 임포트하지 않음)"""
+    return COLLECTORS[market][2]
+
+
+def load_collector_class(market):
+    """시장의 수집기 클래스 (처음 호출할 때 모듈 임포트)"""
+    module_name, class_name, _ = COLLECTORS[market]
+    module = importlib.import_module(f'{__package__}.{module_name}')
+    return getattr(module, class_name)
+
+
+class CollectorRegistry:
+    """
+    지연 생성 수집기 목록
+
+    선택한 시장만 보관하고, 수집기 모듈 임포트와 인스턴스 생성은 get()으로 처음 꺼낼 때 한다.
+    """
+
+    def __init__(self, markets=None):
+        markets = MARKETS if markets is None else markets
+        unknown = [market for market in markets if market not in COLLECTORS]
+        if unknown:
+            raise ValueError(f"Unknown markets: {', '.join(unknown)}")
+        self.markets = list(markets)
+        self._instances = {}
+        self._lock = threading.Lock()
+
+    def __iter__(self):
+        return iter(self.markets)
+
+    def __len__(self):
+        return len(self.markets)
+
+    def __contains__(self, market):
+        return market in self.markets
+
+    def keys(self):
+        return list(self.markets)
+
+    def get(self, market):
+        """시장의 수집기 (처음 요청할 때 생성)"""
+        with self._lock:
+            collector = self._instances.get(market)
+            if collector is None:
+                collector = load_collector_class(market)()
+                self._instances[market] = collector
+                logger.info(f"Loaded {market} collector")
+            return collector
+
+    def __getitem__(self, market):
+        if market not in self.markets:
+            raise KeyError(market)
+        return self.get(market)
+
+    def provider_groups(self, markets=None):
+        """제공자별 시장 목록 (등록 순서 유지, 수집기를 생성하지 않음)"""
+        groups = {}
+        for market in self.markets if markets is None else markets:
+            groups.setdefault(provider_of(market), []).append(market)
+        return groups
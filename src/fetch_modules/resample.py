@@ -0,0 +1,255 @@
+import re
+import pandas as pd
+from .config import RESAMPLE_INTERVALS, config, get_logger
+from . import resume_tracker
+from .storage import get_store, DERIVED_SEPARATOR
+
+# 모듈별 로거 가져오기
+logger = get_logger('resample')
+
+# 간격 단위별 초 (비교용, 달과 년은 근사값)
+_UNIT_SECONDS = {
+    'm': 60,
+    'h': 3600,
+    'd': 86400,
+    'w': 604800,
+    'wk': 604800,
+    'mo': 2592000,
+    'y': 31536000
+}
+
+# 간격 단위별 pandas 주기 (주봉은 월요일 시작, 월봉·연봉은 시작일 기준)
+_UNIT_RULES = {
+    'm': 'min',
+    'h': 'h',
+    'd': 'D',
+    'w': 'W-MON',
+    'wk': 'W-MON',
+    'mo': 'MS',
+    'y': 'YS'
+}
+
+_INTERVAL_PATTERN = re.compile(r'^(\d+)(mo|wk|m|h|d|w|y)$')
+
+# 컬럼별 집계 방법 (목록에 없는 컬럼은 마지막 값)
+COLUMN_AGGREGATIONS = {
+    'open': 'first',
+    'high': 'max',
+    'low': 'min',
+    'close': 'last',
+    'volume': 'sum',
+    'quote_volume': 'sum',
+    'trades': 'sum',
+    'buy_base_volume': 'sum',
+    'buy_quote_volume': 'sum',
+    'Dividends': 'sum',
+    'Capital Gains': 'sum',
+    'Stock Splits': 'max',
+    'value': 'mean'  # FRED의 기본 집계 방식(평균)과 같게
+}
+
+
+def _parse_interval(interval):
+    match = _INTERVAL_PATTERN.match(interval.lower())
+    if not match:
+        raise ValueError(f"Unsupported interval: {interval}")
+    return int(match.group(1)), match.group(2)
+
+
+def interval_seconds(interval):
+    """간격 길이 (초, 달은 30일로 계산)"""
+    count, unit = _parse_interval(interval)
+    return count * _UNIT_SECONDS[unit]
+
+
+def interval_rule(interval):
+    """간격에 해당하는 pandas 주기 문자열"""
+    count, unit = _parse_interval(interval)
+    rule = _UNIT_RULES[unit]
+    return rule if count == 1 else f'{count}{rule}'
+
+
+def rollup_market(market, interval):
+    """파생 데이터셋 이름 (예: 'crypto@1w')"""
+    return f'{market}{DERIVED_SEPARATOR}{interval}'
+
+
+def resample_ohlcv(df, key, interval):
+    """
+    캔들을 더 긴 간격으로 집계
+
+    시가는 첫 값, 고가는 최대, 저가는 최소, 종가는 마지막 값, 거래량은 합계로 계산하며
+    종목별·구간별 groupby 한 번으로 처리한다. 구간의 날짜는 구간 시작 시각이다.
+
+    Args:
+        df (DataFrame): 'date'와 key 컬럼을 포함한 캔들
+        key (str): 종목 식별 컬럼
+        interval (str): 집계할 간격 (예: '1h', '1d', '1w', '1mo')
+
+    Returns:
+        DataFrame: 집계한 캔들 (원본과 같은 컬럼)
+    """
+    aggregations = {
+        column: COLUMN_AGGREGATIONS.get(column, 'last')
+        for column in df.columns
+        if column not in ('date', key)
+    }
+    grouper = pd.Grouper(key='date', freq=interval_rule(interval), label='left', closed='left')
+    rolled = df.groupby([key, grouper], sort=True).agg(aggregations)
+    # 데이터가 없는 구간 제거
+    rolled = rolled.dropna(how='all')
+    return rolled.reset_index()[df.columns.tolist()]
+
+
+def _is_coarser(interval, base):
+    try:
+        return interval_seconds(interval) > interval_seconds(base)
+    except ValueError:
+        return False
+
+
+def collection_interval(market, section):
+    """
+    이번 실행에서 제공자에게 요청할 간격
+
+    저장소는 시장마다 지금까지 요청된 가장 짧은 간격(기준 간격)의 데이터만 받아 두고,
+    더 긴 간격은 받지 않고 update_rollups()로 로컬에서 만든다.
+    더 짧은 간격이 요청되면 기존 데이터를 기존 간격의 파생 데이터셋으로 옮긴 뒤 새 간격으로 다시 수집한다.
+    """
+    requested = config.interval
+    base = section.get('interval')
+    if base is None:
+        section['interval'] = requested
+        return requested
+    if base == requested or _is_coarser(requested, base):
+        return base
+    try:
+        interval_seconds(requested)
+        interval_seconds(base)
+    except ValueError:
+        logger.warning(f"Cannot compare intervals {requested} and {base} for {market}, keeping {base}")
+        return base
+
+    _rebase(market, section, requested)
+    return requested
+
+
+def _rebase(market, section, interval):
+    """기준 간격을 더 짧은 간격으로 변경 (기존 데이터는 파생 데이터셋으로 보존)"""
+    store = get_store()
+    base = section['interval']
+    target = rollup_market(market, base)
+
+    if store.exists(market):
+        for symbol in section.get('watermarks', {}):
+            df = store.read(market, symbols=[symbol])
+            if not df.empty:
+                # 종목의 원래 시간대를 유지하여 옮김
+                df['date'] = df['date'].dt.tz_convert(store.timezone(market, symbol))
+                store.append(target, df)
+        store.drop(market)
+
+    # 기존 데이터가 파생 데이터셋의 시작점이 되고, 이후 구간은 새 기준 데이터로 집계
+    rollups = section.setdefault('rollups', {})
+    rollups[base] = {
+        symbol: watermark['last'] for symbol, watermark in section.get('watermarks', {}).items()
+        if watermark.get('last')
+    }
+    section['watermarks'] = {}
+    section['last_fetch_date'] = None
+    section['interval'] = interval
+    resume_tracker.save_market(market, section)
+    logger.info(f"Rebased {market} from {base} to {interval}, previous data moved to {target}")
+
+
+def rollup_intervals(section):
+    """기준 간격보다 긴 간격 중 유지할 파생 간격 목록"""
+    base = section.get('interval')
+    if not base:
+        return []
+    intervals = list(RESAMPLE_INTERVALS)
+    if config.interval not in intervals:
+        intervals.append(config.interval)
+    intervals.extend(interval for interval in section.get('rollups', {}) if interval not in intervals)
+    return [interval for interval in intervals if _is_coarser(interval, base)]
+
+
+def _to_utc(timestamp):
+    """시간대가 없는 UTC 시각으로 변환 (시간대가 다른 표시끼리 비교용)"""
+    if timestamp.tzinfo is not None:
+        return timestamp.tz_convert('UTC').tz_localize(None)
+    return timestamp
+
+
+def _align(timestamp, dates):
+    """비교할 수 있도록 시각을 날짜 컬럼의 시간대 표현에 맞춤"""
+    if dates.dt.tz is not None and timestamp.tzinfo is None:
+        return timestamp.tz_localize('UTC')
+    if dates.dt.tz is None:
+        return _to_utc(timestamp)
+    return timestamp
+
+
+def update_rollups(market):
+    """
+    기준 데이터에서 파생 간격 데이터셋을 증분 갱신
+
+    종목별로 마지막으로 집계한 구간의 시작부터 다시 읽어 집계하므로,
+    아직 끝나지 않은 마지막 구간은 새 캔들이 들어올 때마다 덮어쓴다.
+
+    Returns:
+        int: 기록한 파생 캔들 수
+    """
+    store = get_store()
+    section = resume_tracker.load_tracker().get(market)
+    if not section:
+        return 0
+    intervals = rollup_intervals(section)
+    if not intervals:
+        return 0
+    key = store.key_column(market)
+    rollups = section.setdefault('rollups', {})
+
+    written = 0
+    for symbol in section.get('watermarks', {}):
+        # 모든 간격에 필요한 가장 이른 구간부터 한 번만 읽음
+        marks = [rollups.get(interval, {}).get(symbol) for interval in intervals]
+        since = None if None in marks else min(_to_utc(pd.Timestamp(mark)) for mark in marks)
+        df = store.read(market, symbols=[symbol], start=since)
+        if df.empty:
+            continue
+        # 일·주·월 구간은 종목의 현지 시간 기준으로 나눔
+        df['date'] = df['date'].dt.tz_convert(store.timezone(market, symbol))
+
+        for interval in intervals:
+            mark = rollups.setdefault(interval, {}).get(symbol)
+            part = df if mark is None else df[df['date'] >= _align(pd.Timestamp(mark), df['date'])]
+            if part.empty:
+                continue
+            rolled = resample_ohlcv(part, key, interval)
+            if rolled.empty:
+                continue
+            store.append(rollup_market(market, interval), rolled)
+            # 마지막 구간은 미완성일 수 있으므로 다음에는 그 시작 시각부터 다시 집계
+            rollups[interval][symbol] = rolled['date'].iloc[-1].isoformat()
+            written += len(rolled)
+
+    resume_tracker.save_market(market, section)
+    if written:
+        logger.info(f"Updated {market} rollups ({', '.join(intervals)}): {written} bars")
+    return written
+
+
+def read_interval(market, interval=None, symbols=None, start=None, end=None, columns=None):
+    """
+    시장 데이터를 원하는 간격으로 로드
+
+    기준 간격보다 긴 간격이면 파생 데이터셋을, 그 외에는 수집한 데이터를 읽는다.
+    종목·기간·컬럼 조건은 ParquetStore.read()와 같다.
+    """
+    store = get_store()
+    base = resume_tracker.load_tracker().get(market, {}).get('interval')
+    interval = interval or config.interval
+    if base and _is_coarser(interval, base):
+        market = rollup_market(market, interval)
+    return store.read(market, symbols=symbols, start=start, end=end, columns=columns)
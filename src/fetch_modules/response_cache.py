@@ -0,0 +1,170 @@
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+import pandas as pd
+from .config import cache_dir, RESPONSE_CACHE_ENABLED, RESPONSE_CACHE_MAX_BYTES, RESPONSE_CACHE_OPEN_TTL, get_logger
+from . import metrics
+
+# 모듈별 로거 가져오기
+logger = get_logger('response_cache')
+
+
+def is_closed_date(end_date):
+    """
+    날짜 구간의 끝이 이미 확정된 과거인지 여부
+
+    시간대 차이와 장 마감 후 보정을 고려해 이틀 이상 지난 구간만 확정으로 본다.
+    """
+    return end_date < (datetime.now(timezone.utc) - timedelta(days=2)).strftime('%Y-%m-%d')
+
+
+def is_closed_timestamp(end_ts, interval_ms):
+    """마지막 캔들까지 모두 마감된 구간인지 여부 (밀리초 타임스탬프)"""
+    return end_ts + interval_ms < time.time() * 1000
+
+
+class ResponseCache:
+    """
+    제공자 응답의 디스크 캐시
+
+    요청 내용(제공자, 엔드포인트, 파라미터)의 해시를 파일 이름으로 쓰는 content-addressed 캐시.
+    확정된 과거 구간은 만료 없이 보관하고, 아직 열려 있는 최근 구간은 open_ttl초 동안만 사용한다.
+    전체 크기가 max_bytes를 넘으면 가장 오래 사용하지 않은 항목부터 삭제한다.
+    """
+
+    def __init__(self, root=cache_dir, max_bytes=RESPONSE_CACHE_MAX_BYTES, open_ttl=RESPONSE_CACHE_OPEN_TTL,
+                 enabled=RESPONSE_CACHE_ENABLED):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.open_ttl = open_ttl
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._total_bytes = None
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, provider, endpoint, params):
+        """요청 내용의 해시"""
+        content = json.dumps([provider, endpoint, params], sort_keys=True, default=str)
+        return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+    def _paths(self, key, ext):
+        """(확정 구간 경로, 열린 구간 경로)"""
+        directory = self.root / key[:2]
+        return directory / f'{key}.{ext}', directory / f'{key}.open.{ext}'
+
+    def _read(self, provider, endpoint, params, ext):
+        """유효한 캐시 파일의 내용 (없거나 만료되면 None)"""
+        if not self.enabled:
+            return None
+        closed_path, open_path = self._paths(self._key(provider, endpoint, params), ext)
+        now = time.time()
+        for path in (closed_path, open_path):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            if path is open_path and now - stat.st_mtime > self.open_ttl:
+                continue
+            try:
+                data = path.read_bytes()
+            except FileNotFoundError:
+                continue
+            # 최근 사용 시각 기록 (LRU), 생성 시각(mtime)은 만료 계산용으로 유지
+            os.utime(path, (now, stat.st_mtime))
+            with self._lock:
+                self.hits += 1
+            metrics.inc('response_cache_requests_total', provider=provider, endpoint=endpoint, result='hit')
+            return data
+        with self._lock:
+            self.misses += 1
+        metrics.inc('response_cache_requests_total', provider=provider, endpoint=endpoint, result='miss')
+        return None
+
+    def _write(self, provider, endpoint, params, ext, data, closed):
+        """캐시 파일 기록 후 필요하면 오래된 항목 정리"""
+        if not self.enabled:
+            return
+        closed_path, open_path = self._paths(self._key(provider, endpoint, params), ext)
+        path = closed_path if closed else open_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = path.with_suffix(path.suffix + '.tmp')
+        tmp_file.write_bytes(data)
+        os.replace(tmp_file, path)
+
+        with self._lock:
+            if self._total_bytes is None:
+                self._total_bytes = sum(entry.stat().st_size for entry in self._entries())
+            else:
+                self._total_bytes += len(data)
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def _entries(self):
+        """캐시 파일 목록"""
+        if not self.root.exists():
+            return []
+        return [path for path in self.root.glob('*/*') if not path.name.endswith('.tmp')]
+
+    def _evict(self):
+        """가장 오래 사용하지 않은 항목부터 삭제하여 최대 크기의 90% 이하로 유지"""
+        entries = []
+        for path in self._entries():
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_atime, stat.st_size, path))
+        entries.sort()
+
+        total = sum(size for _, size, _ in entries)
+        target = self.max_bytes * 0.9
+        removed = 0
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+        self._total_bytes = total
+        logger.info(f"Evicted {removed} cached responses ({total} bytes remaining)")
+
+    def get_json(self, provider, endpoint, params):
+        """JSON 응답 조회"""
+        data = self._read(provider, endpoint, params, 'json')
+        return json.loads(data) if data is not None else None
+
+    def put_json(self, provider, endpoint, params, payload, closed):
+        """JSON 응답 저장"""
+        self._write(provider, endpoint, params, 'json', json.dumps(payload).encode('utf-8'), closed)
+
+    def get_frame(self, provider, endpoint, params):
+        """DataFrame 응답 조회"""
+        data = self._read(provider, endpoint, params, 'parquet')
+        return pd.read_parquet(io.BytesIO(data)) if data is not None else None
+
+    def put_frame(self, provider, endpoint, params, df, closed):
+        """DataFrame 응답 저장 (인덱스 포함)"""
+        buffer = io.BytesIO()
+        df.to_parquet(buffer)
+        self._write(provider, endpoint, params, 'parquet', buffer.getvalue(), closed)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    """프로세스 전체에서 공유하는 응답 캐시"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResponseCache()
+        return _cache
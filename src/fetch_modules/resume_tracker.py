@@ -0,0 +1,129 @@
+import json
+import os
+import threading
+import pandas as pd
+from .config import TRACKER_FILE, get_logger
+from . import metrics
+
+# 모듈별 로거 가져오기
+logger = get_logger('resume_tracker')
+
+# 여러 수집기가 동시에 실행되어도 resume_tracker.json 갱신이 섞이지 않도록 보호
+_lock = threading.RLock()
+
+
+def load_tracker(tracker_file=TRACKER_FILE):
+    """진행 상태 전체 로드 (파일이 없으면 빈 딕셔너리)"""
+    with _lock:
+        if not tracker_file.exists():
+            return {}
+        with open(tracker_file, 'r') as f:
+            return json.load(f)
+
+
+def _write_tracker(tracker_data, tracker_file=TRACKER_FILE):
+    """임시 파일에 쓴 뒤 교체하여 중단 시에도 파일이 깨지지 않도록 저장"""
+    tmp_file = tracker_file.with_suffix(tracker_file.suffix + '.tmp')
+    with open(tmp_file, 'w') as f:
+        json.dump(tracker_data, f, indent=4)
+    os.replace(tmp_file, tracker_file)
+
+
+def init_market(market, section, tracker_file=TRACKER_FILE):
+    """시장 항목이 없을 때만 초기값 기록"""
+    with _lock:
+        tracker_data = load_tracker(tracker_file)
+        if market not in tracker_data:
+            tracker_data[market] = section
+            _write_tracker(tracker_data, tracker_file)
+
+
+def save_market(market, section, tracker_file=TRACKER_FILE):
+    """
+    한 시장의 진행 상태만 갱신
+
+    파일을 다시 읽어 다른 시장의 항목은 그대로 두고 해당 시장만 교체한다.
+    """
+    with _lock, metrics.stage('tracker_save', market=market):
+        tracker_data = load_tracker(tracker_file)
+        tracker_data[market] = section
+        _write_tracker(tracker_data, tracker_file)
+
+
+def _to_utc_string(timestamp):
+    """타임스탬프를 UTC 기준 문자열로 변환 (시간대가 다른 종목끼리도 비교 가능하도록)"""
+    timestamp = pd.Timestamp(timestamp)
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.tz_convert('UTC').tz_localize(None)
+    return timestamp.isoformat()
+
+
+def ensure_watermarks(market, section):
+    """
+    종목별 워터마크가 없으면 저장된 데이터에서 생성
+
+    워터마크 형식: {'first': 수집을 보장하는 시작일, 'last': 저장된 마지막 타임스탬프(UTC)}
+    """
+    if 'watermarks' in section:
+        return section['watermarks']
+
+    from .storage import get_store
+
+    watermarks = {}
+    for symbol, (first, last) in get_store().symbol_bounds(market).items():
+        watermarks[symbol] = {
+            'first': _to_utc_string(first)[:10],
+            'last': _to_utc_string(last)
+        }
+    section['watermarks'] = watermarks
+    return watermarks
+
+
+def plan_requests(section, symbols, start_date, end_date):
+    """
+    종목별로 아직 저장되지 않은 구간만 요청 목록으로 생성
+
+    워터마크가 없거나 요청 시작일이 이미 수집한 구간보다 앞이면 전체 구간을 요청하고,
+    그 외에는 마지막 저장 시점부터 end_date까지만 요청한다.
+    마지막 봉은 미완성일 수 있으므로 다시 받아 덮어쓴다.
+
+    Returns:
+        list: [(symbol, start_date, end_date), ...]
+    """
+    watermarks = section.get('watermarks', {})
+    requests = []
+    for symbol in symbols:
+        watermark = watermarks.get(symbol)
+        if not watermark or not watermark.get('first') or start_date < watermark['first']:
+            requests.append((symbol, start_date, end_date))
+            continue
+
+        last_date = watermark['last'][:10]
+        if last_date >= end_date:
+            continue
+        requests.append((symbol, last_date, end_date))
+    return requests
+
+
+def update_watermark_bounds(section, bounds, requested_starts):
+    """
+    저장한 종목별 첫·마지막 시각으로 워터마크 갱신 (같은 종목이 여러 번 나와도 됨)
+
+    Args:
+        section (dict): 시장의 진행 상태
+        bounds (iterable): [(symbol, first, last)] - 예: ParquetStore.encode() 결과의 파티션별 범위
+        requested_starts (dict): {symbol: 요청한 시작일}
+    """
+    watermarks = section.setdefault('watermarks', {})
+    for symbol, first, last in bounds:
+        watermark = watermarks.setdefault(symbol, {})
+        first = requested_starts.get(symbol) or _to_utc_string(first)[:10]
+        if not watermark.get('first') or first < watermark['first']:
+            watermark['first'] = first
+        last = _to_utc_string(last)
+        if not watermark.get('last') or last > watermark['last']:
+            watermark['last'] = last
+
+    # 시장 전체의 마지막 수집일은 가장 뒤처진 종목 기준
+    lasts = [watermark['last'][:10] for watermark in watermarks.values() if watermark.get('last')]
+    section['last_fetch_date'] = min(lasts) if lasts else None
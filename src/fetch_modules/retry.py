@@ -0,0 +1,264 @@
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from .config import (RETRY_MAX_ATTEMPTS, RETRY_BASE_DELAY, RETRY_MAX_DELAY, RATE_LIMIT_BACKOFF,
+                     CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RESET_TIMEOUT, get_logger)
+from . import metrics, rate_limiter
+
+# 모듈별 로거 가져오기
+logger = get_logger('retry')
+
+# 다시 요청하면 성공할 수 있는 HTTP 상태 코드
+RETRYABLE_STATUS = {408, 425, 429, 500, 502, 503, 504}
+# 요청 한도 초과 (418은 Binance의 한도 초과 반복 시 IP 차단)
+RATE_LIMIT_STATUS = {418, 429}
+# 상태 코드 없이 메시지로만 한도 초과를 알리는 경우 (HTTP 오류를 ValueError 등으로 바꾸는 라이브러리)
+RATE_LIMIT_MESSAGES = ('too many requests', 'rate limit')
+# 상태 코드 없이 메시지로만 알리는 일시적 오류 (예: yf.download가 종목별로 남기는 오류 문자열)
+TRANSIENT_MESSAGES = ('timeout', 'timed out', 'connection', 'service unavailable', 'bad gateway',
+                      'internal server error', 'temporarily')
+
+
+class CircuitOpenError(Exception):
+    """제공자의 회로가 열려 있어 호출하지 않음"""
+
+    def __init__(self, provider, retry_in):
+        super().__init__(f"{provider} circuit is open (retry in {retry_in:.0f}s)")
+        self.provider = provider
+        self.retry_in = retry_in
+
+
+class ProviderError(Exception):
+    """
+    예외를 올리지 않고 응답에 오류를 담아 돌려주는 라이브러리의 실패를 분류하여 알림
+
+    Args:
+        message (str): 오류 메시지
+        kind (str): classify() 분류 ('rate_limit', 'transient', 'fatal')
+    """
+
+    def __init__(self, message, kind='fatal'):
+        super().__init__(message)
+        self.kind = kind
+
+
+class CircuitBreaker:
+    """
+    제공자별 회로 차단기
+
+    연속 실패가 failure_threshold회에 이르면 회로를 열어 reset_timeout초 동안 호출을 막는다.
+    시간이 지나면 한 번의 시험 호출(half-open)만 허용하고, 성공하면 닫고 실패하면 다시 연다.
+    """
+
+    def __init__(self, provider, failure_threshold=CIRCUIT_FAILURE_THRESHOLD, reset_timeout=CIRCUIT_RESET_TIMEOUT):
+        self.provider = provider
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_until = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        """'closed', 'open', 'half-open'"""
+        with self._lock:
+            if self._opened_until == 0.0:
+                return 'closed'
+            if self._probing or time.monotonic() < self._opened_until:
+                return 'open'
+            return 'half-open'
+
+    def before_call(self):
+        """호출 가능 여부 확인 (열려 있으면 CircuitOpenError)"""
+        with self._lock:
+            if self._opened_until == 0.0:
+                return
+            now = time.monotonic()
+            if now < self._opened_until or self._probing:
+                raise CircuitOpenError(self.provider, max(self._opened_until - now, 0.0))
+            # 대기 시간이 지나면 시험 호출 하나만 통과
+            self._probing = True
+            logger.info(f"Probing {self.provider} after circuit cooldown")
+
+    def record_success(self):
+        """호출 성공 (제공자가 응답했으면 오류 응답이어도 성공으로 취급)"""
+        with self._lock:
+            if self._opened_until:
+                logger.info(f"{self.provider} circuit closed")
+            self._failures = 0
+            self._opened_until = 0.0
+            self._probing = False
+
+    def record_failure(self):
+        """재시도 가능한 실패 기록"""
+        with self._lock:
+            self._failures += 1
+            if self._probing or self._failures >= self.failure_threshold:
+                self._open(self.reset_timeout)
+
+    def trip(self, seconds):
+        """제공자가 요구한 시간 동안 회로를 바로 열어 둠"""
+        with self._lock:
+            self._open(max(seconds, self.reset_timeout))
+
+    def _open(self, seconds):
+        self._opened_until = time.monotonic() + seconds
+        self._probing = False
+        logger.warning(f"{self.provider} circuit opened for {seconds:.0f}s after {self._failures} consecutive failures")
+
+
+def _status_code(error):
+    """예외에 담긴 HTTP 상태 코드 (없으면 None)"""
+    # requests/Binance 예외는 status_code, urllib HTTPError는 code
+    for attr in ('status_code', 'status', 'code'):
+        value = getattr(error, attr, None)
+        if isinstance(value, int) and 100 <= value < 600:
+            return value
+    response = getattr(error, 'response', None)
+    value = getattr(response, 'status_code', None)
+    return value if isinstance(value, int) else None
+
+
+def _retry_after(error):
+    """Retry-After 헤더 값 (초, 없으면 None)"""
+    headers = getattr(error, 'headers', None)
+    if headers is None:
+        headers = getattr(getattr(error, 'response', None), 'headers', None)
+    value = headers.get('Retry-After') if headers is not None else None
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        # HTTP 날짜 형식
+        return max((parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def classify_message(message):
+    """
+    오류 메시지만으로 재시도 여부 분류 (상태 코드 없이 문자열로 오류를 알리는 경우)
+
+    Returns:
+        str: 'rate_limit', 'transient', 'fatal'
+    """
+    message = str(message).lower()
+    if any(text in message for text in RATE_LIMIT_MESSAGES):
+        return 'rate_limit'
+    if any(text in message for text in TRANSIENT_MESSAGES):
+        return 'transient'
+    return 'fatal'
+
+
+def classify(error):
+    """
+    예외를 재시도 여부에 따라 분류
+
+    Returns:
+        str: 'rate_limit' (한도 초과), 'transient' (일시적 오류), 'fatal' (다시 요청해도 실패)
+    """
+    if isinstance(error, ProviderError):
+        return error.kind
+    status = _status_code(error)
+    if status in RATE_LIMIT_STATUS or 'RateLimit' in type(error).__name__:
+        return 'rate_limit'
+    if status is not None:
+        return 'transient' if status in RETRYABLE_STATUS else 'fatal'
+    # 연결 실패, 시간 초과는 메시지와 관계없이 일시적 오류 (requests와 urllib 예외도 OSError를 상속)
+    kind = classify_message(error)
+    if kind == 'fatal' and isinstance(error, (OSError, TimeoutError)):
+        return 'transient'
+    return kind
+
+
+def backoff_delay(attempt, base_delay=RETRY_BASE_DELAY, max_delay=RETRY_MAX_DELAY):
+    """attempt번째 재시도 전 대기 시간 (지수 증가 + full jitter)"""
+    return random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(provider):
+    """제공자별 회로 차단기 (프로세스 전체에서 공유)"""
+    with _breakers_lock:
+        breaker = _breakers.get(provider)
+        if breaker is None:
+            breaker = CircuitBreaker(provider)
+            _breakers[provider] = breaker
+        return breaker
+
+
+def call(provider, request, tokens=1, max_attempts=RETRY_MAX_ATTEMPTS, symbol=None):
+    """
+    요청 한도와 재시도 정책을 적용하여 제공자 호출
+
+    시도마다 지연 시간을 provider_request_seconds에 기록한다 (대기 시간은 제외).
+
+    Args:
+        provider (str): 제공자 이름 ('yahoo', 'fred', 'binance')
+        request (callable): 인자 없이 호출하는 API 요청
+        tokens (int): 요청 가중치
+        max_attempts (int): 최대 시도 횟수
+        symbol (str): 메트릭 레이블로 남길 종목 (여러 종목을 묶은 요청은 None)
+
+    Returns:
+        request()의 반환값
+
+    Raises:
+        CircuitOpenError: 회로가 열려 있는 경우
+        Exception: 재시도할 수 없는 오류이거나 재시도 횟수를 모두 쓴 경우 마지막 예외
+    """
+    breaker = get_circuit_breaker(provider)
+    attempt = 0
+    while True:
+        breaker.before_call()
+        rate_limiter.acquire(provider, tokens)
+        started = time.perf_counter()
+        try:
+            result = request()
+        except Exception as e:
+            kind = classify(e)
+            metrics.observe('provider_request_seconds', time.perf_counter() - started,
+                            provider=provider, symbol=symbol, outcome=kind)
+            if kind == 'fatal':
+                breaker.record_success()
+                metrics.inc('provider_errors_total', provider=provider, symbol=symbol, kind=kind)
+                raise
+
+            breaker.record_failure()
+            attempt += 1
+            retry_after = _retry_after(e)
+            if retry_after is not None and retry_after > RETRY_MAX_DELAY:
+                # 오래 기다리라는 응답이면 이번 실행에서는 더 호출하지 않음
+                rate_limiter.penalize(provider, retry_after)
+                breaker.trip(retry_after)
+                metrics.inc('provider_errors_total', provider=provider, symbol=symbol, kind=kind)
+                raise
+            if attempt >= max_attempts:
+                metrics.inc('provider_errors_total', provider=provider, symbol=symbol, kind=kind)
+                raise
+
+            metrics.inc('provider_retries_total', provider=provider, symbol=symbol, kind=kind)
+
+            delay = retry_after if retry_after is not None else backoff_delay(attempt)
+            logger.warning(f"{provider} request failed ({kind}, attempt {attempt}/{max_attempts}), "
+                           f"retrying in {delay:.2f}s: {str(e)}")
+            if kind == 'rate_limit':
+                # 같은 제공자를 쓰는 다른 스레드도 함께 대기
+                rate_limiter.penalize(provider, max(delay, RATE_LIMIT_BACKOFF))
+            else:
+                time.sleep(delay)
+            continue
+
+        metrics.observe('provider_request_seconds', time.perf_counter() - started,
+                        provider=provider, symbol=symbol, outcome='ok')
+        breaker.record_success()
+        return result
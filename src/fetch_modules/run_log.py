@@ -0,0 +1,189 @@
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from logging.handlers import RotatingFileHandler
+from .config import (RUN_EVENTS_FILE, RUN_INDEX_FILE, RUN_INDEX_LIMIT, LOG_MAX_BYTES, LOG_BACKUP_COUNT,
+                     get_logger)
+
+# 모듈별 로거 가져오기
+logger = get_logger('run_log')
+
+# 이벤트 파일 전용 로거 (메시지가 JSON 한 줄, 실행 로그로 전파하지 않음)
+_events_logger = logging.getLogger('run_events')
+_events_logger.propagate = False
+_events_logger.setLevel(logging.INFO)
+_events_handler_lock = threading.Lock()
+_events_file_handler = None
+
+
+def _events_handler():
+    """이벤트 파일 핸들러를 처음 기록할 때 한 번만 등록 (크기 기준 순환, 다른 핸들러가 붙어 있어도 등록)"""
+    global _events_file_handler
+    with _events_handler_lock:
+        if _events_file_handler is None:
+            handler = RotatingFileHandler(
+                str(RUN_EVENTS_FILE),
+                maxBytes=LOG_MAX_BYTES,
+                backupCount=LOG_BACKUP_COUNT,
+                encoding='utf-8'
+            )
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            _events_logger.addHandler(handler)
+            _events_file_handler = handler
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat(timespec='milliseconds')
+
+
+class _RunLogHandler(logging.Handler):
+    """실행 중 모든 모듈에서 남긴 경고·에러를 현재 실행의 이벤트로 기록"""
+
+    def __init__(self, run):
+        super().__init__(level=logging.WARNING)
+        self.run = run
+
+    def emit(self, record):
+        try:
+            self.run.event(
+                'log',
+                level=record.levelname,
+                logger=record.name,
+                message=record.getMessage()
+            )
+        except Exception:
+            self.handleError(record)
+
+
+class RunLog:
+    """
+    수집 실행 한 번의 이벤트 기록
+
+    이벤트는 logs/run_events.jsonl에 run id와 함께 한 줄씩 추가하고 메모리에도 보관하므로,
+    보고서는 로그 파일을 다시 읽지 않고 이번 실행의 이벤트만으로 만든다.
+    실행이 끝나면 요약을 logs/run_index.json(최근 실행 목록)에 추가한다.
+    """
+
+    def __init__(self, **context):
+        """
+        Args:
+            context: 실행 정보 (예: 시장 목록, 수집 기간, 간격) - run_started 이벤트와 목록에 기록
+        """
+        self.run_id = f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+        self.context = context
+        self.started = _now()
+        self.finished = None
+        self.events = []
+        self.markets = {}
+        self._started_at = time.monotonic()
+        self._market_started = {}
+        self._lock = threading.Lock()
+        self._handler = _RunLogHandler(self)
+
+    def start(self):
+        """실행 시작 기록 후 경고·에러 수집 시작"""
+        _events_handler()
+        self.event('run_started', **self.context)
+        logging.getLogger().addHandler(self._handler)
+        return self
+
+    def event(self, name, **fields):
+        """이벤트 기록 (파일과 메모리)"""
+        record = {'ts': _now(), 'run_id': self.run_id, 'event': name, **fields}
+        with self._lock:
+            self.events.append(record)
+        _events_logger.info(json.dumps(record, ensure_ascii=False, default=str))
+        return record
+
+    def market_started(self, market):
+        with self._lock:
+            self._market_started[market] = time.monotonic()
+        self.event('market_started', market=market)
+
+    def market_finished(self, market, success, error=None):
+        """시장 수집 결과 기록"""
+        with self._lock:
+            started = self._market_started.pop(market, None)
+        duration = round(time.monotonic() - started, 3) if started is not None else None
+        outcome = {'success': bool(success), 'duration': duration}
+        if error is not None:
+            outcome['error'] = str(error)
+        with self._lock:
+            self.markets[market] = outcome
+        self.event('market_finished', market=market, **outcome)
+
+    def errors(self):
+        """이번 실행에서 기록된 에러 이벤트"""
+        with self._lock:
+            return [event for event in self.events if event['event'] == 'log' and event['level'] in ('ERROR', 'CRITICAL')]
+
+    def warnings(self):
+        """이번 실행에서 기록된 경고 이벤트"""
+        with self._lock:
+            return [event for event in self.events if event['event'] == 'log' and event['level'] == 'WARNING']
+
+    def summary(self):
+        """실행 요약 (최근 실행 목록에 저장하는 형태)"""
+        with self._lock:
+            markets = dict(self.markets)
+        failed = sorted(market for market, outcome in markets.items() if not outcome['success'])
+        return {
+            'run_id': self.run_id,
+            'started': self.started,
+            'finished': self.finished,
+            'duration': round(time.monotonic() - self._started_at, 3),
+            **self.context,
+            'succeeded': sorted(market for market, outcome in markets.items() if outcome['success']),
+            'failed': failed,
+            'errors': len(self.errors()),
+            'warnings': len(self.warnings()),
+            'status': 'failed' if failed else 'ok'
+        }
+
+    def finish(self):
+        """실행 종료 기록, 경고·에러 수집 중단, 최근 실행 목록 갱신"""
+        logging.getLogger().removeHandler(self._handler)
+        self.finished = _now()
+        summary = self.summary()
+        self.event('run_finished', **{key: value for key, value in summary.items() if key not in ('run_id', *self.context)})
+        try:
+            _append_index(summary)
+        except OSError as e:
+            logger.error(f"Error updating run index: {str(e)}")
+        return summary
+
+
+def load_index(index_file=RUN_INDEX_FILE):
+    """최근 실행 목록 (오래된 것부터, 파일이 없으면 빈 목록)"""
+    if not index_file.exists():
+        return []
+    with open(index_file, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+_index_lock = threading.Lock()
+
+
+def _append_index(summary, index_file=RUN_INDEX_FILE, limit=RUN_INDEX_LIMIT):
+    """실행 요약을 목록에 추가 (최근 limit개만 유지, 임시 파일에 쓴 뒤 교체)"""
+    with _index_lock:
+        try:
+            runs = load_index(index_file)
+        except ValueError:
+            runs = []
+        runs = (runs + [summary])[-limit:]
+        tmp_file = index_file.with_suffix(index_file.suffix + '.tmp')
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(runs, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_file, index_file)
+
+
+def start_run(**context):
+    """새 실행 기록 시작"""
+    run = RunLog(**context).start()
+    logger.info(f"Run {run.run_id} started")
+    return run
@@ -0,0 +1,132 @@
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+from .config import COLLECTION_SCHEDULE, get_logger
+
+# 모듈별 로거 가져오기
+logger = get_logger('scheduler')
+
+# 주기 단위별 초 (M은 분, MO는 달)
+PERIOD_UNITS = {
+    'S': 1,
+    'M': 60,
+    'H': 3600,
+    'D': 86400,
+    'W': 604800,
+    'MO': 2592000,
+    'Y': 31536000
+}
+
+_PERIOD_PATTERN = re.compile(r'^(\d+(?:\.\d+)?)(MO|[SMHDWY])$', re.IGNORECASE)
+
+
+def parse_period(period):
+    """'5M', '1H', '1D' 형식의 주기를 초로 변환"""
+    match = _PERIOD_PATTERN.match(period.strip())
+    if not match:
+        raise ValueError(f"Invalid period: {period}")
+    seconds = float(match.group(1)) * PERIOD_UNITS[match.group(2).upper()]
+    if seconds <= 0:
+        raise ValueError(f"Invalid period: {period}")
+    return seconds
+
+
+def parse_schedule(schedule=COLLECTION_SCHEDULE):
+    """
+    'crypto=1M,bonds=1D' 형식의 수집 주기를 딕셔너리로 변환
+
+    Returns:
+        dict: {market: 주기(초)}
+    """
+    periods = {}
+    for item in schedule.split(','):
+        if not item.strip():
+            continue
+        market, _, period = item.partition('=')
+        if not period:
+            raise ValueError(f"Invalid schedule entry: {item}")
+        periods[market.strip()] = parse_period(period)
+    return periods
+
+
+class CollectionScheduler:
+    """
+    상주 실행용 시장별 주기 수집
+
+    하나의 DataCollectionManager를 계속 사용하므로 수집기, API 클라이언트, 연결은 첫 실행 이후 재사용된다.
+    주기가 된 시장만 모아서 한 번에 수집하고, 이미 저장된 구간은 워터마크로 건너뛰므로
+    매 실행은 새로 생긴 구간만 요청한다.
+    """
+
+    def __init__(self, manager, schedule, concurrent=True, follow_today=True):
+        """
+        Args:
+            manager (DataCollectionManager): 수집에 사용할 관리자
+            schedule (dict): {market: 주기(초)}
+            concurrent (bool): 제공자별 병렬 실행 여부
+            follow_today (bool): 실행할 때마다 종료일을 현재 날짜로 갱신할지 여부
+        """
+        self.manager = manager
+        self.schedule = {market: period for market, period in schedule.items() if market in manager.collectors}
+        self.concurrent = concurrent
+        self.follow_today = follow_today
+        self._stop = threading.Event()
+        self._next_run = {market: time.monotonic() for market in self.schedule}
+
+        skipped = set(schedule) - set(self.schedule)
+        if skipped:
+            logger.warning(f"Ignoring schedule for unselected markets: {', '.join(sorted(skipped))}")
+        self._limit_open_cache_ttl()
+
+    def _limit_open_cache_ttl(self):
+        """열린 구간의 캐시가 가장 짧은 수집 주기보다 오래 남지 않도록 조정"""
+        if not self.schedule:
+            return
+        from .response_cache import get_response_cache
+
+        cache = get_response_cache()
+        shortest = min(self.schedule.values())
+        if cache.open_ttl > shortest:
+            logger.info(f"Lowering open response cache TTL from {cache.open_ttl}s to {shortest:.0f}s")
+            cache.open_ttl = shortest
+
+    def stop(self):
+        """진행 중인 수집이 끝나면 종료"""
+        self._stop.set()
+
+    def run(self):
+        """stop()이 호출될 때까지 주기마다 수집"""
+        if not self.schedule:
+            logger.warning("No markets scheduled, scheduler exits")
+            return
+        logger.info("Scheduler started: " + ', '.join(
+            f"{market} every {period:.0f}s" for market, period in self.schedule.items()
+        ))
+
+        while not self._stop.is_set():
+            now = time.monotonic()
+            due = [market for market, next_run in self._next_run.items() if next_run <= now]
+            if due:
+                self.run_once(due)
+                # 수집이 주기보다 오래 걸렸으면 밀린 실행은 한 번으로 합침
+                finished = time.monotonic()
+                for market in due:
+                    self._next_run[market] = max(now + self.schedule[market], finished)
+            self._stop.wait(max(min(self._next_run.values()) - time.monotonic(), 0))
+
+        logger.info("Scheduler stopped")
+
+    def run_once(self, markets):
+        """주기가 된 시장 수집"""
+        if self.follow_today:
+            # yfinance와 Binance의 종료일은 포함하지 않으므로 다음 날로 지정해야 오늘 데이터까지 받음
+            self.manager.end_date = (datetime.now() + timedelta(days=1)).strftime('%Y-%m-%d')
+        started = time.monotonic()
+        try:
+            self.manager.collect_all_data(concurrent=self.concurrent, markets=markets)
+            self.manager.save_data_range()
+            self.manager.generate_report()
+        except Exception as e:
+            logger.error(f"Error in scheduled collection of {', '.join(markets)}: {str(e)}")
+        logger.info(f"Scheduled collection of {', '.join(markets)} took {time.monotonic() - started:.2f}s")
@@ -0,0 +1,597 @@
+import os
+import shutil
+import threading
+import time
+import uuid
+from urllib.parse import quote
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from .config import (data_dir, COMPACT_THRESHOLD, PARQUET_COMPRESSION, PARQUET_COMPRESSION_LEVEL,
+                     PARQUET_ROW_GROUP_SIZE, get_logger)
+from . import metrics
+
+# 모듈별 로거 가져오기
+logger = get_logger('storage')
+
+# 시장별 종목 식별 컬럼 (기본값은 'symbol')
+MARKET_KEYS = {
+    'bonds': 'series'
+}
+
+# 파생 데이터셋 이름의 구분자 (예: 'crypto@1w'는 crypto 데이터로 만든 주봉)
+DERIVED_SEPARATOR = '@'
+
+BASE_FILE = 'base.parquet'
+DELTA_PREFIX = 'delta-'
+
+# 저장 스키마: date는 UTC 기준 int64(밀리초) 타임스탬프, 종목 컬럼은 사전 인코딩
+DATE_TYPE = pa.timestamp('ms', tz='UTC')
+
+# 컬럼별 저장 타입 (목록에 없는 컬럼은 데이터에서 추론)
+COLUMN_TYPES = {
+    'open': pa.float64(),
+    'high': pa.float64(),
+    'low': pa.float64(),
+    'close': pa.float64(),
+    'volume': pa.float64(),
+    'quote_volume': pa.float64(),
+    'trades': pa.int64(),
+    'buy_base_volume': pa.float64(),
+    'buy_quote_volume': pa.float64(),
+    'Dividends': pa.float32(),
+    'Stock Splits': pa.float32(),
+    'Capital Gains': pa.float32(),
+    'value': pa.float32()   # FRED 금리·스프레드는 소수 둘째 자리까지
+}
+
+# 시장별로 다른 저장 타입
+MARKET_COLUMN_TYPES = {
+    'stocks': {'volume': pa.int64()},
+    'commodities': {'volume': pa.int64()},
+    'real_estate': {'volume': pa.int64()},
+    # 환율은 유효숫자 6자리 이하라 float32로 충분
+    'forex': {
+        'open': pa.float32(),
+        'high': pa.float32(),
+        'low': pa.float32(),
+        'close': pa.float32(),
+        'volume': pa.int64()
+    }
+}
+
+# 원래 시간대를 기록하는 파일 메타데이터 키 (종목 파티션마다 시간대가 하나)
+TIMEZONE_KEY = b'timezone'
+
+
+class ParquetStore:
+    """
+    시장별 파티션 Parquet 데이터셋
+
+    datas/<market>/<symbol>/<year>/ 아래에 저장한다.
+    새 데이터는 작은 delta 파일로 추가만 하고, 파티션의 delta 수가 임계값을 넘으면
+    백그라운드에서 base.parquet 하나로 병합(compaction)한다.
+    """
+
+    def __init__(self, root=data_dir, compact_threshold=COMPACT_THRESHOLD):
+        self.root = root
+        self.compact_threshold = compact_threshold
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+        self._compactions = []
+        self._compacting = set()
+
+    def _lock(self, market):
+        """시장별 잠금 (추가와 병합이 같은 파티션을 동시에 다루지 않도록)"""
+        with self._locks_guard:
+            return self._locks.setdefault(market, threading.RLock())
+
+    def key_column(self, market):
+        """시장의 종목 식별 컬럼 (파생 데이터셋은 원본 시장과 같음)"""
+        return MARKET_KEYS.get(market.split(DERIVED_SEPARATOR)[0], 'symbol')
+
+    def column_types(self, market):
+        """시장의 컬럼별 저장 타입"""
+        return {**COLUMN_TYPES, **MARKET_COLUMN_TYPES.get(market.split(DERIVED_SEPARATOR)[0], {})}
+
+    def to_batch(self, market, df, timezone=None):
+        """
+        DataFrame을 시장 저장 스키마의 Arrow record batch로 변환
+
+        date는 UTC로 변환하고 원래 시간대는 스키마 메타데이터로 남긴다.
+        컬럼 순서는 date, 종목, 나머지 순이고 행은 종목·날짜 순으로 정렬한다.
+        """
+        key = self.key_column(market)
+        df = df.sort_values([key, 'date'], kind='stable')
+
+        dates = pd.to_datetime(df['date'])
+        if dates.dt.tz is None:
+            dates = dates.dt.tz_localize('UTC')
+        timezone = timezone or str(dates.dt.tz)
+        columns = {
+            'date': _to_array(dates.dt.tz_convert('UTC')).cast(DATE_TYPE, safe=False),
+            key: _to_array(df[key].astype(str), pa.string()).dictionary_encode()
+        }
+
+        column_types = self.column_types(market)
+        for column in df.columns:
+            if column in columns:
+                continue
+            values = df[column]
+            column_type = column_types.get(column)
+            try:
+                columns[column] = _to_array(values, column_type)
+            except (pa.ArrowInvalid, pa.ArrowTypeError):
+                # 예: 소수가 섞인 거래량은 정수로 저장할 수 없으므로 원래 타입 유지
+                columns[column] = _to_array(values)
+
+        return pa.RecordBatch.from_arrays(
+            list(columns.values()), names=list(columns), metadata={TIMEZONE_KEY: timezone.encode()}
+        )
+
+    def _write_file(self, df, path, market, timezone=None):
+        """저장 스키마로 Parquet 파일 기록 (종목·날짜 순 정렬, 사전 인코딩은 종목 컬럼만)"""
+        self._write_table(pa.Table.from_batches([self.to_batch(market, df, timezone)]), path, market)
+
+    def _write_table(self, table, where, market):
+        """Arrow 테이블을 저장 형식의 Parquet로 기록 (where는 파일 경로 또는 출력 스트림)"""
+        pq.write_table(
+            table,
+            where,
+            compression=PARQUET_COMPRESSION,
+            compression_level=PARQUET_COMPRESSION_LEVEL,
+            row_group_size=PARQUET_ROW_GROUP_SIZE,
+            use_dictionary=[self.key_column(market)],
+            column_encoding={'date': 'DELTA_BINARY_PACKED'}
+        )
+
+    def _read_file(self, path, market, columns=None):
+        """
+        Parquet 파일 로드
+
+        이전 형식의 파일(시간대 없는 날짜, 현지 시간대 날짜, 일반 문자열 종목)도 같은 형태로 맞춘다:
+        date는 UTC 타임스탬프, 종목 컬럼은 일반 문자열.
+        """
+        df = pd.read_parquet(path, columns=columns)
+        if 'date' in df.columns:
+            dates = pd.to_datetime(df['date'])
+            df['date'] = dates.dt.tz_localize('UTC') if dates.dt.tz is None else dates.dt.tz_convert('UTC')
+        key = self.key_column(market)
+        if key in df.columns and isinstance(df[key].dtype, pd.CategoricalDtype):
+            df[key] = df[key].astype(str)
+        return df
+
+    def _file_timezone(self, path):
+        """파일에 기록된 원래 시간대"""
+        schema = pq.read_schema(path)
+        metadata = schema.metadata or {}
+        if TIMEZONE_KEY in metadata:
+            return metadata[TIMEZONE_KEY].decode()
+        # 이전 형식의 파일은 date 컬럼의 시간대 사용
+        date_type = schema.field('date').type
+        return getattr(date_type, 'tz', None) or 'UTC'
+
+    def timezone(self, market, symbol):
+        """종목 데이터의 원래 시간대 (예: 'America/New_York', Binance와 FRED는 'UTC')"""
+        for partition in self.partitions(market, [symbol]):
+            timezones = self._read_partition(market, partition, self._file_timezone)
+            if timezones:
+                return timezones[0]
+        return 'UTC'
+
+    def market_dir(self, market):
+        """시장 데이터셋 디렉토리"""
+        return self.root / market
+
+    def legacy_file(self, market):
+        """이전 방식의 단일 파일 경로"""
+        return self.root / f'{market}.parquet'
+
+    def exists(self, market):
+        """저장된 데이터 존재 여부"""
+        return (any(self.partition_files(partition) for partition in self.partitions(market))
+                or self.legacy_file(market).exists())
+
+    def partitions(self, market, symbols=None, start=None, end=None):
+        """
+        시장의 파티션 디렉토리 목록
+
+        Args:
+            symbols (list): 이 종목의 파티션만 (None이면 전체)
+            start: 이 시각이 속한 연도 이후 파티션만 (None이면 전체)
+            end: 이 시각이 속한 연도 이전 파티션만 (None이면 전체)
+        """
+        market_dir = self.market_dir(market)
+        if not market_dir.exists():
+            return []
+        if symbols is None:
+            partitions = (path for path in market_dir.glob('*/*') if path.is_dir())
+        else:
+            partitions = (
+                path
+                for symbol in symbols
+                for path in (market_dir / quote(str(symbol), safe='')).glob('*')
+                if path.is_dir()
+            )
+        # 파티션 연도는 종목의 현지 시간 기준이므로 시간대 차이만큼 하루 여유를 둠
+        if start is not None:
+            start_year = (pd.Timestamp(start) - pd.Timedelta(days=1)).year
+            partitions = (path for path in partitions if int(path.name) >= start_year)
+        if end is not None:
+            end_year = (pd.Timestamp(end) + pd.Timedelta(days=1)).year
+            partitions = (path for path in partitions if int(path.name) <= end_year)
+        return sorted(partitions)
+
+    def partition_files(self, partition):
+        """파티션 파일 목록 (base 먼저, 이후 delta는 작성 순서대로)"""
+        base = partition / BASE_FILE
+        files = [base] if base.exists() else []
+        files.extend(sorted(partition.glob(f'{DELTA_PREFIX}*.parquet')))
+        return files
+
+    def _read_partition(self, market, partition, read):
+        """
+        파티션 파일을 순서대로 읽음 (read는 파일 경로를 받는 함수)
+
+        백그라운드 병합이 읽는 도중 base를 교체하고 delta를 지우면 파일이 없어지므로,
+        그때는 병합이 교체하지 못하도록 잠금을 잡고 파티션을 처음부터 다시 읽는다.
+        """
+        try:
+            return [read(path) for path in self.partition_files(partition)]
+        except FileNotFoundError:
+            with self._lock(market):
+                return [read(path) for path in self.partition_files(partition)]
+
+    def last_modified(self, market):
+        """가장 최근에 기록된 파일의 수정 시각 (없으면 None)"""
+        mtimes = [
+            mtime
+            for partition in self.partitions(market)
+            for mtime in self._read_partition(market, partition, lambda path: path.stat().st_mtime)
+        ]
+        return max(mtimes) if mtimes else None
+
+    def _dedup(self, df, market):
+        """같은 날짜·종목은 나중에 기록된 값만 유지"""
+        key = self.key_column(market)
+        df = df.drop_duplicates(subset=['date', key], keep='last')
+        return df.sort_values([key, 'date']).reset_index(drop=True)
+
+    def append(self, market, df):
+        """
+        새 데이터를 delta 파일로 추가
+
+        Returns:
+            list: 기록한 파일 경로
+        """
+        self.migrate_legacy(market)
+        return self._append(market, df)
+
+    def encode(self, market, df):
+        """
+        DataFrame을 종목·연도 파티션별 Parquet 바이트로 인코딩 (encode_batch() 참고)
+
+        Returns:
+            list: [(종목, 연도, 행 수, 첫 date, 마지막 date, Parquet 바이트)]
+        """
+        return self.encode_batch(market, self.to_batch(market, df))
+
+    def encode_batch(self, market, batch):
+        """
+        저장 스키마의 record batch(to_batch() 결과)를 종목·연도 파티션별 Parquet 바이트로 인코딩
+
+        파일을 쓰지 않고 저장소 상태도 바꾸지 않으므로 다른 프로세스에서 실행해도 된다.
+        결과는 commit()으로 기록한다.
+
+        Returns:
+            list: [(종목, 연도, 행 수, 첫 date, 마지막 date, Parquet 바이트)]
+        """
+        key = self.key_column(market)
+        table = pa.Table.from_batches([batch])
+        timezone = (batch.schema.metadata or {}).get(TIMEZONE_KEY, b'UTC').decode()
+        parts = []
+        with metrics.stage('encode', market=market):
+            # 파티션 연도는 종목의 현지 시간 기준
+            groups = pd.DataFrame({
+                'symbol': table[key].to_pandas(),
+                'year': table['date'].to_pandas().dt.tz_convert(timezone).dt.year
+            }).groupby(['symbol', 'year'], sort=False, observed=True).indices
+            for (symbol, year), indices in groups.items():
+                part = table.take(pa.array(indices))
+                # 사전에는 파티션의 종목만 남김
+                part = part.set_column(
+                    part.schema.get_field_index(key), key, part[key].cast(pa.string()).dictionary_encode()
+                )
+                bounds = pc.min_max(part['date']).as_py()
+                sink = pa.BufferOutputStream()
+                self._write_table(part, sink, market)
+                parts.append((symbol, year, part.num_rows, bounds['min'], bounds['max'],
+                              sink.getvalue().to_pybytes()))
+        return parts
+
+    def commit(self, market, parts):
+        """
+        encode()한 파티션 데이터를 delta 파일로 추가
+
+        Returns:
+            list: 기록한 파일 경로
+        """
+        self.migrate_legacy(market)
+        return self._commit(market, parts)
+
+    def write_batches(self, market, batches):
+        """
+        record batch를 받는 대로 delta 파일로 추가 (예: 수집기의 iter_batches() 결과)
+
+        배치마다 인코딩하고 바로 기록하므로 메모리에는 배치 하나만 남는다.
+        진행 상태(resume tracker)는 기록하지 않는다.
+
+        Returns:
+            int: 기록한 행 수
+        """
+        self.migrate_legacy(market)
+        rows = 0
+        for batch in batches:
+            if batch.num_rows:
+                self._commit(market, self.encode_batch(market, batch))
+                rows += batch.num_rows
+        return rows
+
+    def _append(self, market, df):
+        return self._commit(market, self.encode(market, df))
+
+    def _commit(self, market, parts):
+        written = []
+        full_partitions = []
+
+        with self._lock(market), metrics.stage('write', market=market):
+            for symbol, year, rows, _, _, data in parts:
+                partition = self.market_dir(market) / quote(str(symbol), safe='') / str(year)
+                partition.mkdir(parents=True, exist_ok=True)
+                path = partition / f'{DELTA_PREFIX}{time.time_ns()}-{uuid.uuid4().hex[:8]}.parquet'
+                # 다 쓴 뒤에 이름을 바꿔서 읽는 쪽이 쓰는 중인 파일을 보지 않도록 함
+                tmp_file = path.with_suffix('.tmp')
+                tmp_file.write_bytes(data)
+                os.replace(tmp_file, path)
+                written.append(path)
+                metrics.inc('rows_written_total', rows, market=market, symbol=symbol)
+                metrics.inc('bytes_written_total', len(data), market=market)
+
+                if len(list(partition.glob(f'{DELTA_PREFIX}*.parquet'))) >= self.compact_threshold:
+                    full_partitions.append(partition)
+
+        if full_partitions:
+            self._compact_in_background(market, full_partitions)
+        return written
+
+    def write(self, market, df):
+        """시장 데이터 전체를 주어진 데이터로 교체"""
+        with self._lock(market):
+            market_dir = self.market_dir(market)
+            if market_dir.exists():
+                shutil.rmtree(market_dir)
+            self._append(market, df)
+
+    def read(self, market, symbols=None, start=None, end=None, columns=None):
+        """
+        시장 데이터 로드 (중복 제거 후 종목·날짜 순 정렬, date는 UTC)
+
+        조건은 load()와 같다.
+
+        Returns:
+            DataFrame: 데이터가 없으면 빈 DataFrame
+        """
+        table = self.load(market, symbols, start, end, columns)
+        if table is None:
+            return pd.DataFrame()
+        return table.to_pandas()
+
+    def load(self, market, symbols=None, start=None, end=None, columns=None):
+        """
+        조건에 맞는 시장 데이터만 Arrow 테이블로 로드
+
+        종목과 연도는 파티션 디렉토리로, 기간은 row group 통계로 걸러서
+        조건 밖의 row group과 요청하지 않은 컬럼은 읽지 않는다.
+
+        Args:
+            symbols (list): 읽을 종목 (None이면 전체)
+            start: 이 시각 이후 행만 (포함, 시간대가 없으면 UTC)
+            end: 이 시각 이전 행만 (포함, 시간대가 없으면 UTC)
+            columns (list): 읽을 컬럼 (None이면 전체, date와 종목 컬럼은 항상 포함)
+
+        Returns:
+            pyarrow.Table: 중복 제거 후 종목·날짜 순 정렬 (date는 UTC, 종목은 문자열), 데이터가 없으면 None
+        """
+        self.migrate_legacy(market)
+        key = self.key_column(market)
+        if columns is not None:
+            columns = ['date', key] + [column for column in columns if column not in ('date', key)]
+
+        start_utc, end_utc = _to_utc(start), _to_utc(end)
+        tables = [
+            table
+            for partition in self.partitions(market, symbols, start, end)
+            for table in self._read_partition(
+                market, partition, lambda path: self._load_file(path, market, start_utc, end_utc, columns)
+            )
+        ]
+        return self._combine_tables(tables, market)
+
+    def load_partition(self, market, partition):
+        """파티션(종목·연도) 하나를 load()와 같은 방식으로 로드 (없으면 None)"""
+        tables = self._read_partition(market, partition, lambda path: self._load_file(path, market, None, None, None))
+        return self._combine_tables(tables, market)
+
+    def _combine_tables(self, tables, market):
+        """파일별 테이블을 합쳐 중복 제거 (행이 없으면 None)"""
+        tables = [table for table in tables if table.num_rows]
+        if not tables:
+            return None
+        return self._dedup_table(pa.concat_tables(tables, promote_options='permissive'), self.key_column(market))
+
+    def _load_file(self, path, market, start, end, columns):
+        """파일에서 기간에 맞는 행과 요청한 컬럼만 읽어 저장 스키마의 date·종목 타입으로 맞춤"""
+        # 병합이 base를 교체해도 스키마와 데이터를 같은 파일에서 읽도록 한 번만 엶
+        with open(path, 'rb') as source:
+            schema = pq.read_schema(source)
+            if columns is not None:
+                # 이전 형식의 파일에 없는 컬럼은 다른 파일과 합칠 때 null로 채워짐
+                columns = [column for column in columns if column in schema.names]
+
+            # 필터 값은 파일의 date 타입으로 맞춰야 row group 통계와 비교됨
+            date_type = schema.field('date').type
+            filters = None
+            if start is not None:
+                filters = pc.field('date') >= pa.scalar(start).cast(date_type)
+            if end is not None:
+                condition = pc.field('date') <= pa.scalar(end).cast(date_type)
+                filters = condition if filters is None else filters & condition
+
+            table = pq.read_table(source, columns=columns, filters=filters)
+
+        table = table.replace_schema_metadata(None)
+        key = self.key_column(market)
+        # 시간대 없는 이전 형식의 날짜는 UTC로 간주
+        table = table.set_column(
+            table.schema.get_field_index('date'), 'date', table['date'].cast(DATE_TYPE, safe=False)
+        )
+        return table.set_column(table.schema.get_field_index(key), key, table[key].cast(pa.string()))
+
+    def _dedup_table(self, table, key):
+        """같은 날짜·종목은 나중에 기록된 행만 남기고 종목·날짜 순 정렬"""
+        table = table.append_column('_row', pa.array(range(table.num_rows), type=pa.int64()))
+        latest = table.group_by([key, 'date'], use_threads=False).aggregate([('_row', 'max')])
+        table = table.take(latest['_row_max']).drop_columns(['_row'])
+        return table.sort_by([(key, 'ascending'), ('date', 'ascending')])
+
+    def drop(self, market):
+        """시장 데이터셋 삭제"""
+        with self._lock(market):
+            market_dir = self.market_dir(market)
+            if market_dir.exists():
+                shutil.rmtree(market_dir)
+
+    def symbol_bounds(self, market):
+        """
+        종목별 저장된 최소·최대 날짜 ('date'와 종목 컬럼만 읽음)
+
+        Returns:
+            dict: {symbol: (first, last)}
+        """
+        self.migrate_legacy(market)
+        key = self.key_column(market)
+        bounds = {}
+        for partition in self.partitions(market):
+            for dates in self._read_partition(
+                market, partition, lambda path: self._read_file(path, market, columns=['date', key])
+            ):
+                for symbol, (first, last) in dates.groupby(key)['date'].agg(['min', 'max']).iterrows():
+                    if symbol in bounds:
+                        first = min(first, bounds[symbol][0])
+                        last = max(last, bounds[symbol][1])
+                    bounds[symbol] = (first, last)
+        return bounds
+
+    def compact(self, market, partitions=None):
+        """
+        파티션의 base와 delta 파일을 하나의 base.parquet로 병합
+
+        delta 파일은 기록 후 바뀌지 않으므로 읽기와 쓰기는 잠금 없이 하고,
+        base 교체와 병합한 delta 삭제만 잠금 안에서 처리한다.
+        """
+        for partition in partitions or self.partitions(market):
+            with self._lock(market):
+                if partition in self._compacting:
+                    continue
+                self._compacting.add(partition)
+            try:
+                files = self.partition_files(partition)
+                deltas = [path for path in files if path.name != BASE_FILE]
+                if not deltas:
+                    continue
+
+                with metrics.stage('merge', market=market):
+                    df = pd.concat([self._read_file(path, market) for path in files], ignore_index=True)
+                    df = self._dedup(df, market)
+
+                    tmp_file = partition / f'{BASE_FILE}.tmp'
+                    self._write_file(df, tmp_file, market, self._file_timezone(files[-1]))
+                    with self._lock(market):
+                        os.replace(tmp_file, partition / BASE_FILE)
+                        for path in deltas:
+                            path.unlink()
+                logger.info(f"Compacted {len(deltas)} delta files in {partition}")
+            finally:
+                with self._lock(market):
+                    self._compacting.discard(partition)
+
+    def _compact_in_background(self, market, partitions):
+        """추가 작업을 막지 않도록 별도 스레드에서 병합"""
+        def run():
+            try:
+                self.compact(market, partitions)
+            except Exception as e:
+                logger.error(f"Error compacting {market}: {str(e)}")
+
+        thread = threading.Thread(target=run, name=f'compact-{market}')
+        thread.start()
+        with self._locks_guard:
+            self._compactions.append((market, thread))
+
+    def wait_for_compaction(self, market=None):
+        """진행 중인 백그라운드 병합이 끝날 때까지 대기 (market을 주면 그 시장만)"""
+        while True:
+            with self._locks_guard:
+                pending = [item for item in self._compactions if market in (None, item[0])]
+                if not pending:
+                    return
+                for item in pending:
+                    self._compactions.remove(item)
+            for _, thread in pending:
+                thread.join()
+
+    def migrate_legacy(self, market):
+        """이전 방식의 <market>.parquet 파일을 데이터셋으로 옮김"""
+        legacy_file = self.legacy_file(market)
+        if not legacy_file.exists():
+            return
+        with self._lock(market):
+            if not legacy_file.exists():
+                return
+            df = pd.read_parquet(legacy_file)
+            if 'Date' in df.columns and 'date' not in df.columns:
+                df = df.rename(columns={'Date': 'date'})
+            if not df.empty:
+                self._append(market, df)
+                self.compact(market)
+            # 원본은 삭제하지 않고 이름만 변경
+            legacy_file.rename(legacy_file.with_suffix('.parquet.migrated'))
+            logger.info(f"Migrated {legacy_file} into {self.market_dir(market)}")
+
+
+def _to_array(values, type=None):
+    """pandas 값을 Arrow 배열 하나로 변환 (pyarrow 기반 컬럼을 이어 붙이면 ChunkedArray가 되므로 합침)"""
+    array = pa.array(values, type=type, from_pandas=True)
+    return array.combine_chunks() if isinstance(array, pa.ChunkedArray) else array
+
+
+def _to_utc(timestamp):
+    """조회 조건 시각을 UTC 기준 Timestamp로 변환 (시간대가 없으면 UTC로 간주)"""
+    if timestamp is None:
+        return None
+    timestamp = pd.Timestamp(timestamp)
+    return timestamp.tz_localize('UTC') if timestamp.tzinfo is None else timestamp.tz_convert('UTC')
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """프로세스 전체에서 공유하는 데이터 저장소"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ParquetStore()
+        return _store
@@ -0,0 +1,390 @@
+import ast
+import logging
+import re
+import sys
+import threading
+import pandas as pd
+import yfinance as yf
+from .config import YAHOO_BATCH_SIZE, get_logger
+from . import metrics, retry
+from .retry import CircuitOpenError, ProviderError
+from .response_cache import get_response_cache, is_closed_date
+from .http_pool import get_session
+from .storage import get_store
+
+# 모듈별 로거 가져오기
+logger = get_logger('yahoo_engine')
+
+# yf.download가 종목별 오류를 남기는 로그 형식 (예: "['AAPL', 'MSFT']: Timeout")
+_ERROR_LOG = re.compile(r"^(\[.*?\]): (.*)$", re.DOTALL)
+
+
+class _DownloadErrors(logging.Handler):
+    """
+    yf.download가 로그로만 남기는 종목별 오류 수집
+
+    yfinance 0.2.x는 yf.shared._ERRORS에 오류를 남기지만 이후 버전은 로그로만 남기므로
+    다운로드하는 동안 'yfinance' 로거에 붙여 둔다.
+    """
+
+    def __init__(self):
+        super().__init__(logging.ERROR)
+        self.errors = {}
+
+    def emit(self, record):
+        match = _ERROR_LOG.match(record.getMessage().strip())
+        if not match:
+            return
+        try:
+            symbols = ast.literal_eval(match.group(1))
+        except (ValueError, SyntaxError):
+            return
+        for symbol in symbols:
+            self.errors[str(symbol).upper()] = match.group(2)
+
+
+def _symbol_frame(data, symbol):
+    """yf.download 결과에서 한 종목의 시세 (받지 못했으면 빈 DataFrame)"""
+    if data is None or data.empty:
+        return pd.DataFrame()
+    if isinstance(data.columns, pd.MultiIndex):
+        if symbol not in data.columns.get_level_values(0):
+            return pd.DataFrame()
+        df = data[symbol]
+    else:
+        # 단일 종목 요청은 평평한 컬럼으로 반환됨
+        df = data
+    # 다른 종목만 거래된 날짜는 모든 값이 비어 있으므로 제거 (받지 못한 종목은 모든 값이 비어 있음)
+    df = df.dropna(how='all')
+    df.columns.name = None
+    return df
+
+
+def _grid_start(start_date, interval):
+    """
+    요청 시작일을 맞출 다운로드 시작일
+
+    일봉 이상은 그 달 1일부터 받아 시작일이 조금씩 다른 종목이 한 번에 받고 같은 캐시를 쓰게 한다.
+    분·시간봉은 조회할 수 있는 기간이 짧으므로 요청 시작일 그대로 받는다.
+    """
+    if interval.endswith(('m', 'h')):
+        return start_date
+    return start_date[:8] + '01'
+
+
+def _trim(df, start_date):
+    """다운로드 시작일부터 받은 시세에서 요청 시작일 이전 행 제거 (시작일은 시세의 시간대 기준)"""
+    if df.empty:
+        return df
+    return df[df.index >= pd.Timestamp(start_date, tz=df.index.tz)]
+
+
+class YahooDownloadEngine:
+    """
+    yfinance 공용 다운로드 엔진
+
+    여러 종목을 yf.download 한 번으로 묶어 받은 뒤 종목별 DataFrame으로 나눈다.
+    iter_frames는 배치를 받는 대로 내보내므로 메모리에는 배치 하나만 남는다.
+    prefetch로 미리 받아 둔 요청은 메모리에서 바로 반환하고, 꺼낼 때 보관 목록에서 제거한다.
+
+    yf.download는 여러 거래소 종목의 시각을 하나의 시간대(UTC 또는 가장 많은 종목의 시간대)로
+    맞추므로, 종목별 DataFrame은 각 거래소 시간대로 되돌려 저장 메타데이터에 실제 시간대가 남게 한다.
+    """
+
+    provider = 'yahoo'
+
+    def __init__(self, batch_size=YAHOO_BATCH_SIZE):
+        self.batch_size = batch_size
+        self._frames = {}  # (symbol, start, end, interval) -> DataFrame
+        self._timezones = {}  # symbol -> 거래소 시간대
+        self._lock = threading.Lock()
+
+    def _load_cached(self, requests, interval):
+        """디스크 캐시에 있는 요청은 다운로드 대상에서 제외 (캐시는 다운로드 시작일 기준)"""
+        cache = get_response_cache()
+        for symbol, start_date, end_date in requests:
+            key = (symbol, start_date, end_date, interval)
+            if key in self._frames:
+                continue
+            params = self._cache_params(symbol, _grid_start(start_date, interval), end_date, interval)
+            df = cache.get_frame(self.provider, 'download', params)
+            if df is not None:
+                self._frames[key] = _trim(df, start_date)
+
+    def _cache_params(self, symbol, start_date, end_date, interval):
+        """캐시 키로 쓰는 요청 파라미터"""
+        # 거래소 시간대로 되돌리기 전의 캐시는 쓰지 않음
+        return {'symbol': symbol, 'start': start_date, 'end': end_date, 'interval': interval, 'timezone': 'exchange'}
+
+    def _session(self):
+        """
+        yf.download에 넘길 세션
+
+        curl_cffi를 쓰는 yfinance는 자체 세션을 유지하며 재사용하므로 그대로 두고,
+        requests를 쓰는 버전에는 공용 연결 풀 세션을 넘긴다.
+        """
+        if 'curl_cffi' in sys.modules:
+            return None
+        return get_session(self.provider)
+
+    def _exchange_timezone(self, symbol):
+        """
+        종목 거래소의 시간대 (예: 'America/New_York', 확인하지 못하면 None)
+
+        거래소 시간대는 바뀌지 않으므로 메모리와 디스크 캐시에 보관하여 종목마다 한 번만 요청한다.
+        """
+        timezone = self._timezones.get(symbol)
+        if timezone:
+            return timezone
+
+        cache = get_response_cache()
+        params = {'symbol': symbol}
+        payload = cache.get_json(self.provider, 'timezone', params)
+        if payload is None:
+            try:
+                timezone = retry.call(self.provider, lambda: yf.Ticker(symbol, session=self._session()).fast_info['timezone'],
+                                      symbol=symbol)
+            except Exception as e:
+                logger.warning(f"Could not look up exchange timezone of {symbol}: {str(e)}")
+                return None
+            if not timezone:
+                return None
+            payload = {'timezone': timezone}
+            cache.put_json(self.provider, 'timezone', params, payload, closed=True)
+
+        self._timezones[symbol] = payload['timezone']
+        return payload['timezone']
+
+    def _pending_batches(self, requests, interval):
+        """아직 받지 않은 요청을 같은 다운로드 구간끼리 batch_size 단위로 묶음"""
+        pending = {}
+        for symbol, start_date, end_date in requests:
+            if (symbol, start_date, end_date, interval) not in self._frames:
+                symbols = pending.setdefault((_grid_start(start_date, interval), end_date), [])
+                if symbol not in symbols:
+                    symbols.append(symbol)
+
+        for (start_date, end_date), symbols in pending.items():
+            for i in range(0, len(symbols), self.batch_size):
+                yield symbols[i:i + self.batch_size], start_date, end_date
+
+    def _requested_frames(self, requests, interval, frames, start_date, end_date):
+        """
+        다운로드 구간으로 받은 종목별 시세를 요청마다 요청 시작일부터 잘라 나눔
+
+        Returns:
+            dict: {(symbol, 요청 시작일, 종료일, interval): DataFrame}
+        """
+        return {
+            (symbol, request_start, request_end, interval): _trim(frames[symbol], request_start)
+            for symbol, request_start, request_end in requests
+            if symbol in frames and request_end == end_date and _grid_start(request_start, interval) == start_date
+        }
+
+    def prefetch(self, requests, interval):
+        """
+        아직 받지 않은 요청을 배치로 다운로드하여 보관
+
+        Args:
+            requests (list): [(symbol, start_date, end_date), ...] - 같은 구간끼리 묶어 요청
+            interval (str): yfinance 간격
+        """
+        with self._lock:
+            self._load_cached(requests, interval)
+            for batch, start_date, end_date in list(self._pending_batches(requests, interval)):
+                frames = self._download_batch(batch, start_date, end_date, interval)
+                self._frames.update(self._requested_frames(requests, interval, frames, start_date, end_date))
+
+    def iter_frames(self, requests, interval):
+        """
+        요청별 시세를 배치가 끝날 때마다 순서대로 반환
+
+        prefetch로 받아 둔 종목은 바로 내보내고, 나머지는 배치 단위로 받으면서 내보낸다.
+
+        Yields:
+            tuple: (symbol, DataFrame) - Ticker.history()와 같은 형식, 데이터가 없는 종목은 제외
+        """
+        ready = []
+        with self._lock:
+            self._load_cached(requests, interval)
+            batches = list(self._pending_batches(requests, interval))
+            for symbol, start_date, end_date in requests:
+                df = self._frames.pop((symbol, start_date, end_date, interval), None)
+                if df is not None:
+                    ready.append((symbol, df))
+
+        for symbol, df in ready:
+            if not df.empty:
+                yield symbol, df
+
+        for batch, start_date, end_date in batches:
+            with self._lock:
+                frames = self._download_batch(batch, start_date, end_date, interval)
+            for (symbol, *_), df in self._requested_frames(requests, interval, frames, start_date, end_date).items():
+                if not df.empty:
+                    yield symbol, df
+
+    def fetch(self, requests, interval):
+        """
+        요청별 시세 반환
+
+        Returns:
+            dict: {symbol: DataFrame} - Ticker.history()와 같은 형식, 데이터가 없는 종목은 제외
+        """
+        return dict(self.iter_frames(requests, interval))
+
+    def clear(self):
+        """보관 중인 다운로드 결과 제거"""
+        with self._lock:
+            self._frames.clear()
+
+    def _download(self, symbols, start_date, end_date, interval):
+        """
+        yf.download 호출
+
+        Returns:
+            tuple: (DataFrame, {SYMBOL: 오류 메시지}) - 오류 키는 대문자 종목
+        """
+        capture = _DownloadErrors()
+        yf_logger = logging.getLogger('yfinance')
+        yf_logger.addHandler(capture)
+        try:
+            data = yf.download(
+                symbols,
+                start=start_date,
+                end=end_date,
+                interval=interval,
+                group_by='ticker',
+                actions=True,
+                auto_adjust=True,
+                ignore_tz=False,
+                threads=True,
+                progress=False,
+                session=self._session()
+            )
+        finally:
+            yf_logger.removeHandler(capture)
+
+        # 다운로드마다 새로 만드는 딕셔너리이므로 호출이 끝난 뒤에 읽음
+        errors = dict(capture.errors)
+        errors.update(getattr(getattr(yf, 'shared', None), '_ERRORS', None) or {})
+        return data, errors
+
+    def _download_batch(self, batch, start_date, end_date, interval):
+        """
+        한 배치 다운로드 후 종목별로 분리
+
+        yf.download는 종목별 오류를 예외로 올리지 않고 빈 컬럼으로 돌려주므로, 받지 못한 종목의
+        오류 메시지를 분류하여 한도 초과나 일시적 오류인 종목만 다시 요청한다.
+        다시 요청해도 실패할 종목은 경고를 남기고 빈 결과로 보관하여 같은 실행에서 다시 요청하지 않는다.
+        """
+        pending = list(batch)
+        frames = {}
+
+        def download():
+            data, errors = self._download(pending, start_date, end_date, interval)
+            retryable = {}
+            for symbol in list(pending):
+                df = _symbol_frame(data, symbol)
+                message = errors.get(symbol.upper())
+                kind = retry.classify_message(message) if message else 'fatal'
+                if df.empty and kind != 'fatal':
+                    retryable[symbol] = (kind, message)
+                    continue
+
+                pending.remove(symbol)
+                frames[symbol] = df
+                if df.empty and message:
+                    logger.warning(f"Failed to download {symbol}: {message}")
+                    metrics.inc('provider_errors_total', provider=self.provider, symbol=symbol, kind=kind)
+                elif df.empty:
+                    logger.warning(f"No data returned for {symbol}")
+
+            if retryable:
+                kinds = {kind for kind, _ in retryable.values()}
+                symbol, (_, message) = next(iter(retryable.items()))
+                raise ProviderError(f"{len(retryable)} symbols failed ({symbol}: {message})",
+                                    'rate_limit' if 'rate_limit' in kinds else 'transient')
+
+        try:
+            retry.call(self.provider, download, tokens=len(batch))
+        except CircuitOpenError as e:
+            # 남은 배치도 요청하지 않고 다음 실행에서 이어서 수집
+            logger.warning(f"Skipping {pending}: {str(e)}")
+        except ProviderError as e:
+            logger.error(f"Giving up on {pending} after retries: {str(e)}")
+        except Exception as e:
+            logger.error(f"Error downloading batch {pending}: {str(e)}")
+
+        for symbol, df in list(frames.items()):
+            # 일시적인 실패일 수 있으므로 빈 결과는 캐시하지 않음
+            if df.empty:
+                continue
+            timezone = self._exchange_timezone(symbol)
+            if timezone is None:
+                # 다음 실행에서 시간대를 다시 확인하도록 캐시하지 않음
+                logger.warning(f"Keeping {symbol} in {df.index.tz} instead of its exchange timezone")
+                continue
+            if df.index.tz is not None:
+                # 같은 시각을 거래소 시간대로 표기 (일봉 날짜가 거래소 기준이 됨)
+                df = frames[symbol] = df.tz_convert(timezone)
+            get_response_cache().put_frame(
+                self.provider,
+                'download',
+                self._cache_params(symbol, start_date, end_date, interval),
+                df,
+                closed=is_closed_date(end_date)
+            )
+        return frames
+
+
+def history_to_frame(df, symbol):
+    """Ticker.history() 형식의 종목 시세를 저장 형식의 컬럼으로 변환"""
+    df = df.reset_index()
+    df['symbol'] = symbol
+    return df.rename(columns={
+        'Date': 'date',
+        'Datetime': 'date',
+        'Open': 'open',
+        'High': 'high',
+        'Low': 'low',
+        'Close': 'close',
+        'Volume': 'volume'
+    })
+
+
+def history_to_batch(market, item):
+    """
+    iter_frames()가 반환한 종목 시세를 저장 스키마의 Arrow record batch로 변환
+
+    Args:
+        item (tuple): (symbol, DataFrame)
+    """
+    symbol, df = item
+    return get_store().to_batch(market, history_to_frame(df, symbol))
+
+
+def encode_history(market, item):
+    """
+    수집 파이프라인의 변환 단계 (작업 프로세스에서 실행)
+
+    Args:
+        item (tuple): iter_frames()가 반환한 (symbol, DataFrame)
+
+    Returns:
+        tuple: (symbol, ParquetStore.encode_batch() 결과)
+    """
+    return item[0], get_store().encode_batch(market, history_to_batch(market, item))
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_yahoo_engine():
+    """프로세스 전체에서 공유하는 Yahoo 다운로드 엔진"""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = YahooDownloadEngine()
+        return _engine
@@ -1,15 +1,12 @@
-import os
 import sys
 from datetime import datetime, timedelta
-import logging
-import time
-from dotenv import load_dotenv
+import threading
+import argparse
+import signal
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import json
 from pathlib import Path
 
-# 환경 변수 로드
-load_dotenv()
-
 # 프로젝트 루트 디렉토리 설정
 current_dir = Path(__file__).parent
 project_root = current_dir.parent
@@ -17,13 +14,9 @@ project_root = current_dir.parent
 # 데이터 수집 모듈 임포트를 위한 경로 추가
 sys.path.append(str(current_dir))
 
-from fetch_modules.config import data_dir, log_dir, report_dir, get_logger
-from fetch_modules.fetch_stocks import StockDataFetcher
-from fetch_modules.fetch_commodities import CommodityDataFetcher
-from fetch_modules.fetch_bonds import BondDataFetcher
-from fetch_modules.fetch_forex import ForexDataFetcher
-from fetch_modules.fetch_crypto import CryptoDataFetcher
-from fetch_modules.fetch_real_estate import RealEstateDataFetcher
+# 수집기와 pandas를 쓰는 모듈은 필요할 때 임포트 (시작 시간 단축)
+from fetch_modules.config import data_dir, report_dir, get_logger, RATE_LIMITS
+from fetch_modules.registry import CollectorRegistry
 
 # 메인 로거 가져오기
 logger = get_logger('main')
@@ -82,7 +75,7 @@ def parse_time_interval(interval_str):
         return '1mo'  # 기본값
 
 class DataCollectionManager:
-    def __init__(self, start_date=None, end_date=None, save_interval=5):
+    def __init__(self, start_date=None, end_date=None, save_interval=5, markets=None):
         """
         데이터 수집 관리자 초기화
         
@@ -90,6 +83,7 @@ class DataCollectionManager:
             start_date (str): 데이터 수집 시작일 (YYYY-MM-DD 형식)
             end_date (str): 데이터 수집 종료일 (YYYY-MM-DD 형식)
             save_interval (int): 데이터 저장 간격 (초)
+            markets (list): 수집할 시장 목록 (None이면 전체)
         """
         # 날짜 설정
         if start_date is None:
@@ -115,51 +109,138 @@ class DataCollectionManager:
         else:
             self.interval_str = f"{save_interval}S"
         
-        # 데이터 수집기 초기화
-        self.collectors = {
-            'stocks': StockDataFetcher(),
-            'commodities': CommodityDataFetcher(),
-            'bonds': BondDataFetcher(),
-            'forex': ForexDataFetcher(),
-            'crypto': CryptoDataFetcher(),
-            'real_estate': RealEstateDataFetcher()
-        }
+        # 데이터 수집기 목록 (선택한 시장의 수집기만 실제로 수집할 때 생성)
+        self.collectors = CollectorRegistry(markets)
         
         # 진행 상황 추적
         self.total_markets = len(self.collectors)
         self.completed_markets = 0
+        self.results = {}
+        self._progress_lock = threading.Lock()
+        # 마지막 실행의 이벤트 기록 (보고서는 이 실행의 이벤트로만 작성)
+        self.run = None
+
+    def collect_all_data(self, concurrent=True, markets=None):
+        """
+        모든 시장 데이터 수집
+
+        Args:
+            concurrent (bool): True이면 제공자(yahoo, fred, binance)별로 병렬 실행.
+                같은 제공자를 쓰는 시장끼리는 순서대로 실행하며 제공자별 요청 한도를 함께 사용한다.
+            markets (list): 이번에 수집할 시장 (None이면 선택한 시장 전체)
+        """
+        from fetch_modules.config import config
+        from fetch_modules import metrics, run_log
+
+        markets = self.collectors.keys() if markets is None else markets
+        self.total_markets = len(markets)
+        self.completed_markets = 0
+        self.results = {}
+        metrics.get_metrics().reset()
+        self.run = run_log.start_run(
+            markets=list(markets),
+            start_date=self.start_date,
+            end_date=self.end_date,
+            interval=config.interval
+        )
 
-    def collect_all_data(self):
-        """모든 시장 데이터 수집"""
         print(f"\n데이터 수집 시작: {self.start_date} ~ {self.end_date}")
         print("=" * 50)
-        
-        for market, collector in self.collectors.items():
-            try:
-                print(f"\n[{self.completed_markets + 1}/{self.total_markets}] {market} 데이터 수집 중...")
+
+        try:
+            self._collect_markets(markets, concurrent)
+        finally:
+            # 메트릭 파일은 data_range.json 옆에 기록 (마지막 실행의 값)
+            metrics.export(self.run.finish())
+
+    def _collect_markets(self, markets, concurrent):
+        from fetch_modules.storage import get_store
+        from fetch_modules.http_pool import log_connection_stats
+
+        if not concurrent:
+            for market in markets:
+                self._collect_market(market)
+            get_store().wait_for_compaction()
+            log_connection_stats()
+            return
+
+        # 제공자별로 시장 묶기 (수집기 등록 순서 유지)
+        provider_groups = self.collectors.provider_groups(markets)
+
+        with ThreadPoolExecutor(max_workers=len(provider_groups), thread_name_prefix='collector') as executor:
+            futures = {
+                executor.submit(self._collect_provider, provider, markets): provider
+                for provider, markets in provider_groups.items()
+            }
+            for future in as_completed(futures):
+                provider = futures[future]
+                try:
+                    future.result()
+                except Exception as e:
+                    logger.error(f"Error in {provider} collection worker: {str(e)}")
+
+        # 백그라운드 병합이 끝난 뒤 종료
+        get_store().wait_for_compaction()
+        log_connection_stats()
+
+    def _collect_provider(self, provider, markets):
+        """
+        한 제공자에 속한 시장들을 순서대로 수집 (호출 간격은 rate_limiter가 조절)
+
+        Yahoo 시장도 한 번에 하나씩 받는다. 수집기가 배치를 받는 대로 저장하므로
+        메모리에는 현재 시장의 배치 하나만 남는다.
+        """
+        for market in markets:
+            self._collect_market(market)
+
+    def _collect_market(self, market):
+        """단일 시장 수집 및 진행 상황 보고"""
+        from fetch_modules import metrics
+
+        self.run.market_started(market)
+        try:
+            collector = self.collectors[market]
+            print(f"\n{market} 데이터 수집 중...")
+            with metrics.stage('collect', market=market):
                 success = collector.fetch_data(self.start_date, self.end_date)
-                
+            self.results[market] = success
+            self._update_rollups(market)
+            self.run.market_finished(market, success)
+
+            with self._progress_lock:
                 if success:
                     print(f"✓ {market} 데이터 수집 완료")
                     logger.info(f"Successfully collected {market} data")
                 else:
                     print(f"✗ {market} 데이터 수집 실패")
                     logger.error(f"Failed to collect {market} data")
-                
+
                 self.completed_markets += 1
-                print(f"진행률: {self.completed_markets}/{self.total_markets} ({(self.completed_markets/self.total_markets*100):.1f}%)")
-                
-                # API 제한 고려
-                time.sleep(self.save_interval)
-                
-            except Exception as e:
-                print(f"✗ {market} 데이터 수집 중 오류 발생: {str(e)}")
-                logger.error(f"Error in {market} data collection: {str(e)}")
-                continue
+                print(f"[{self.completed_markets}/{self.total_markets}] 진행률: {(self.completed_markets/self.total_markets*100):.1f}%")
+
+        except Exception as e:
+            self.results[market] = False
+            self.run.market_finished(market, False, error=e)
+            print(f"✗ {market} 데이터 수집 중 오류 발생: {str(e)}")
+            logger.error(f"Error in {market} data collection: {str(e)}")
+
+    def _update_rollups(self, market):
+        """수집한 기준 간격 데이터로 더 긴 간격의 파생 데이터셋 갱신 (API 호출 없음)"""
+        from fetch_modules import metrics, resample
+        from fetch_modules.storage import get_store
+
+        try:
+            # 병합이 끝난 base 파일에서 읽도록 이 시장의 백그라운드 병합을 기다림
+            get_store().wait_for_compaction(market)
+            with metrics.stage('rollup', market=market):
+                resample.update_rollups(market)
+        except Exception as e:
+            logger.error(f"Error updating {market} rollups: {str(e)}")
 
     def save_data_range(self):
         """데이터 범위 정보 저장"""
         from fetch_modules.config import config  # config 임포트
+        from fetch_modules.storage import get_store
         
         range_file = data_dir / 'data_range.json'
         range_info = {
@@ -167,14 +248,17 @@ class DataCollectionManager:
             'end_date': self.end_date,
             'last_updated': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
             'data_collection_frequency': config.interval,  # config에서 interval 가져오기
-            'api_call_interval': f"{self.save_interval}S",  # API 호출 간격
+            'rate_limits': {  # 제공자별 요청 한도
+                provider: f"{requests}/{int(window)}S" for provider, (requests, window) in RATE_LIMITS.items()
+            },
             'markets': {}
         }
         
         # 각 시장별 데이터 범위 확인
+        store = get_store()
         for market in self.collectors.keys():
-            file_path = data_dir / f'{market}.parquet'
-            if file_path.exists():
+            file_path = store.market_dir(market)
+            if store.exists(market):
                 range_info['markets'][market] = {
                     'file_exists': True,
                     'file_path': str(file_path)
@@ -190,8 +274,9 @@ class DataCollectionManager:
         print("\n데이터 범위 정보가 저장되었습니다.")
 
     def generate_report(self):
-        """수집 결과 보고서 생성"""
-        report_dir = project_root / 'reports'
+        """수집 결과 보고서 생성 (마지막 실행의 이벤트로 작성)"""
+        from fetch_modules.storage import get_store
+
         report_dir.mkdir(parents=True, exist_ok=True)
         
         report_file = report_dir / f'collection_report_{datetime.now().strftime("%Y%m%d")}.txt'
@@ -200,60 +285,145 @@ class DataCollectionManager:
             f.write(f"데이터 수집 보고서 ({datetime.now().strftime('%Y-%m-%d')})\n")
             f.write("=" * 50 + "\n\n")
             
+            if self.run is not None:
+                f.write(f"실행 ID: {self.run.run_id}\n")
             f.write(f"수집 기간: {self.start_date} ~ {self.end_date}\n")
             f.write(f"저장 간격: {self.save_interval}초\n")
-            f.write(f"수집 완료율: {self.completed_markets}/{self.total_markets} ({(self.completed_markets/self.total_markets*100):.1f}%)\n\n")
+            f.write(f"수집 완료율: {self.completed_markets}/{self.total_markets} ({(self.completed_markets/max(self.total_markets, 1)*100):.1f}%)\n\n")
             
             # 각 시장별 데이터 파일 확인
             for market in self.collectors.keys():
-                file_path = data_dir / f'{market}.parquet'
-                if file_path.exists():
+                if get_store().exists(market):
                     f.write(f"{market}: 데이터 파일 존재\n")
                 else:
                     f.write(f"{market}: 데이터 파일 없음\n")
-            
-            # 로그 파일에서 에러 확인
-            log_file = log_dir / 'collection_log.txt'
-            if log_file.exists():
-                with open(log_file, 'r', encoding='utf-8') as log:
-                    errors = [line for line in log if 'ERROR' in line]
-                    if errors:
-                        f.write("\n발생한 에러:\n")
-                        for error in errors:
-                            f.write(f"- {error.strip()}\n")
-
-def main():
+
+            if self.run is None:
+                return
+
+            # 이번 실행의 시장별 결과
+            f.write("\n시장별 결과:\n")
+            for market, outcome in self.run.markets.items():
+                status = "성공" if outcome['success'] else "실패"
+                duration = f" ({outcome['duration']:.1f}초)" if outcome['duration'] is not None else ""
+                f.write(f"- {market}: {status}{duration}\n")
+
+            # 이번 실행에서 발생한 에러
+            errors = self.run.errors()
+            if errors:
+                f.write("\n발생한 에러:\n")
+                for error in errors:
+                    f.write(f"- {error['ts']} - {error['logger']} - {error['message']}\n")
+
+def valid_date(value):
+    """YYYY-MM-DD 형식의 날짜 인자 확인"""
+    try:
+        datetime.strptime(value, '%Y-%m-%d')
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"날짜 형식이 올바르지 않습니다 (YYYY-MM-DD): {value}")
+    return value
+
+
+def parse_args(argv=None):
+    """명령행 인자 해석"""
+    from fetch_modules.registry import MARKETS
+    from fetch_modules.config import COLLECTION_SCHEDULE
+
+    parser = argparse.ArgumentParser(
+        description='금융 시장 데이터 수집기',
+        epilog='시간 단위: S(초), M(분), H(시간), D(일), W(주), MO(달), Y(년)'
+    )
+    parser.add_argument('-m', '--markets', nargs='+', choices=MARKETS, metavar='MARKET',
+                        help=f"수집할 시장 (기본값: 전체) - {', '.join(MARKETS)}")
+    parser.add_argument('-s', '--symbols', nargs='+', metavar='SYMBOL',
+                        help='수집할 종목/시리즈 (선택한 시장에 등록된 것 중에서, 기본값: 전체)')
+    parser.add_argument('--start', type=valid_date, help='시작일 (YYYY-MM-DD)')
+    parser.add_argument('--end', type=valid_date, help='종료일 (YYYY-MM-DD, 기본값: 오늘)')
+    parser.add_argument('--interval', default='', help='데이터 수집 간격 (예: 1M, 1H, 1D, 1W, 1MO, 1Y, 기본값: 1MO)')
+    parser.add_argument('--sequential', action='store_true',
+                        help='제공자별 병렬 실행 대신 시장을 하나씩 순서대로 수집')
+    parser.add_argument('--daemon', action='store_true',
+                        help='종료하지 않고 시장별 주기에 맞춰 반복 수집')
+    parser.add_argument('--schedule', default=COLLECTION_SCHEDULE,
+                        help=f'데몬 모드의 시장별 수집 주기 (기본값: {COLLECTION_SCHEDULE})')
+    parser.add_argument('-i', '--interactive', action='store_true',
+                        help='시작일, 종료일, 간격을 입력받아 실행')
+    return parser.parse_args(argv)
+
+
+def prompt_settings(args):
+    """대화형 실행: 시작일, 종료일, 간격 입력"""
+    print("데이터 수집 설정을 입력하세요 (기본값을 사용하려면 Enter를 누르세요):")
+    print("시간 단위: S(초), M(분), H(시간), D(일), W(주), MO(달), Y(년)")
+    print("예시: 1m(1분), 1h(1시간), 1d(1일), 1w(1주), 1mo(1달)")
+
+    args.start = input("시작일 (YYYY-MM-DD): ").strip() or None
+    args.end = input("종료일 (YYYY-MM-DD): ").strip() or None
+    args.interval = input("데이터 수집 간격 (예: 5S, 1M, 1H, 1D, 1W, 1MO, 1Y): ").strip()
+
+
+def run_daemon(manager, args):
+    """시장별 주기에 맞춰 반복 수집 (SIGINT/SIGTERM을 받으면 진행 중인 수집을 마치고 종료)"""
+    from fetch_modules.scheduler import CollectionScheduler, parse_schedule
+
+    scheduler = CollectionScheduler(
+        manager,
+        parse_schedule(args.schedule),
+        concurrent=not args.sequential,
+        follow_today=args.end is None
+    )
+
+    def handle_signal(signum, frame):
+        print("\n종료 신호를 받았습니다. 진행 중인 수집을 마친 뒤 종료합니다.")
+        scheduler.stop()
+
+    signal.signal(signal.SIGINT, handle_signal)
+    signal.signal(signal.SIGTERM, handle_signal)
+    scheduler.run()
+
+
+def main(argv=None):
+    """
+    데이터 수집 실행
+
+    Returns:
+        int: 종료 코드 (모든 시장 수집에 성공하면 0)
+    """
+    args = parse_args(argv)
     try:
         from fetch_modules.config import config
-        
-        # 사용자 입력 받기
-        print("데이터 수집 설정을 입력하세요 (기본값을 사용하려면 Enter를 누르세요):")
-        print("시간 단위: S(초), M(분), H(시간), D(일), W(주), MO(달), Y(년)")
-        print("예시: 1m(1분), 1h(1시간), 1d(1일), 1w(1주), 1mo(1달)")
-        
-        start_date = input("시작일 (YYYY-MM-DD): ").strip() or None
-        end_date = input("종료일 (YYYY-MM-DD): ").strip() or None
-        interval = input("데이터 수집 간격 (예: 5S, 1M, 1H, 1D, 1W, 1MO, 1Y): ").strip()
-        
+
+        if args.interactive:
+            prompt_settings(args)
+
         # 전역 설정에 적용
-        config.start_date = start_date
-        config.end_date = end_date
-        config.interval = parse_time_interval(interval)
-        
-        # 데이터 수집 실행
+        config.start_date = args.start
+        config.end_date = args.end
+        config.interval = parse_time_interval(args.interval)
+        config.symbols = args.symbols
+
         manager = DataCollectionManager(
-            start_date=start_date,
-            end_date=end_date,
-            save_interval=5  # API 호출 간격은 5초로 고정
+            start_date=args.start,
+            end_date=args.end,
+            save_interval=5,
+            markets=args.markets
         )
-        manager.collect_all_data()
+
+        if args.daemon:
+            run_daemon(manager, args)
+            return 0
+
+        # 데이터 수집 실행
+        manager.collect_all_data(concurrent=not args.sequential)
         manager.save_data_range()
         manager.generate_report()
         print("\n데이터 수집이 완료되었습니다. 보고서를 확인해주세요.")
-        
+        return 0 if all(manager.results.values()) else 1
+
     except Exception as e:
         logger.error(f"Error in main execution: {str(e)}")
         print(f"오류가 발생했습니다: {str(e)}")
+        return 1
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    sys.exit(main())
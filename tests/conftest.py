@@ -0,0 +1,36 @@
+import os
+import tempfile
+import time
+
+import pytest
+
+# fetch_modules.config가 경로를 정하기 전에 데이터·로그·캐시를 임시 디렉토리로 돌림
+_root = tempfile.mkdtemp(prefix='fetch-tests-')
+for _name in ('DATA_DIR', 'LOG_DIR', 'REPORT_DIR', 'CACHE_DIR'):
+    os.environ[_name] = os.path.join(_root, _name.split('_')[0].lower())
+
+
+class FakeClock:
+    """time.monotonic()과 time.sleep()을 대신하는 시계 (sleep은 기다리지 않고 시각만 옮김)"""
+
+    def __init__(self, now=1000.0):
+        self.now = now
+        self.slept = []
+
+    def monotonic(self):
+        return self.now
+
+    def perf_counter(self):
+        return self.now
+
+    def time(self):
+        return time.time()
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += max(seconds, 0)
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
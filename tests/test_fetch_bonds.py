@@ -0,0 +1,105 @@
+import pandas as pd
+import pytest
+
+from fetch_modules import fetch_bonds, storage
+from fetch_modules.config import config
+from fetch_modules.fetch_bonds import is_covered
+
+INFO = {'last_updated': '2024-07-01 15:21:02-05', 'observation_end': '2024-07-12'}
+WATERMARK = {
+    'last': '2024-06-28T00:00:00',
+    'last_updated': '2024-07-01 15:21:02-05',
+    'covered_until': '2024-06-30',
+    'frequency': 'd'
+}
+
+
+def test_unchanged_series_covering_the_request_is_skipped():
+    assert is_covered(WATERMARK, '2024-06-28', '2024-06-30', 'd', INFO)
+
+
+def test_later_end_date_is_fetched():
+    assert not is_covered(WATERMARK, '2024-06-28', '2024-07-15', 'd', INFO)
+
+
+def test_end_date_past_last_observation_is_covered():
+    watermark = {**WATERMARK, 'covered_until': '2024-07-12'}
+
+    assert is_covered(watermark, '2024-06-28', '2024-07-31', 'd', INFO)
+
+
+@pytest.mark.parametrize('change', [
+    {'frequency': 'w'},
+    {'last_updated': '2024-06-01 15:21:02-05'},
+    {'covered_until': None},
+    {'last': '2024-06-01T00:00:00'}
+])
+def test_changed_watermark_is_fetched(change):
+    assert not is_covered({**WATERMARK, **change}, '2024-06-28', '2024-06-30', 'd', INFO)
+
+
+def test_watermark_recorded_before_coverage_tracking_is_fetched():
+    legacy = {'last': '2024-06-28T00:00:00', 'last_updated': '2024-07-01 15:21:02-05'}
+
+    assert not is_covered(legacy, '2024-06-28', '2024-06-30', 'd', INFO)
+
+
+@pytest.fixture
+def fetcher(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, '_store', storage.ParquetStore(root=tmp_path / 'datas'))
+    monkeypatch.setattr(config, 'interval', '1d')
+    fetcher = fetch_bonds.BondDataFetcher()
+    fetcher.tracker_file = tmp_path / 'resume_tracker.json'
+    fetcher._init_tracker()
+    fetcher.requested = []
+    fetcher.without_new_data = set()
+
+    def get_series(series, start_date, end_date, frequency, last_updated=None):
+        fetcher.requested.append((series, start_date, end_date))
+        if series != 'DGS10' or series in fetcher.without_new_data:
+            return pd.Series(dtype='float64')
+        dates = pd.bdate_range(start_date, end_date)
+        return pd.Series(range(len(dates)), index=dates, dtype='float64')
+
+    monkeypatch.setattr(fetcher, '_series_info', lambda series: INFO)
+    monkeypatch.setattr(fetcher, '_get_series', get_series)
+    return fetcher
+
+
+def test_coverage_is_recorded_only_for_saved_series(fetcher):
+    assert fetcher.fetch_data('2024-06-01', '2024-06-30')
+
+    watermarks = fetcher._load_tracker()['bonds']['watermarks']
+    assert watermarks == {'DGS10': {
+        'first': '2024-06-01',
+        'last': '2024-06-28T00:00:00',
+        'last_updated': INFO['last_updated'],
+        'covered_until': '2024-06-30',
+        'frequency': 'd'
+    }}
+
+
+def test_covered_series_is_skipped_until_the_end_date_moves(fetcher):
+    fetcher.fetch_data('2024-06-01', '2024-06-30')
+    fetcher.requested.clear()
+
+    fetcher.fetch_data('2024-06-01', '2024-06-30')
+    assert 'DGS10' not in [series for series, _, _ in fetcher.requested]
+
+    fetcher.fetch_data('2024-06-01', '2024-07-15')
+    assert ('DGS10', '2024-06-28', '2024-07-15') in fetcher.requested
+    assert fetcher._load_tracker()['bonds']['watermarks']['DGS10']['last'] == '2024-07-15T00:00:00'
+
+
+def test_coverage_is_recorded_when_no_new_observations_arrive(fetcher):
+    fetcher.fetch_data('2024-06-01', '2024-06-30')
+    fetcher.without_new_data.add('DGS10')
+
+    assert fetcher.fetch_data('2024-06-01', '2024-07-15')
+    watermark = fetcher._load_tracker()['bonds']['watermarks']['DGS10']
+    assert watermark['covered_until'] == '2024-07-15'
+    assert watermark['last'] == '2024-06-28T00:00:00'
+
+    fetcher.requested.clear()
+    fetcher.fetch_data('2024-06-01', '2024-07-15')
+    assert 'DGS10' not in [series for series, _, _ in fetcher.requested]
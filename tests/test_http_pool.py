@@ -0,0 +1,85 @@
+import json
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from fetch_modules import fetch_bonds, http_pool
+
+
+class Handler(BaseHTTPRequestHandler):
+    """keep-alive로 응답하는 FRED API 대역"""
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        body = json.dumps({'path': self.path.split('?')[0]}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_port}'
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    # 다른 테스트의 세션과 통계를 쓰지 않도록 새로 시작
+    monkeypatch.setattr(http_pool, '_stats', http_pool.ConnectionStats())
+    monkeypatch.setattr(http_pool, '_sessions', {})
+    yield
+    for session in http_pool._sessions.values():
+        session.close()
+
+
+@pytest.fixture
+def collectors(server, pool, monkeypatch):
+    monkeypatch.setattr(fetch_bonds, 'FRED_API_URL', f'{server}/fred')
+    collectors = [fetch_bonds.BondDataFetcher(), fetch_bonds.BondDataFetcher()]
+    for collector in collectors:
+        collector.api_key = 'test'
+    return collectors
+
+
+def test_session_is_shared_per_provider(pool):
+    assert http_pool.get_session('fred') is http_pool.get_session('fred')
+    assert http_pool.get_session('fred') is not http_pool.get_session('binance')
+
+
+def test_collectors_reuse_pooled_connections(collectors):
+    for _ in range(3):
+        for collector in collectors:
+            assert collector._fred_request('series', series_id='DGS10') == {'path': '/fred/series'}
+
+    # 두 수집기가 같은 세션의 연결 하나를 계속 씀
+    assert http_pool.connection_stats() == {'127.0.0.1': {'requests': 6, 'new': 1, 'reused': 5}}
+
+
+def test_other_provider_opens_its_own_connection(collectors, server):
+    collectors[0]._fred_request('series', series_id='DGS10')
+    http_pool.get_session('binance').get(f'{server}/api/v3/klines').raise_for_status()
+    collectors[1]._fred_request('series', series_id='DGS2')
+
+    assert http_pool.connection_stats() == {'127.0.0.1': {'requests': 3, 'new': 2, 'reused': 1}}
+
+
+def test_reuse_counts_are_logged(collectors, caplog):
+    for collector in collectors:
+        collector._fred_request('series', series_id='DGS10')
+
+    with caplog.at_level(logging.INFO, logger='http_pool'):
+        http_pool.log_connection_stats()
+
+    assert caplog.messages == ['HTTP 127.0.0.1: 2 requests, 1 new connections, 1 reused']
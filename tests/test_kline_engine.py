@@ -0,0 +1,163 @@
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+from binance.helpers import interval_to_milliseconds
+
+from fetch_modules import fetch_crypto, pipeline, rate_limiter, response_cache, retry, storage
+from fetch_modules.config import config
+from fetch_modules.kline_engine import KLINES_PAGE_LIMIT, KlineEngine, klines_to_columns
+
+MINUTE = 60_000
+PAGE = MINUTE * KLINES_PAGE_LIMIT
+LISTED = PAGE * 26_000  # 2019년 6월, 페이지 격자 위
+
+
+class StubClient:
+    """상장 시각부터 캔들을 만들어 주는 Binance 클라이언트 대역 (요청을 기록)"""
+
+    def __init__(self, delays=None):
+        self.calls = []
+        self.delays = delays or {}  # 페이지 시작 시각 -> 응답 지연(초)
+
+    def get_klines(self, symbol, interval, startTime, limit, endTime=None):
+        self.calls.append((symbol, startTime, endTime))
+        time.sleep(self.delays.get(startTime, 0))
+        step = interval_to_milliseconds(interval)
+        first = max(startTime, LISTED)
+        first += -first % step
+        last = endTime if endTime is not None else first + limit * step - 1
+        return [
+            [ts, '1.0', '2.0', '0.5', '1.5', '10.0', ts + step - 1, '15.0', 3, '4.0', '6.0', '0']
+            for ts in range(first, last + 1, step)
+        ][:limit]
+
+
+@pytest.fixture
+def client(monkeypatch, clock, tmp_path):
+    monkeypatch.setattr(response_cache, '_cache', response_cache.ResponseCache(root=tmp_path / 'cache'))
+    monkeypatch.setattr(rate_limiter, 'time', clock)
+    monkeypatch.setattr(rate_limiter, '_limiters', {})
+    monkeypatch.setattr(retry, 'time', clock)
+    monkeypatch.setattr(retry, '_breakers', {})
+    return StubClient()
+
+
+def timestamps(client, start_ts, end_ts):
+    pages = KlineEngine(client, max_workers=2).iter_pages('BTCUSDT', '1m', MINUTE, start_ts, end_ts)
+    return [kline[0] for page in pages for kline in page]
+
+
+def test_pages_follow_a_fixed_grid_and_are_trimmed(client):
+    start_ts, end_ts = LISTED + 100 * MINUTE, LISTED + 1900 * MINUTE
+
+    assert timestamps(client, start_ts, end_ts) == list(range(start_ts, end_ts, MINUTE))
+    page_calls = [(start, end) for _, start, end in client.calls if end is not None]
+    assert page_calls == [(LISTED, LISTED + PAGE - 1), (LISTED + PAGE, LISTED + 2 * PAGE - 1)]
+
+
+def test_shifted_range_is_served_from_cache(client):
+    timestamps(client, LISTED + 100 * MINUTE, LISTED + 1900 * MINUTE)
+    requested = len(client.calls)
+
+    # 체크포인트에서 이어받을 때처럼 시작이 조금 달라도 같은 페이지를 씀
+    start_ts, end_ts = LISTED + 105 * MINUTE, LISTED + 1905 * MINUTE
+    assert timestamps(client, start_ts, end_ts) == list(range(start_ts, end_ts, MINUTE))
+    assert len(client.calls) == requested
+
+
+def test_pages_are_yielded_in_start_order(client):
+    # 앞 페이지의 응답이 가장 늦게 와도 시작 시각 순서대로 내보냄
+    client.delays = {LISTED: 0.2, LISTED + PAGE: 0.1}
+    engine = KlineEngine(client, max_workers=4)
+
+    pages = list(engine.iter_pages('BTCUSDT', '1m', MINUTE, LISTED, LISTED + 4 * PAGE))
+
+    assert [page[0][0] for page in pages] == [LISTED + index * PAGE for index in range(4)]
+    assert all(len(page) == KLINES_PAGE_LIMIT for page in pages)
+
+
+@pytest.fixture
+def fetcher(client, tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, '_store', storage.ParquetStore(root=tmp_path / 'datas'))
+    monkeypatch.setattr(config, 'interval', '1h')
+    monkeypatch.setattr(config, '_symbols', ['BTCUSDT'])
+    monkeypatch.setattr(pipeline, 'PIPELINE_PROCESSES', 0)
+    monkeypatch.setattr(pipeline, '_pool', None)
+    fetcher = fetch_crypto.CryptoDataFetcher()
+    fetcher.tracker_file = tmp_path / 'resume_tracker.json'
+    fetcher._init_tracker()
+    fetcher.api_key = fetcher.api_secret = 'test'
+    fetcher._kline_engine = KlineEngine(client)
+
+    # 종목별 요청 시작 시각 기록
+    fetcher.starts = []
+    iter_pages = fetcher._kline_engine.iter_pages
+
+    def record_start(symbol, interval, interval_ms, start_ts, end_ts):
+        fetcher.starts.append(start_ts)
+        return iter_pages(symbol, interval, interval_ms, start_ts, end_ts)
+
+    monkeypatch.setattr(fetcher._kline_engine, 'iter_pages', record_start)
+    return fetcher
+
+
+def test_next_run_resumes_from_the_last_saved_candle(fetcher):
+    assert fetcher.fetch_data('2019-07-01', '2019-07-03')
+    watermark = fetcher._load_tracker()['crypto']['watermarks']['BTCUSDT']
+    assert watermark['last'] == '2019-07-02T23:00:00'
+
+    assert fetcher.fetch_data('2019-07-01', '2019-07-05')
+
+    # 두 번째 실행은 날짜 경계가 아니라 마지막으로 저장된 캔들부터 요청
+    assert fetcher.starts[-1] == pd.Timestamp('2019-07-02 23:00', tz='UTC').value // 10**6
+    df = storage.get_store().read('crypto')
+    assert len(df) == 4 * 24
+    assert df['date'].is_unique
+    assert fetcher._load_tracker()['crypto']['watermarks']['BTCUSDT']['last'] == '2019-07-04T23:00:00'
+
+
+def test_windows_are_split_at_checkpoint_size(fetcher, monkeypatch):
+    monkeypatch.setattr(fetch_crypto, 'CHECKPOINT_WINDOW_CANDLES', 2 * KLINES_PAGE_LIMIT)
+    # 상장 전 날짜부터 요청해도 상장 시각부터 받음
+    requests = [('BTCUSDT', '2019-06-01', '2020-01-01')]
+
+    windows = list(fetcher._iter_windows(requests, {}, '1m', MINUTE, LISTED + 5 * PAGE))
+
+    assert [len(pages) for _, pages in windows] == [2, 2, 1]
+    assert [symbol for symbol, _ in windows] == ['BTCUSDT'] * 3
+
+
+def test_klines_to_columns_builds_typed_arrays():
+    pages = [
+        [[LISTED, '1.5', '2.5', '0.5', '2.0', '10.25', LISTED + MINUTE - 1, '20.5', 7, '4.0', '8.0', '0']],
+        [[LISTED + MINUTE, '2.0', '3.0', '1.0', '2.5', '11.75', LISTED + 2 * MINUTE - 1, '29.0', 9, '5.0', '12.5', '0']]
+    ]
+
+    columns = klines_to_columns(pages)
+
+    assert list(columns) == ['date', 'open', 'high', 'low', 'close', 'volume']
+    assert columns['date'].dtype == np.dtype('datetime64[ns]')
+    assert list(columns['date']) == list(pd.to_datetime([LISTED, LISTED + MINUTE], unit='ms'))
+    assert all(columns[name].dtype == np.float64 for name in ('open', 'high', 'low', 'close', 'volume'))
+    assert list(columns['close']) == [2.0, 2.5]
+    assert list(columns['volume']) == [10.25, 11.75]
+
+
+def test_klines_to_columns_with_extra_columns():
+    page = [[LISTED, '1.5', '2.5', '0.5', '2.0', '10.25', LISTED + MINUTE - 1, '20.5', 7, '4.0', '8.0', '0']]
+
+    columns = klines_to_columns([page], extra_columns=True)
+
+    assert list(columns)[6:] == ['quote_volume', 'trades', 'buy_base_volume', 'buy_quote_volume']
+    assert columns['trades'].dtype == np.int64 and list(columns['trades']) == [7]
+    assert list(columns['quote_volume']) == [20.5]
+    assert list(columns['buy_quote_volume']) == [8.0]
+
+
+def test_klines_to_columns_of_no_pages_is_empty():
+    columns = klines_to_columns([])
+
+    assert all(len(values) == 0 for values in columns.values())
+    assert columns['date'].dtype == np.dtype('datetime64[ns]')
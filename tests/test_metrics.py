@@ -0,0 +1,105 @@
+import json
+import math
+
+import pytest
+
+from fetch_modules.metrics import PREFIX, Metrics, _write_atomic
+
+
+@pytest.fixture
+def metrics():
+    return Metrics(buckets=(0.1, 1, 10))
+
+
+def samples(text):
+    """Prometheus 텍스트에서 주석을 뺀 '이름{레이블} 값' 줄"""
+    return dict(line.rsplit(' ', 1) for line in text.splitlines() if not line.startswith('#'))
+
+
+def test_counters_are_exported_with_help_and_type(metrics):
+    metrics.inc('provider_errors_total', provider='binance')
+    metrics.inc('provider_errors_total', 2, provider='fred')
+    metrics.inc('rows_written_total', 150, market='crypto', interval=None)
+
+    text = metrics.to_prometheus()
+
+    assert text.endswith('\n')
+    lines = text.splitlines()
+    # HELP와 TYPE은 메트릭마다 한 번, 계열보다 먼저
+    assert lines[:2] == [
+        f'# HELP {PREFIX}provider_errors_total Provider calls that failed for good',
+        f'# TYPE {PREFIX}provider_errors_total counter'
+    ]
+    assert sum(line.startswith(f'# TYPE {PREFIX}provider_errors_total') for line in lines) == 1
+    assert samples(text) == {
+        f'{PREFIX}provider_errors_total{{provider="binance"}}': '1',
+        f'{PREFIX}provider_errors_total{{provider="fred"}}': '2',
+        # 값이 None인 레이블은 빠짐
+        f'{PREFIX}rows_written_total{{market="crypto"}}': '150'
+    }
+
+
+def test_histograms_have_cumulative_buckets_sum_and_count(metrics):
+    for value in (0.05, 0.5, 0.5, 5, 50):
+        metrics.observe('provider_request_seconds', value, provider='yahoo')
+
+    text = metrics.to_prometheus()
+
+    assert f'# TYPE {PREFIX}provider_request_seconds histogram' in text.splitlines()
+    name = f'{PREFIX}provider_request_seconds'
+    assert samples(text) == {
+        f'{name}_bucket{{provider="yahoo",le="0.1"}}': '1',
+        f'{name}_bucket{{provider="yahoo",le="1"}}': '3',
+        f'{name}_bucket{{provider="yahoo",le="10"}}': '4',
+        f'{name}_bucket{{provider="yahoo",le="+Inf"}}': '5',
+        f'{name}_sum{{provider="yahoo"}}': '56.05',
+        f'{name}_count{{provider="yahoo"}}': '5'
+    }
+
+
+def test_label_values_are_escaped(metrics):
+    metrics.inc('stage_errors_total', stage='say "hi"\\\nbye')
+
+    assert f'{PREFIX}stage_errors_total{{stage="say \\"hi\\"\\\\\\nbye"}} 1' in metrics.to_prometheus()
+
+
+def test_totals_and_quantiles_merge_matching_series(metrics):
+    metrics.inc('http_requests_total', 3, host='a', market='crypto')
+    metrics.inc('http_requests_total', 4, host='b', market='crypto')
+    metrics.inc('http_requests_total', 5, host='b', market='korea')
+    for value in (0.2, 0.4, 0.6, 0.8):
+        metrics.observe('stage_seconds', value, stage='fetch', market='crypto')
+    metrics.observe('stage_seconds', 8, stage='fetch', market='korea')
+
+    assert metrics.total('http_requests_total') == 12
+    assert metrics.total('http_requests_total', host='b') == 9
+    assert metrics.quantile('stage_seconds', 0.5, market='crypto') == pytest.approx(0.55)
+    # 분위수는 관측한 최댓값을 넘지 않음
+    assert metrics.quantile('stage_seconds', 1, stage='fetch') == 8
+    assert math.isnan(metrics.quantile('stage_seconds', 0.5, market='us'))
+
+
+def test_stage_records_duration_and_errors(metrics):
+    with metrics.stage('commit', market='crypto'):
+        pass
+    with pytest.raises(ValueError):
+        with metrics.stage('commit', market='crypto'):
+            raise ValueError('bad frame')
+
+    summary = metrics.summary()
+    assert summary['histograms']['stage_seconds'][0]['count'] == 2
+    assert summary['counters']['stage_errors_total'] == [{'labels': {'market': 'crypto', 'stage': 'commit'}, 'value': 1}]
+
+    metrics.reset()
+    assert metrics.to_prometheus() == '\n'
+    assert metrics.summary() == {'counters': {}, 'histograms': {}}
+
+
+def test_files_are_replaced_atomically(tmp_path, metrics):
+    metrics.inc('bytes_written_total', 2048)
+    path = tmp_path / 'run_summary.json'
+
+    _write_atomic(path, json.dumps(metrics.summary()))
+
+    assert json.loads(path.read_text(encoding='utf-8'))['counters']['bytes_written_total'][0]['value'] == 2048
+    assert [p.name for p in tmp_path.iterdir()] == ['run_summary.json']
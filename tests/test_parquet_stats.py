@@ -0,0 +1,90 @@
+import math
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from fetch_modules.parquet_stats import ColumnStats, DatasetStats, file_stats, table_stats
+from fetch_modules.storage import ParquetStore
+
+
+def stats_of(values):
+    stats = ColumnStats()
+    stats.add_array(pa.array(values, type=pa.float64()))
+    return stats
+
+
+def assert_matches_pandas(stats, values):
+    series = pd.Series(values, dtype='float64')
+    result = stats.to_dict()
+    assert result['min'] == series.min()
+    assert result['max'] == series.max()
+    assert result['mean'] == pytest.approx(series.mean())
+    assert result['std'] == pytest.approx(series.std())
+    assert result['null_count'] == series.isna().sum()
+
+
+def test_merge_matches_statistics_of_all_values():
+    rng = np.random.default_rng(0)
+    parts = [list(rng.normal(100, 5, size)) for size in (1, 7, 250)]
+    parts[1][3] = None
+    parts[2][10] = math.nan
+
+    merged = ColumnStats()
+    for part in parts:
+        merged.merge(stats_of(part))
+
+    assert_matches_pandas(merged, [value for part in parts for value in part])
+    assert merged.nulls == 2
+
+
+def test_merge_is_order_independent():
+    a, b = stats_of([1.0, 2.0, 3.0]), stats_of([10.0, 20.0])
+    forward, backward = ColumnStats(), ColumnStats()
+    forward.merge(a)
+    forward.merge(b)
+    backward.merge(b)
+    backward.merge(a)
+
+    assert forward.to_dict() == pytest.approx(backward.to_dict())
+
+
+def test_merge_with_empty_stats():
+    stats = stats_of([4.0, 6.0])
+    stats.merge(ColumnStats())
+    stats.merge(stats_of([None, None]))
+
+    assert stats.count == 2
+    assert stats.nulls == 2
+    assert stats.mean == 5.0
+    assert math.isnan(ColumnStats().to_dict()['mean'])
+
+
+def test_state_round_trip():
+    stats = stats_of([1.0, None, 4.0])
+
+    restored = ColumnStats.from_state(stats.to_state())
+
+    assert restored.to_dict() == stats.to_dict()
+
+
+def test_file_stats_match_in_memory_stats(tmp_path):
+    store = ParquetStore(root=tmp_path)
+    df = pd.DataFrame({
+        'date': pd.date_range('2024-01-01', periods=50, freq='D', tz='UTC'),
+        'symbol': 'BTC',
+        'close': np.linspace(1, 50, 50),
+        'volume': np.arange(50, dtype=float)
+    })
+    [path] = store.append('crypto', df)
+
+    from_file = file_stats(path, 'symbol')
+    in_memory = table_stats(store.load('crypto'), 'symbol')
+
+    merged = DatasetStats('symbol')
+    merged.merge(from_file)
+    assert merged.rows == 50
+    for name in ('close', 'volume'):
+        assert merged.columns[name].to_dict() == pytest.approx(in_memory.columns[name].to_dict())
+        assert_matches_pandas(merged.columns[name], df[name])
@@ -0,0 +1,127 @@
+import logging
+import os
+import threading
+import time
+
+import pytest
+
+from fetch_modules import pipeline
+
+
+def square(item):
+    # 먼저 받은 항목이 늦게 끝나도 저장은 받은 순서대로
+    time.sleep(0.05 if item % 2 == 0 else 0)
+    return item * item
+
+
+def fail_on_three(item):
+    if item == 3:
+        raise ValueError('bad item')
+    return item
+
+
+def describe_worker(item):
+    logging.getLogger('pipeline_test_worker').error(f'converted {item}')
+    return os.getpid(), threading.current_thread().name, [type(handler).__name__ for handler in logging.getLogger().handlers]
+
+
+@pytest.fixture
+def threads(monkeypatch):
+    """PIPELINE_PROCESSES=0: 변환을 스레드에서 실행"""
+    monkeypatch.setattr(pipeline, 'PIPELINE_PROCESSES', 0)
+    monkeypatch.setattr(pipeline, '_pool', None)
+
+
+@pytest.fixture
+def processes(monkeypatch):
+    monkeypatch.setattr(pipeline, 'PIPELINE_PROCESSES', 2)
+    monkeypatch.setattr(pipeline, '_pool', None)
+    yield
+    if pipeline._pool is not None:
+        pipeline._pool.shutdown(wait=True)
+
+
+def run(source, transform, queue_size=2):
+    committed = []
+    count = pipeline.run(source, transform, committed.append, 'test', queue_size=queue_size)
+    assert count == len(committed)
+    return committed
+
+
+def test_without_processes_transform_runs_in_a_thread(threads):
+    assert pipeline.get_process_pool() is None
+
+    results = run(range(3), describe_worker)
+
+    assert {(pid, name.split('_')[0]) for pid, name, _ in results} == {(os.getpid(), 'transform-test')}
+
+
+def test_results_are_committed_in_source_order(threads):
+    assert run(range(8), square) == [item * item for item in range(8)]
+
+
+def test_source_waits_while_the_queue_is_full(threads):
+    produced = []
+    release = threading.Event()
+
+    def source():
+        for item in range(10):
+            produced.append(item)
+            yield item
+
+    committed = []
+
+    def commit(result):
+        # 첫 항목을 저장하는 동안 받기 단계가 얼마나 앞서가는지 확인
+        if not committed:
+            release.wait(5)
+        committed.append(result)
+
+    thread = threading.Thread(target=pipeline.run, args=(source(), square, commit, 'test'), kwargs={'queue_size': 2})
+    thread.start()
+    time.sleep(0.3)
+    # 저장 중인 1개 + 대기열 2개 + 넣으려고 기다리는 1개
+    assert len(produced) <= 4
+    release.set()
+    thread.join()
+
+    assert committed == [item * item for item in range(10)]
+
+
+def test_transform_error_is_raised_after_earlier_results(threads):
+    committed = []
+
+    with pytest.raises(ValueError, match='bad item'):
+        pipeline.run(range(6), fail_on_three, committed.append, 'test')
+
+    assert committed == [0, 1, 2]
+
+
+def test_source_error_is_raised_after_received_items_are_committed(threads):
+    def source():
+        yield from range(3)
+        raise ConnectionError('connection lost')
+
+    committed = []
+
+    with pytest.raises(ConnectionError):
+        pipeline.run(source(), square, committed.append, 'test')
+
+    assert committed == [0, 1, 4]
+
+
+def test_process_pool_keeps_order_and_sends_worker_logs_to_parent(processes, caplog):
+    assert run(range(6), square) == [item * item for item in range(6)]
+
+    with caplog.at_level(logging.ERROR, logger='pipeline_test_worker'):
+        results = run(range(4), describe_worker)
+        # 작업 프로세스의 로그는 리스너 스레드가 넘겨주므로 잠시 기다림
+        deadline = time.monotonic() + 10
+        while len([r for r in caplog.records if r.name == 'pipeline_test_worker']) < 4 and time.monotonic() < deadline:
+            time.sleep(0.05)
+
+    assert all(pid != os.getpid() for pid, _, _ in results)
+    # 작업 프로세스는 error_log.txt 파일 핸들러 없이 큐로만 기록
+    assert {tuple(handlers) for _, _, handlers in results} == {('QueueHandler',)}
+    messages = sorted(r.getMessage() for r in caplog.records if r.name == 'pipeline_test_worker')
+    assert messages == [f'converted {item}' for item in range(4)]
@@ -0,0 +1,47 @@
+from fetch_modules import rate_limiter
+from fetch_modules.rate_limiter import TokenBucket
+
+
+def test_acquire_within_capacity_does_not_wait(monkeypatch, clock):
+    monkeypatch.setattr(rate_limiter, 'time', clock)
+    bucket = TokenBucket(capacity=5, window=1.0)
+
+    assert [bucket.acquire() for _ in range(5)] == [0.0] * 5
+    assert clock.slept == []
+
+
+def test_acquire_waits_only_for_missing_tokens(monkeypatch, clock):
+    monkeypatch.setattr(rate_limiter, 'time', clock)
+    bucket = TokenBucket(capacity=10, window=10.0)  # 초당 1개
+    bucket.acquire(10)
+
+    waited = bucket.acquire(3)
+
+    assert waited == 3.0
+    assert clock.slept == [3.0]
+
+
+def test_tokens_refill_but_not_beyond_capacity(monkeypatch, clock):
+    monkeypatch.setattr(rate_limiter, 'time', clock)
+    bucket = TokenBucket(capacity=4, window=2.0)
+    bucket.acquire(4)
+
+    clock.now += 100
+    assert bucket.acquire(4) == 0.0
+    assert bucket.acquire(1) == 0.5
+
+
+def test_weight_larger_than_capacity_is_capped(monkeypatch, clock):
+    monkeypatch.setattr(rate_limiter, 'time', clock)
+    bucket = TokenBucket(capacity=2, window=1.0)
+
+    assert bucket.acquire(50) == 0.0
+
+
+def test_penalize_blocks_new_requests(monkeypatch, clock):
+    monkeypatch.setattr(rate_limiter, 'time', clock)
+    bucket = TokenBucket(capacity=5, window=1.0)
+
+    bucket.penalize(7)
+
+    assert bucket.acquire() == 7.0
@@ -0,0 +1,106 @@
+import pandas as pd
+import pytest
+
+from fetch_modules import resample, resume_tracker
+from fetch_modules.config import config
+from fetch_modules.storage import ParquetStore
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = ParquetStore(root=tmp_path)
+    monkeypatch.setattr(resample, 'get_store', lambda: store)
+    return store
+
+
+@pytest.fixture
+def saved(monkeypatch):
+    saved = []
+    monkeypatch.setattr(resume_tracker, 'save_market', lambda market, section: saved.append((market, dict(section))))
+    return saved
+
+
+def daily(symbol, dates, timezone):
+    return pd.DataFrame({
+        'date': pd.to_datetime(dates).tz_localize(timezone),
+        'symbol': symbol,
+        'close': [float(index) for index in range(len(dates))]
+    })
+
+
+def test_rebase_moves_data_to_rollup_and_resets_watermarks(store, saved):
+    store.append('stocks', daily('SPY', ['2024-01-02', '2024-01-03'], 'America/New_York'))
+    store.append('stocks', daily('7203.T', ['2024-01-04'], 'Asia/Tokyo'))
+    section = {
+        'interval': '1d',
+        'last_fetch_date': '2024-01-03',
+        'watermarks': {
+            'SPY': {'first': '2024-01-02', 'last': '2024-01-03T05:00:00'},
+            '7203.T': {'first': '2024-01-04', 'last': '2024-01-03T15:00:00'}
+        }
+    }
+
+    resample._rebase('stocks', section, '1h')
+
+    assert not store.exists('stocks')
+    moved = store.read('stocks@1d')
+    assert sorted(moved['symbol'].unique()) == ['7203.T', 'SPY']
+    assert len(moved) == 3
+    assert store.timezone('stocks@1d', 'SPY') == 'America/New_York'
+    assert store.timezone('stocks@1d', '7203.T') == 'Asia/Tokyo'
+
+    assert section['interval'] == '1h'
+    assert section['watermarks'] == {}
+    assert section['last_fetch_date'] is None
+    assert section['rollups'] == {'1d': {'SPY': '2024-01-03T05:00:00', '7203.T': '2024-01-03T15:00:00'}}
+    assert saved[-1][0] == 'stocks'
+
+
+def test_rebase_without_stored_data_only_updates_section(store, saved):
+    section = {'interval': '1d', 'watermarks': {}}
+
+    resample._rebase('crypto', section, '1m')
+
+    assert section['interval'] == '1m'
+    assert section['rollups'] == {'1d': {}}
+    assert not store.exists('crypto@1d')
+
+
+def test_collection_interval_keeps_base_for_coarser_requests(store, saved, monkeypatch):
+    monkeypatch.setattr(config, 'interval', '1w')
+    section = {'interval': '1d', 'watermarks': {}}
+
+    assert resample.collection_interval('stocks', section) == '1d'
+    assert saved == []
+
+
+def test_collection_interval_rebases_for_finer_requests(store, saved, monkeypatch):
+    monkeypatch.setattr(config, 'interval', '1h')
+    section = {'interval': '1d', 'watermarks': {}}
+
+    assert resample.collection_interval('stocks', section) == '1h'
+    assert section['interval'] == '1h'
+
+
+def test_resample_ohlcv():
+    df = pd.DataFrame({
+        'date': pd.date_range('2024-01-01', periods=4, freq='12h', tz='UTC'),
+        'symbol': 'BTC',
+        'open': [1.0, 2.0, 3.0, 4.0],
+        'high': [5.0, 6.0, 7.0, 8.0],
+        'low': [0.5, 0.4, 0.3, 0.2],
+        'close': [1.5, 2.5, 3.5, 4.5],
+        'volume': [10.0, 20.0, 30.0, 40.0]
+    })
+
+    rolled = resample.resample_ohlcv(df, 'symbol', '1d')
+
+    assert rolled.to_dict('list') == {
+        'date': list(pd.to_datetime(['2024-01-01', '2024-01-02']).tz_localize('UTC')),
+        'symbol': ['BTC', 'BTC'],
+        'open': [1.0, 3.0],
+        'high': [6.0, 8.0],
+        'low': [0.4, 0.2],
+        'close': [2.5, 4.5],
+        'volume': [30.0, 70.0]
+    }
@@ -0,0 +1,88 @@
+import os
+import time
+
+import pandas as pd
+import pytest
+
+from fetch_modules import response_cache
+from fetch_modules.response_cache import ResponseCache
+
+
+@pytest.fixture
+def clock(clock, monkeypatch):
+    # 만료와 LRU는 time.time()과 파일 시각으로 계산하므로 실제 시각보다 앞에서 시작해 직접 옮김
+    # (시계에 맞추지 않은 새 파일이 가장 최근에 쓴 항목이 되도록)
+    clock.now = time.time() - 3600
+    clock.time = lambda: clock.now
+    monkeypatch.setattr(response_cache, 'time', clock)
+    return clock
+
+
+@pytest.fixture
+def cache(tmp_path, clock):
+    return ResponseCache(root=tmp_path, max_bytes=10_000, open_ttl=60)
+
+
+def test_closed_entries_never_expire(cache, clock):
+    cache.put_json('binance', 'klines', {'start': 1}, [[1, '2.0']], closed=True)
+    clock.now += 365 * 24 * 3600
+
+    assert cache.get_json('binance', 'klines', {'start': 1}) == [[1, '2.0']]
+
+
+def test_open_entries_expire_after_ttl(cache, clock):
+    cache.put_json('binance', 'klines', {'start': 2}, [[2, '3.0']], closed=False)
+    # 만료는 파일을 쓴 시각 기준
+    path = next(cache.root.glob('*/*.open.json'))
+    os.utime(path, (clock.now, clock.now))
+
+    clock.now += 30
+    assert cache.get_json('binance', 'klines', {'start': 2}) == [[2, '3.0']]
+    clock.now += 31
+    assert cache.get_json('binance', 'klines', {'start': 2}) is None
+
+
+def test_keys_are_content_addressed(cache):
+    cache.put_json('fred', 'series', {'a': 1, 'b': 2}, {'value': 1}, closed=True)
+
+    # 파라미터 순서는 키에 영향이 없고, 값·엔드포인트·제공자가 다르면 다른 항목
+    assert cache.get_json('fred', 'series', {'b': 2, 'a': 1}) == {'value': 1}
+    assert cache.get_json('fred', 'series', {'a': 1, 'b': 3}) is None
+    assert cache.get_json('fred', 'other', {'a': 1, 'b': 2}) is None
+    assert cache.get_json('yahoo', 'series', {'a': 1, 'b': 2}) is None
+    assert (cache.hits, cache.misses) == (1, 3)
+
+
+def test_least_recently_used_entries_are_evicted(cache, clock):
+    payload = 'x' * 2800
+    for index in range(3):
+        cache.put_json('yahoo', 'download', {'index': index}, payload, closed=True)
+        # 쓰기 시각을 시계에 맞춤 (파일 시스템의 시각 단위와 무관하게 순서가 정해지도록)
+        path = cache._paths(cache._key('yahoo', 'download', {'index': index}), 'json')[0]
+        os.utime(path, (clock.now, clock.now))
+        clock.now += 10
+    # 0번을 다시 읽어서 1번이 가장 오래 사용하지 않은 항목이 됨
+    assert cache.get_json('yahoo', 'download', {'index': 0}) == payload
+    clock.now += 10
+
+    cache.put_json('yahoo', 'download', {'index': 3}, payload, closed=True)
+
+    assert cache.get_json('yahoo', 'download', {'index': 1}) is None
+    assert all(cache.get_json('yahoo', 'download', {'index': index}) == payload for index in (0, 2, 3))
+
+
+def test_frames_round_trip_with_index(cache):
+    df = pd.DataFrame({'value': [1.5, 2.5]}, index=pd.to_datetime(['2024-01-02', '2024-01-03']))
+
+    cache.put_frame('fred', 'series/observations', {'series': 'DGS10'}, df, closed=True)
+
+    pd.testing.assert_frame_equal(cache.get_frame('fred', 'series/observations', {'series': 'DGS10'}), df)
+
+
+def test_disabled_cache_stores_nothing(tmp_path):
+    cache = ResponseCache(root=tmp_path, enabled=False)
+
+    cache.put_json('binance', 'klines', {'start': 1}, [], closed=True)
+
+    assert cache.get_json('binance', 'klines', {'start': 1}) is None
+    assert not any(tmp_path.iterdir())
@@ -0,0 +1,68 @@
+import pandas as pd
+
+from fetch_modules import resume_tracker
+
+
+def section(**watermarks):
+    return {'watermarks': watermarks}
+
+
+def test_new_symbol_requests_full_range():
+    requests = resume_tracker.plan_requests(section(), ['AAPL'], '2024-01-01', '2024-02-01')
+
+    assert requests == [('AAPL', '2024-01-01', '2024-02-01')]
+
+
+def test_known_symbol_resumes_from_last_stored_bar():
+    tracked = section(AAPL={'first': '2024-01-01', 'last': '2024-01-20T14:30:00'})
+
+    requests = resume_tracker.plan_requests(tracked, ['AAPL'], '2024-01-01', '2024-02-01')
+
+    # 마지막 봉은 미완성일 수 있으므로 그 날부터 다시 요청
+    assert requests == [('AAPL', '2024-01-20', '2024-02-01')]
+
+
+def test_up_to_date_symbol_is_skipped():
+    tracked = section(AAPL={'first': '2024-01-01', 'last': '2024-02-01T00:00:00'})
+
+    assert resume_tracker.plan_requests(tracked, ['AAPL'], '2024-01-01', '2024-02-01') == []
+
+
+def test_earlier_start_than_collected_requests_full_range():
+    tracked = section(AAPL={'first': '2024-01-10', 'last': '2024-01-20T00:00:00'})
+
+    requests = resume_tracker.plan_requests(tracked, ['AAPL'], '2024-01-01', '2024-02-01')
+
+    assert requests == [('AAPL', '2024-01-01', '2024-02-01')]
+
+
+def test_symbols_are_planned_independently():
+    tracked = section(
+        AAPL={'first': '2024-01-01', 'last': '2024-02-01T00:00:00'},
+        MSFT={'first': '2024-01-01', 'last': '2024-01-15T00:00:00'},
+        BROKEN={'last': '2024-01-15T00:00:00'}
+    )
+
+    requests = resume_tracker.plan_requests(tracked, ['AAPL', 'MSFT', 'BROKEN', 'NEW'], '2024-01-01', '2024-02-01')
+
+    assert requests == [
+        ('MSFT', '2024-01-15', '2024-02-01'),
+        ('BROKEN', '2024-01-01', '2024-02-01'),
+        ('NEW', '2024-01-01', '2024-02-01')
+    ]
+
+
+def test_update_watermark_bounds_extends_and_tracks_slowest_symbol():
+    tracked = section(AAPL={'first': '2024-01-01', 'last': '2024-01-20T00:00:00'})
+    bounds = [
+        ('AAPL', pd.Timestamp('2024-01-20', tz='America/New_York'), pd.Timestamp('2024-01-31 16:00', tz='America/New_York')),
+        ('MSFT', pd.Timestamp('2024-01-05', tz='UTC'), pd.Timestamp('2024-01-25', tz='UTC'))
+    ]
+
+    resume_tracker.update_watermark_bounds(tracked, bounds, {'AAPL': '2024-01-20', 'MSFT': '2024-01-01'})
+
+    assert tracked['watermarks'] == {
+        'AAPL': {'first': '2024-01-01', 'last': '2024-01-31T21:00:00'},
+        'MSFT': {'first': '2024-01-01', 'last': '2024-01-25T00:00:00'}
+    }
+    assert tracked['last_fetch_date'] == '2024-01-25'
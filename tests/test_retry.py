@@ -0,0 +1,120 @@
+import pytest
+import requests
+
+from fetch_modules import rate_limiter, retry
+from fetch_modules.retry import CircuitBreaker, CircuitOpenError, ProviderError
+
+
+def http_error(status, headers=None):
+    response = requests.Response()
+    response.status_code = status
+    response.headers.update(headers or {})
+    return requests.HTTPError(f'{status} error', response=response)
+
+
+@pytest.mark.parametrize('error, kind', [
+    (http_error(429), 'rate_limit'),
+    (http_error(418), 'rate_limit'),
+    (http_error(503), 'transient'),
+    (http_error(404), 'fatal'),
+    (requests.ConnectionError('reset by peer'), 'transient'),
+    (TimeoutError(), 'transient'),
+    (ValueError('Too Many Requests. Rate limited.'), 'rate_limit'),
+    (ValueError('Read timed out.'), 'transient'),
+    (KeyError('chart'), 'fatal'),
+    (ProviderError('anything', 'transient'), 'transient')
+])
+def test_classify(error, kind):
+    assert retry.classify(error) == kind
+
+
+def test_classify_message():
+    assert retry.classify_message("YFRateLimitError('Too Many Requests')") == 'rate_limit'
+    assert retry.classify_message('503 Server Error: Service Unavailable') == 'transient'
+    assert retry.classify_message('possibly delisted; no price data found') == 'fatal'
+
+
+def test_retry_after_header():
+    assert retry._retry_after(http_error(429, {'Retry-After': '12'})) == 12.0
+    assert retry._retry_after(http_error(429)) is None
+
+
+def test_breaker_opens_after_threshold_and_probes_once(monkeypatch, clock):
+    monkeypatch.setattr(retry, 'time', clock)
+    breaker = CircuitBreaker('test', failure_threshold=2, reset_timeout=30)
+
+    breaker.record_failure()
+    assert breaker.state == 'closed'
+    breaker.record_failure()
+    assert breaker.state == 'open'
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    clock.now += 30
+    assert breaker.state == 'half-open'
+    breaker.before_call()
+    # 시험 호출 중에는 다른 호출을 막음
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    breaker.record_success()
+    assert breaker.state == 'closed'
+
+
+def test_failed_probe_reopens(monkeypatch, clock):
+    monkeypatch.setattr(retry, 'time', clock)
+    breaker = CircuitBreaker('test', failure_threshold=1, reset_timeout=10)
+    breaker.record_failure()
+    clock.now += 10
+    breaker.before_call()
+
+    breaker.record_failure()
+
+    assert breaker.state == 'open'
+
+
+@pytest.fixture
+def isolated(monkeypatch, clock):
+    monkeypatch.setattr(retry, 'time', clock)
+    monkeypatch.setattr(rate_limiter, 'time', clock)
+    monkeypatch.setattr(retry, '_breakers', {})
+    monkeypatch.setattr(rate_limiter, '_limiters', {})
+    return clock
+
+
+def test_call_retries_transient_errors(isolated):
+    attempts = []
+
+    def request():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise http_error(503)
+        return 'ok'
+
+    assert retry.call('test', request, max_attempts=4) == 'ok'
+    assert len(attempts) == 3
+
+
+def test_call_does_not_retry_fatal_errors(isolated):
+    attempts = []
+
+    def request():
+        attempts.append(1)
+        raise http_error(404)
+
+    with pytest.raises(requests.HTTPError):
+        retry.call('test', request, max_attempts=4)
+    assert len(attempts) == 1
+    assert retry.get_circuit_breaker('test').state == 'closed'
+
+
+def test_call_gives_up_after_max_attempts(isolated):
+    attempts = []
+
+    def request():
+        attempts.append(1)
+        raise ProviderError('timed out', 'transient')
+
+    with pytest.raises(ProviderError):
+        retry.call('test', request, max_attempts=3)
+    assert len(attempts) == 3
@@ -0,0 +1,73 @@
+import json
+import logging
+
+from fetch_modules import run_log
+from fetch_modules.config import RUN_EVENTS_FILE
+
+
+def events_of(run):
+    with open(RUN_EVENTS_FILE, 'r', encoding='utf-8') as f:
+        return [event for event in map(json.loads, f) if event['run_id'] == run.run_id]
+
+
+def test_events_are_written_as_json_lines():
+    run = run_log.start_run(markets=['crypto', 'korea'], interval='1d')
+    run.market_started('crypto')
+    run.market_finished('crypto', True)
+    run.market_started('korea')
+    run.market_finished('korea', False, error=ConnectionError('timeout'))
+    summary = run.finish()
+
+    events = events_of(run)
+    assert [event['event'] for event in events] == [
+        'run_started', 'market_started', 'market_finished', 'market_started', 'market_finished', 'run_finished'
+    ]
+    # 파일에 쓴 이벤트와 메모리의 이벤트가 같음
+    assert events == run.events
+    assert events[0]['markets'] == ['crypto', 'korea']
+    assert events[-1]['failed'] == ['korea']
+    assert events[4]['error'] == 'timeout'
+    assert (summary['succeeded'], summary['failed'], summary['status']) == (['crypto'], ['korea'], 'failed')
+
+
+def test_warnings_and_errors_from_any_logger_are_captured_during_the_run():
+    logger = logging.getLogger('run_log_test')
+    run = run_log.start_run()
+    logger.info('not captured')
+    logger.warning('slow response')
+    logger.error('request failed')
+    summary = run.finish()
+    logger.error('after the run')
+
+    assert [event['message'] for event in run.warnings()] == ['slow response']
+    assert [(event['logger'], event['message']) for event in run.errors()] == [('run_log_test', 'request failed')]
+    assert (summary['warnings'], summary['errors']) == (1, 1)
+    assert run._handler not in logging.getLogger().handlers
+
+
+def test_finished_run_is_added_to_the_index():
+    run = run_log.start_run(interval='1h')
+    summary = run.finish()
+
+    assert run_log.load_index()[-1] == summary
+    assert summary['interval'] == '1h' and summary['status'] == 'ok'
+
+
+def test_index_keeps_only_the_latest_runs(tmp_path):
+    index_file = tmp_path / 'run_index.json'
+    assert run_log.load_index(index_file) == []
+
+    for index in range(5):
+        run_log._append_index({'run_id': str(index)}, index_file=index_file, limit=3)
+
+    assert [run['run_id'] for run in run_log.load_index(index_file)] == ['2', '3', '4']
+    assert not index_file.with_suffix('.json.tmp').exists()
+
+
+def test_broken_index_is_replaced(tmp_path):
+    index_file = tmp_path / 'run_index.json'
+    index_file.write_text('{not json', encoding='utf-8')
+
+    run_log._append_index({'run_id': 'a'}, index_file=index_file)
+
+    assert run_log.load_index(index_file) == [{'run_id': 'a'}]
@@ -0,0 +1,24 @@
+import pytest
+
+from fetch_modules import scheduler
+
+
+def test_parse_schedule():
+    schedule = scheduler.parse_schedule(' crypto=1M, bonds = 1D ,stocks=2h,real_estate=1MO,')
+
+    assert schedule == {'crypto': 60.0, 'bonds': 86400.0, 'stocks': 7200.0, 'real_estate': 2592000.0}
+
+
+def test_parse_schedule_empty():
+    assert scheduler.parse_schedule('') == {}
+
+
+@pytest.mark.parametrize('period, seconds', [('30s', 30), ('1.5H', 5400), ('1w', 604800), ('1Y', 31536000)])
+def test_parse_period(period, seconds):
+    assert scheduler.parse_period(period) == seconds
+
+
+@pytest.mark.parametrize('schedule', ['crypto', 'crypto=', 'crypto=0M', 'crypto=5X', 'crypto=-1D'])
+def test_parse_schedule_rejects_invalid_entries(schedule):
+    with pytest.raises(ValueError):
+        scheduler.parse_schedule(schedule)
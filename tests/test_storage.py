@@ -0,0 +1,194 @@
+import threading
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from fetch_modules.storage import BASE_FILE, DATE_TYPE, DELTA_PREFIX, TIMEZONE_KEY, ParquetStore
+
+
+def frame(symbol, dates, close, timezone='UTC'):
+    return pd.DataFrame({
+        'date': pd.to_datetime(dates).tz_localize(timezone),
+        'symbol': symbol,
+        'close': [float(value) for value in close]
+    })
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ParquetStore(root=tmp_path, compact_threshold=100)
+
+
+def closes(df):
+    return {(row.symbol, row.date.strftime('%Y-%m-%d')): row.close for row in df.itertuples()}
+
+
+def test_later_delta_wins_on_load(store):
+    store.append('crypto', frame('BTC', ['2024-01-01', '2024-01-02'], [1, 2]))
+    store.append('crypto', frame('BTC', ['2024-01-02', '2024-01-03'], [20, 30]))
+
+    df = store.read('crypto')
+
+    assert closes(df) == {('BTC', '2024-01-01'): 1, ('BTC', '2024-01-02'): 20, ('BTC', '2024-01-03'): 30}
+    assert list(df['date']) == sorted(df['date'])
+    assert str(df['date'].dt.tz) == 'UTC'
+
+
+def test_commit_of_encoded_parts_matches_append(store):
+    df = frame('ETH', ['2024-03-01', '2024-03-02'], [5, 6])
+
+    store.commit('crypto', store.encode('crypto', df))
+
+    assert closes(store.read('crypto')) == closes(df)
+
+
+def test_to_batch_uses_market_schema(store):
+    df = frame('SPY', ['2024-01-03', '2024-01-02'], [2, 1], timezone='America/New_York').assign(volume=[20, 10])
+
+    batch = store.to_batch('stocks', df)
+
+    assert batch.schema.names == ['date', 'symbol', 'close', 'volume']
+    assert batch.schema.field('date').type == DATE_TYPE
+    assert pa.types.is_dictionary(batch.schema.field('symbol').type)
+    assert batch.schema.field('volume').type == pa.int64()
+    assert batch.schema.metadata[TIMEZONE_KEY] == b'America/New_York'
+    # 종목·날짜 순으로 정렬
+    assert batch.column('close').to_pylist() == [1.0, 2.0]
+
+
+def test_encode_batch_splits_by_symbol_and_local_year(store):
+    df = pd.concat([frame('BTC', ['2023-12-31', '2024-01-01'], [1, 2]), frame('ETH', ['2024-01-01'], [3])])
+
+    parts = store.encode_batch('crypto', store.to_batch('crypto', df))
+
+    assert [(symbol, year, rows) for symbol, year, rows, _, _, _ in parts] == [
+        ('BTC', 2023, 1), ('BTC', 2024, 1), ('ETH', 2024, 1)
+    ]
+    # 파티션 파일의 사전에는 해당 종목만 남음
+    eth = pq.read_table(pa.BufferReader(parts[2][5]))
+    assert eth['symbol'].combine_chunks().dictionary.to_pylist() == ['ETH']
+    assert parts[2][3] == parts[2][4] == pd.Timestamp('2024-01-01', tz='UTC')
+
+
+def test_write_batches_commits_each_batch(store):
+    batches = [
+        store.to_batch('crypto', frame('BTC', ['2024-01-01', '2024-01-02'], [1, 2])),
+        store.to_batch('crypto', frame('BTC', [], [])),
+        store.to_batch('crypto', frame('BTC', ['2024-01-02', '2024-01-03'], [20, 30])),
+        store.to_batch('crypto', frame('ETH', ['2024-01-01'], [4]))
+    ]
+
+    assert store.write_batches('crypto', iter(batches)) == 5
+
+    # 빈 배치는 파일을 만들지 않고, 겹치는 날짜는 나중 배치가 남음
+    [btc, eth] = store.partitions('crypto')
+    assert len(store.partition_files(btc)) == 2 and len(store.partition_files(eth)) == 1
+    df = store.read('crypto')
+    assert closes(df) == {
+        ('BTC', '2024-01-01'): 1, ('BTC', '2024-01-02'): 20, ('BTC', '2024-01-03'): 30, ('ETH', '2024-01-01'): 4
+    }
+    table = store.load('crypto')
+    assert table.schema.field('date').type == DATE_TYPE
+    assert table.schema.field('close').type == pa.float64()
+
+
+def test_compact_merges_deltas_into_base_and_keeps_latest(store):
+    store.append('crypto', frame('BTC', ['2024-01-01', '2024-01-02'], [1, 2]))
+    store.append('crypto', frame('BTC', ['2024-01-02'], [22]))
+    store.append('crypto', frame('BTC', ['2024-01-01'], [11]))
+    before = closes(store.read('crypto'))
+
+    store.compact('crypto')
+
+    [partition] = store.partitions('crypto')
+    assert [path.name for path in store.partition_files(partition)] == [BASE_FILE]
+    assert closes(store.read('crypto')) == before == {('BTC', '2024-01-01'): 11, ('BTC', '2024-01-02'): 22}
+
+
+def test_delta_after_compaction_overrides_base(store):
+    store.append('crypto', frame('BTC', ['2024-01-01'], [1]))
+    store.compact('crypto')
+    store.append('crypto', frame('BTC', ['2024-01-01'], [2]))
+
+    assert closes(store.read('crypto')) == {('BTC', '2024-01-01'): 2}
+
+
+def test_compaction_starts_at_threshold(tmp_path):
+    store = ParquetStore(root=tmp_path, compact_threshold=3)
+    for day in range(1, 4):
+        store.append('crypto', frame('BTC', [f'2024-01-0{day}'], [day]))
+    store.wait_for_compaction()
+
+    [partition] = store.partitions('crypto')
+    assert not list(partition.glob(f'{DELTA_PREFIX}*.parquet'))
+    assert len(store.read('crypto')) == 3
+
+
+def test_reads_during_background_compaction_see_every_row(tmp_path):
+    store = ParquetStore(root=tmp_path, compact_threshold=2)
+    dates = pd.date_range('2024-01-01', periods=400, freq='h')
+    done = threading.Event()
+    errors, counts = [], []
+
+    def reader():
+        while not done.is_set():
+            try:
+                counts.append(len(store.read('crypto', symbols=['BTC'])))
+            except Exception as e:
+                errors.append(e)
+
+    thread = threading.Thread(target=reader)
+    thread.start()
+    try:
+        for index, date in enumerate(dates):
+            store.append('crypto', frame('BTC', [date], [index]))
+    finally:
+        done.set()
+        thread.join()
+    store.wait_for_compaction()
+
+    assert errors == []
+    # 병합 중에도 이미 기록한 행이 사라지지 않음
+    assert counts == sorted(counts)
+    assert len(store.read('crypto', symbols=['BTC'])) == 400
+
+
+def test_partitions_by_local_year_and_keeps_timezone(store):
+    # 뉴욕 12월 31일 저녁은 UTC로 다음 해
+    store.append('stocks', frame('SPY', ['2023-12-31 20:00'], [1], timezone='America/New_York'))
+    store.compact('stocks')
+
+    assert [path.name for path in store.partitions('stocks')] == ['2023']
+    assert store.timezone('stocks', 'SPY') == 'America/New_York'
+    assert store.read('stocks')['date'].iloc[0] == pd.Timestamp('2024-01-01 01:00', tz='UTC')
+
+
+def test_partitions_by_symbol_and_year(store):
+    store.append('crypto', frame('BTC', ['2023-12-31', '2024-01-01'], [1, 2]))
+    store.append('crypto', frame('ETH/USD', ['2024-01-01'], [3]))
+
+    assert [(path.parent.name, path.name) for path in store.partitions('crypto')] == [
+        ('BTC', '2023'), ('BTC', '2024'), ('ETH%2FUSD', '2024')
+    ]
+
+
+def test_legacy_file_is_migrated(store):
+    legacy = frame('BTC', ['2024-01-01', '2024-01-02'], [1, 2]).rename(columns={'date': 'Date'})
+    legacy.to_parquet(store.legacy_file('crypto'))
+
+    assert closes(store.read('crypto')) == {('BTC', '2024-01-01'): 1, ('BTC', '2024-01-02'): 2}
+    assert not store.legacy_file('crypto').exists()
+    assert store.legacy_file('crypto').with_suffix('.parquet.migrated').exists()
+
+
+def test_load_filters_symbols_dates_and_columns(store):
+    store.append('crypto', frame('BTC', ['2023-12-31', '2024-01-01', '2024-01-02'], [1, 2, 3]))
+    store.append('crypto', frame('ETH', ['2024-01-01'], [4]))
+
+    table = store.load('crypto', symbols=['BTC'], start='2024-01-01', end='2024-01-01', columns=['close'])
+
+    assert table.column_names == ['date', 'symbol', 'close']
+    assert table.to_pydict()['close'] == [2.0]
+    assert store.load('crypto', symbols=['DOGE']) is None
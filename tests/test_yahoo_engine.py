@@ -0,0 +1,246 @@
+import logging
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from fetch_modules import metrics, rate_limiter, response_cache, retry, yahoo_engine
+from fetch_modules.storage import TIMEZONE_KEY
+
+TIMEZONES = {'NYSE': 'America/New_York', 'LSE': 'Europe/London', 'TSE': 'Asia/Tokyo'}
+
+
+def exchange_timezone(symbol):
+    """'NYSE.A'처럼 거래소 접두어가 붙은 종목은 그 거래소 시간대, 나머지는 UTC"""
+    return TIMEZONES.get(symbol.split('.')[0], 'UTC')
+
+
+def bars(start, rows=3, timezone='UTC'):
+    """거래소 자정에 찍힌 일봉"""
+    index = pd.date_range(start, periods=rows, freq='D', tz=timezone, name='Date')
+    values = np.arange(rows, dtype=float) + 1
+    return pd.DataFrame({'Open': values, 'High': values, 'Low': values, 'Close': values, 'Volume': values * 100},
+                        index=index)
+
+
+class FakeYahoo:
+    """
+    yf.download 대역 (요청한 종목을 group_by='ticker' 형식으로 반환, 'MISSING'으로 시작하는 종목은 빠짐)
+
+    yfinance 0.2.x처럼 종목별 오류는 빈 컬럼으로 돌려주고 shared._ERRORS에 남긴다.
+    """
+
+    def __init__(self):
+        self.calls = []
+        self.shared = SimpleNamespace(_ERRORS={})
+        self.failures = {}  # symbol -> [오류 메시지, ...] (다운로드마다 하나씩 소비)
+        self.timezone_lookups = []
+
+    def download(self, tickers, ignore_tz=None, **kwargs):
+        self.calls.append(list(tickers))
+        self.shared._ERRORS = {}
+        frames = {}
+        for symbol in tickers:
+            if symbol.startswith('MISSING'):
+                continue
+            df = bars('2024-01-02' if symbol != 'LATE' else '2024-01-03', timezone=exchange_timezone(symbol))
+            messages = self.failures.get(symbol)
+            if messages:
+                self.shared._ERRORS[symbol.upper()] = messages.pop(0)
+                df = df * np.nan
+            # ignore_tz=False면 배치 전체를 UTC로 맞춤
+            frames[symbol] = df.tz_convert('UTC') if ignore_tz is False else df
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames, axis=1, names=['Ticker', 'Price'], sort=True)
+
+    def Ticker(self, symbol, session=None):
+        self.timezone_lookups.append(symbol)
+        return SimpleNamespace(fast_info={'timezone': exchange_timezone(symbol)})
+
+
+def requests(*symbols, start='2024-01-01', end='2024-01-10'):
+    return [(symbol, start, end) for symbol in symbols]
+
+
+def download(symbols):
+    return yahoo_engine.YahooDownloadEngine()._download_batch(symbols, '2024-01-01', '2024-01-10', '1d')
+
+
+@pytest.fixture
+def fake_yf(monkeypatch, clock, tmp_path):
+    fake = FakeYahoo()
+    monkeypatch.setattr(yahoo_engine, 'yf', fake)
+    monkeypatch.setattr(response_cache, '_cache', response_cache.ResponseCache(root=tmp_path / 'cache'))
+    monkeypatch.setattr(rate_limiter, 'time', clock)
+    monkeypatch.setattr(rate_limiter, '_limiters', {})
+    monkeypatch.setattr(retry, 'time', clock)
+    monkeypatch.setattr(retry, '_breakers', {})
+    return fake
+
+
+def test_symbols_are_downloaded_in_batches(fake_yf):
+    engine = yahoo_engine.YahooDownloadEngine(batch_size=2)
+
+    frames = engine.fetch(requests('A', 'B', 'C', 'D', 'E'), '1d')
+
+    assert fake_yf.calls == [['A', 'B'], ['C', 'D'], ['E']]
+    assert sorted(frames) == ['A', 'B', 'C', 'D', 'E']
+
+
+def test_requests_are_batched_by_range(fake_yf):
+    engine = yahoo_engine.YahooDownloadEngine()
+
+    frames = engine.fetch(requests('A', 'B') + requests('C', end='2024-01-20'), '1d')
+
+    assert fake_yf.calls == [['A', 'B'], ['C']]
+    assert sorted(frames) == ['A', 'B', 'C']
+
+
+def test_starts_in_the_same_month_share_a_download(fake_yf):
+    engine = yahoo_engine.YahooDownloadEngine()
+
+    frames = engine.fetch(requests('A') + requests('B', start='2024-01-03'), '1d')
+
+    assert fake_yf.calls == [['A', 'B']]
+    assert len(frames['A']) == 3
+    assert frames['B'].index[0] == pd.Timestamp('2024-01-03', tz='UTC') and len(frames['B']) == 2
+
+
+def test_shifted_range_is_served_from_cache(fake_yf):
+    yahoo_engine.YahooDownloadEngine().fetch(requests('A'), '1d')
+
+    frames = yahoo_engine.YahooDownloadEngine().fetch(requests('A', start='2024-01-04'), '1d')
+
+    assert fake_yf.calls == [['A']]
+    assert list(frames['A'].index.strftime('%Y-%m-%d')) == ['2024-01-04']
+
+
+def test_prefetched_symbols_are_not_downloaded_again(fake_yf):
+    engine = yahoo_engine.YahooDownloadEngine()
+    engine.prefetch(requests('A', 'B', 'C'), '1d')
+
+    stocks = engine.fetch(requests('A', 'B'), '1d')
+    forex = engine.fetch(requests('C'), '1d')
+
+    assert fake_yf.calls == [['A', 'B', 'C']]
+    assert sorted(stocks) == ['A', 'B'] and list(forex) == ['C']
+
+
+def test_frames_are_released_as_they_are_consumed(fake_yf):
+    engine = yahoo_engine.YahooDownloadEngine(batch_size=2)
+    engine.prefetch(requests('A'), '1d')
+    # 캐시에서 읽은 요청도 보관했다가 내보내면서 제거
+    yahoo_engine.YahooDownloadEngine().fetch(requests('B'), '1d')
+
+    held = []
+    for _ in engine.iter_frames(requests('A', 'B', 'C', 'D', 'E'), '1d'):
+        held.append(len(engine._frames))
+
+    # 다운로드한 배치는 보관하지 않고 바로 내보냄
+    assert held == [0] * 5
+    assert fake_yf.calls == [['A'], ['B'], ['C', 'D'], ['E']]
+
+
+def test_rows_traded_only_by_other_symbols_are_dropped(fake_yf):
+    frames = yahoo_engine.YahooDownloadEngine().fetch(requests('A', 'LATE'), '1d')
+
+    assert len(frames['A']) == 3 and len(frames['LATE']) == 3
+    assert frames['LATE'].index[0] == pd.Timestamp('2024-01-03', tz='UTC')
+    assert frames['A'].columns.name is None
+
+
+def test_symbols_without_data_are_left_out(fake_yf):
+    frames = yahoo_engine.YahooDownloadEngine().fetch(requests('A', 'MISSING'), '1d')
+
+    assert list(frames) == ['A']
+
+
+def test_frames_are_converted_back_to_exchange_timezone(fake_yf):
+    frames = download(['NYSE.A', 'LSE.A', 'TSE.A'])
+
+    for symbol, df in frames.items():
+        assert str(df.index.tz) == exchange_timezone(symbol)
+        # 일봉 날짜가 거래소 기준으로 남음
+        assert list(df.index.strftime('%Y-%m-%d')) == ['2024-01-02', '2024-01-03', '2024-01-04']
+
+
+def test_stored_batch_records_exchange_timezone(fake_yf):
+    frames = download(['TSE.B'])
+
+    batch = yahoo_engine.history_to_batch('stocks', ('TSE.B', frames['TSE.B']))
+
+    assert batch.schema.metadata[TIMEZONE_KEY] == b'Asia/Tokyo'
+
+
+def test_exchange_timezone_is_looked_up_once(fake_yf):
+    engine = yahoo_engine.YahooDownloadEngine()
+    assert engine._exchange_timezone('LSE.C') == 'Europe/London'
+    assert engine._exchange_timezone('LSE.C') == 'Europe/London'
+    # 다른 엔진도 디스크 캐시에서 읽음
+    assert yahoo_engine.YahooDownloadEngine()._exchange_timezone('LSE.C') == 'Europe/London'
+
+    assert fake_yf.timezone_lookups == ['LSE.C']
+
+
+def test_failed_timezone_lookup_keeps_downloaded_timezone(fake_yf, monkeypatch):
+    def fail(symbol, session=None):
+        raise ValueError('no timezone')
+
+    monkeypatch.setattr(fake_yf, 'Ticker', fail)
+
+    frames = download(['NYSE.D'])
+
+    assert str(frames['NYSE.D'].index.tz) == 'UTC'
+    assert len(frames['NYSE.D']) == 3
+
+
+def test_transient_ticker_error_retries_only_that_ticker(fake_yf):
+    fake_yf.failures['A'] = ["ConnectionError('Read timed out.')"]
+
+    frames = download(['A', 'B'])
+
+    assert fake_yf.calls == [['A', 'B'], ['A']]
+    assert {symbol: len(df) for symbol, df in frames.items()} == {'A': 3, 'B': 3}
+
+
+def test_fatal_ticker_error_is_counted_and_not_retried(fake_yf):
+    fake_yf.failures['F'] = ['possibly delisted; no price data found'] * 5
+    before = metrics.get_metrics().total('provider_errors_total', provider='yahoo', symbol='F', kind='fatal')
+
+    frames = download(['F', 'B'])
+
+    assert fake_yf.calls == [['F', 'B']]
+    assert frames['F'].empty and len(frames['B']) == 3
+    after = metrics.get_metrics().total('provider_errors_total', provider='yahoo', symbol='F', kind='fatal')
+    assert after == before + 1
+
+
+def test_frames_received_before_retries_run_out_are_kept(fake_yf):
+    fake_yf.failures['G'] = ['Too Many Requests. Rate limited.'] * 10
+
+    frames = download(['G', 'B'])
+
+    assert len(fake_yf.calls) == retry.RETRY_MAX_ATTEMPTS
+    assert list(frames) == ['B']
+
+
+def test_errors_reported_only_in_the_yfinance_log_are_used(fake_yf, monkeypatch):
+    # yfinance 1.x는 shared._ERRORS를 채우지 않고 오류를 로그로만 남김
+    download_with_errors = fake_yf.download
+
+    def download_and_log(tickers, **kwargs):
+        data = download_with_errors(tickers, **kwargs)
+        for symbol, message in fake_yf.shared._ERRORS.items():
+            logging.getLogger('yfinance').error(f"{[symbol]}: {message}")
+        fake_yf.shared._ERRORS = {}
+        return data
+
+    monkeypatch.setattr(fake_yf, 'download', download_and_log)
+    fake_yf.failures['H'] = ['Read timed out.']
+
+    frames = download(['H', 'B'])
+
+    assert fake_yf.calls == [['H', 'B'], ['H']]
+    assert len(frames['H']) == 3